@@ -4,32 +4,97 @@ FASTAPI MENU SCORING API
 Endpoints for menu extraction and scoring
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 from pydantic import BaseModel
-from typing import Optional, List
-import os
+from typing import Dict, Optional, List
+import asyncio
 import json
-import base64
+import logging
+import sqlite3
 import tempfile
+import time
 from dotenv import load_dotenv
 
 # Import your existing modules
-from scoring_multi_resto import score_menu_for_consumer, score_menu_for_restaurant
-from mistralai import Mistral
-from anthropic import Anthropic
+from scoring_multi_resto import (
+    DEFAULT_WEIGHTS,
+    HAS_LLM,
+    ImprovedScorer,
+    ProfileMatcher,
+    dish_projection,
+)
+from llm_guard import LLMBudget
+from dish_store import open_dish_store
+from geo_index import get_geo_index, select_nearby
+from swap_optimizer import optimize_swaps
+from menu_simulator import MenuSimulator
+from ranking_store import decode_cursor, get_ranking_store, validate_weights
+from live_session import LiveSession
+from streaming_scoring import StreamingRanker
+from storage import get_storage
+from menu_extraction import document_from_upload, stream_menu_pages
+from coalescing import get_coalescer, payload_key, upload_key
+from job_queue import (
+    FINISHED,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    JobWorkerPool,
+    clamp_priority,
+    get_job_queue,
+    job_workers_from_env,
+)
+from clients import (
+    get_anthropic_client,
+    get_mistral_client,
+    missing_ocr_keys,
+    ocr_available,
+    scoring_only,
+)
 
 load_dotenv()
 
-# Initialize API clients
-mistral_api_key = os.environ.get("MISTRAL_API_KEY")
-anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
+logger = logging.getLogger(__name__)
+
+# API clients are built lazily (see clients.py). Outside SCORING_ONLY mode,
+# fail fast at boot if the OCR keys are missing.
+if not scoring_only() and missing_ocr_keys():
+    raise ValueError("Missing API keys in environment variables (or set SCORING_ONLY=1)")
+
+# Columnar dish store (memory-mapped at startup, see dish_store.py)
+dish_store = None
 
-if not mistral_api_key or not anthropic_api_key:
-    raise ValueError("Missing API keys in environment variables")
+# /api/simulate: scenarios evaluated per request
+MAX_SCENARIOS = 1000
 
-mistral_client = Mistral(api_key=mistral_api_key)
-anthropic_client = Anthropic(api_key=anthropic_api_key)
+# Background jobs: kind → (handler run by the job workers, default priority)
+JOB_KINDS = {
+    "score-menu": ("api:score_menu_job", PRIORITY_HIGH),
+    "full-pipeline": ("api:full_pipeline_job", PRIORITY_NORMAL),
+    "extract-menu": ("api:extract_menu_job", PRIORITY_LOW),
+}
+job_workers = None
+
+# /api/jobs/{id}/events: status polling interval and keep-alive period (seconds)
+JOB_EVENTS_INTERVAL = 0.5
+JOB_EVENTS_KEEPALIVE = 15.0
+
+# /api/score-menu/ndjson: dishes scored per batch (the body is not read meanwhile)
+NDJSON_BATCH_SIZE = 256
+NDJSON_MAX_LINE = 1 << 20  # bytes per dish line
+
+# Brotli when brotli-asgi is installed, gzip otherwise (both negotiate on Accept-Encoding)
+try:
+    from brotli_asgi import BrotliMiddleware as CompressionMiddleware
+except ImportError:
+    from starlette.middleware.gzip import GZipMiddleware as CompressionMiddleware
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = 500
 
 # Initialize FastAPI
 app = FastAPI(
@@ -48,6 +113,22 @@ app.add_middleware(
 )
 
 
+class ScoringCompressionMiddleware(CompressionMiddleware):
+    """Compresses JSON responses, but never NDJSON/SSE streams (would buffer every line)"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (
+            scope["path"].endswith(("/stream", "/events"))
+            or "text/event-stream" in Headers(scope=scope).get("accept", "")
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(ScoringCompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+
 # ============================================================================
 # PYDANTIC MODELS
 # ============================================================================
@@ -65,6 +146,15 @@ class MenuDish(BaseModel):
     description: str
     price: float
     restaurant_name: str
+    lat: Optional[float] = None  # Restaurant coordinates (for `near` queries)
+    lng: Optional[float] = None
+
+
+class GeoQuery(BaseModel):
+    lat: float
+    lng: float
+    radius_m: Optional[float] = None  # Restaurants within radius_m metres
+    k: Optional[int] = None  # k nearest restaurants (combined with radius_m if both set)
 
 
 class ScoringRequest(BaseModel):
@@ -72,6 +162,37 @@ class ScoringRequest(BaseModel):
     user_profile: Optional[UserProfile] = None
     mode: str = "consumer"  # "consumer" or "restaurant"
     top_n: int = 10
+    near: Optional[GeoQuery] = None  # Only score restaurants around this point
+    response_profile: str = "full"  # "full", "compact" or "map" (see RESPONSE_PROFILES)
+    fields: Optional[List[str]] = None  # Dish fields to return (overrides response_profile)
+
+
+class SwapOptimizationRequest(BaseModel):
+    menu_data: List[MenuDish]  # One menu, or every menu of a chain
+    cost_budget: Optional[float] = None  # Max food-cost increase (€/service), negative = required savings
+    max_changes: Optional[int] = None  # Max number of dishes changed
+    min_plant_based_pct: float = 0.0  # Min share of vegetarian/vegan dishes after swaps
+    planet_weight: float = 1.0  # kg CO2e worth one planet-score point
+
+
+class SimulationRequest(BaseModel):
+    menu_data: List[MenuDish]  # Restaurant menu + neighbours' menus (for the rank)
+    restaurant_name: Optional[str] = None  # Simulated restaurant (default: first dish's)
+    # One list of edits per scenario: {"type": "swap", "from", "to", "dish_ids"?},
+    # {"type": "add", "dish": {...}}, {"type": "remove", "dish_id"}
+    scenarios: List[List[dict]]
+
+
+class RerankRequest(BaseModel):
+    ranking_id: str  # Returned by /api/score-menu and /api/full-pipeline
+    weights: Dict[str, float] = {}  # {"fit", "pleasure", "planet"}, missing keys use defaults
+    top_n: int = 10
+    response_profile: str = "full"
+    fields: Optional[List[str]] = None
+
+
+class JobScoringRequest(ScoringRequest):
+    priority: Optional[int] = None  # Higher runs first, 0-10 (default: JOB_KINDS)
 
 
 class HealthCheckResponse(BaseModel):
@@ -85,120 +206,369 @@ class HealthCheckResponse(BaseModel):
 
 def extract_menu_from_image(image_data: bytes, restaurant_name: str = "Unknown Restaurant"):
     """Extract structured menu data from image bytes"""
-    
-    # Encode image for API
-    image_base64 = base64.b64encode(image_data).decode("utf-8")
-    document = {
-        "type": "image_url",
-        "image_url": f"data:image/jpeg;base64,{image_base64}",
-    }
+    return extract_menu_from_uploads([(image_data, "image/jpeg")], restaurant_name)
 
-    # OCR with Mistral
-    ocr_response = mistral_client.ocr.process(
-        model="mistral-ocr-latest",
-        document=document,
-        include_image_base64=False
-    )
 
-    ocr_text = ocr_response.text if hasattr(ocr_response, "text") else str(ocr_response)
-
-    # Parse with Claude Haiku
-    parsing_prompt = f"""You are a menu data extractor. Parse this restaurant menu OCR text into structured JSON.
-
-OCR TEXT:
-{ocr_text}
-
-INSTRUCTIONS:
-1. Extract the restaurant name, type, and location if available from the menu
-2. Extract ALL dishes from the menu
-3. For each dish, identify: name, description (ingredients/details), price
-4. Assign sequential IDs starting from 1
-5. If price is missing, use 0.0
-6. If description is missing, use empty string
-7. Return ONLY valid JSON, no markdown, no explanation
-
-OUTPUT FORMAT:
-{{
-    "restaurant_id": 1,
-    "name": "{restaurant_name}",
-    "type": "Restaurant type from OCR or 'Unknown'",
-    "location": "Address from OCR or 'Unknown'",
-    "menu": [
-        {{
-            "id": 1,
-            "name": "Dish name",
-            "description": "Ingredients and details",
-            "price": 12.50
-        }}
-    ]
-}}
-
-JSON OUTPUT:"""
-
-    chat_response = anthropic_client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=4096,
-        temperature=0.1,
-        messages=[{"role": "user", "content": parsing_prompt}],
-    )
+def extract_menu_from_uploads(uploads: List[tuple], restaurant_name: str = "Unknown Restaurant"):
+    """Extract one merged menu from several (bytes, content_type) uploads"""
+    menu_data = []
+    restaurant_data = {}
 
-    llm_output = chat_response.content[0].text.strip()
+    for kind, payload in stream_menu_from_uploads(uploads, restaurant_name):
+        if kind == "dish":
+            menu_data.append(payload)
+        else:
+            restaurant_data = payload
 
-    # Clean markdown artifacts
-    if llm_output.startswith("```json"):
-        llm_output = llm_output[7:]
-    if llm_output.startswith("```"):
-        llm_output = llm_output[3:]
-    if llm_output.endswith("```"):
-        llm_output = llm_output[:-3]
-    llm_output = llm_output.strip()
+    storage = get_storage()
+    if storage is not None and menu_data:
+        storage.write_behind(
+            storage.save_menu, restaurant_data.get("name", restaurant_name), menu_data, restaurant_data
+        )
+
+    return menu_data, restaurant_data
 
-    # Parse JSON
-    try:
-        parsed_data = json.loads(llm_output)
-
-        # Handle structured restaurant format
-        if isinstance(parsed_data, dict) and "menu" in parsed_data:
-            restaurant_data = parsed_data
-            dishes = restaurant_data.get("menu", [])
-        elif isinstance(parsed_data, dict):
-            dishes = (
-                parsed_data.get("dishes")
-                or parsed_data.get("menu")
-                or next((v for v in parsed_data.values() if isinstance(v, list)), [])
-            )
-            restaurant_data = {
-                "restaurant_id": 1,
-                "name": restaurant_name,
-                "type": "Unknown",
-                "location": "Unknown",
-                "menu": dishes,
-            }
-        else:
-            dishes = parsed_data
-            restaurant_data = {
-                "restaurant_id": 1,
-                "name": restaurant_name,
-                "type": "Unknown",
-                "location": "Unknown",
-                "menu": dishes,
-            }
 
+def stream_menu_from_uploads(uploads: List[tuple], restaurant_name: str = "Unknown Restaurant"):
+    """
+    OCR + streaming parse of one or more images / PDFs: yields ("dish", item)
+    as each dish is parsed, then ("restaurant", merged data)
+    """
+    documents = [document_from_upload(data, content_type) for data, content_type in uploads]
+
+    try:
+        yield from stream_menu_pages(
+            get_mistral_client(), get_anthropic_client(), documents, restaurant_name
+        )
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"JSON parsing error: {str(e)}")
 
-    # Format for scoring engine
-    menu_data = []
-    for dish in dishes:
-        menu_data.append({
-            "id": dish.get("id", len(menu_data) + 1),
-            "name": dish.get("name", "Unknown Dish"),
-            "description": dish.get("description", ""),
-            "price": float(dish.get("price", 0.0)),
-            "restaurant_name": restaurant_data.get("name", restaurant_name),
-        })
 
-    return menu_data, restaurant_data
+async def read_uploads(file: Optional[UploadFile], files: Optional[List[UploadFile]]) -> List[tuple]:
+    """Validate and read menu uploads (single `file` and/or several `files`)"""
+    uploads = ([file] if file is not None else []) + (files or [])
+
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    for upload in uploads:
+        content_type = upload.content_type or ""
+        if not (content_type.startswith("image/") or content_type == "application/pdf"):
+            raise HTTPException(status_code=400, detail="Files must be images or PDF")
+
+    if not ocr_available():
+        raise HTTPException(status_code=503, detail="Menu extraction unavailable (scoring-only mode)")
+
+    return [(await upload.read(), upload.content_type) for upload in uploads]
+
+
+def pipeline_events(
+    uploads: List[tuple],
+    restaurant_name: str,
+    mode: str,
+    user_profile: dict,
+    top_n: int,
+    projection: Optional[dict] = None
+):
+    """
+    Full pipeline as a stream of events: each dish is enriched and scored as
+    soon as the parser emits it, the final ranking comes last.
+
+    Events: {"event": "dish", "dish": {...}}, {"event": "filtered", ...},
+    then {"event": "result", "restaurant": {...}, "scoring": {...}}
+    """
+    scorer = ImprovedScorer()
+    matcher = ProfileMatcher(user_profile)
+    budget = LLMBudget.from_env() if HAS_LLM else None
+    scored = []
+    filtered_out_count = 0
+    restaurant_data = {}
+
+    for kind, payload in stream_menu_from_uploads(uploads, restaurant_name):
+        if kind == "restaurant":
+            restaurant_data = payload
+            continue
+
+        if mode == "consumer":
+            dish = scorer.score_dish_for_consumer(payload, matcher, budget)
+            if dish is None:
+                filtered_out_count += 1
+                yield {"event": "filtered", "id": payload["id"], "name": payload["name"]}
+                continue
+        else:
+            dish = scorer.score_dish_for_restaurant(payload, budget)
+
+        scored.append(dish)
+        yield {"event": "dish", "dish": dish.model_dump(include=projection)}
+
+    if not scored and not filtered_out_count:
+        raise HTTPException(status_code=400, detail="No menu items extracted from image")
+
+    store = get_ranking_store()
+    ranking_id = store.put(scored, mode, filtered_out_count)
+    next_cursor = store.get(ranking_id).next_cursor(DEFAULT_WEIGHTS, top_n, top_n)
+
+    if mode == "consumer":
+        scoring_results = scorer.finalize_consumer(
+            scored, filtered_out_count, top_n, budget, projection
+        )
+    else:
+        scoring_results = scorer.finalize_restaurant(scored, top_n, budget, projection)
+
+    persist_scoring(
+        scored,
+        user_profile if mode == "consumer" else None,
+        restaurant_data,
+        scoring_results.get("swap_suggestions"),
+    )
+
+    yield {
+        "event": "result",
+        "ranking_id": ranking_id,
+        "next_cursor": next_cursor,
+        "restaurant": restaurant_data,
+        "scoring": scoring_results,
+    }
+
+
+def persist_scoring(
+    scored: list,
+    user_profile: Optional[dict],
+    restaurant_data: Optional[dict] = None,
+    swaps: Optional[List[dict]] = None,
+    menu: Optional[List[dict]] = None
+):
+    """
+    Save scored dishes, enrichments and swaps (see storage.py) when storage is
+    enabled. user_profile is None in restaurant mode. The write runs on the
+    storage writer thread, after the response; failures are logged, never
+    returned to the client.
+    """
+    storage = get_storage()
+    if storage is None or not scored:
+        return
+
+    coordinates = {
+        dish["restaurant_name"]: (dish["lat"], dish["lng"])
+        for dish in menu or []
+        if dish.get("lat") is not None and dish.get("lng") is not None
+    }
+    # Copy: finalize_* sorts the scored list in place
+    storage.write_behind(save_scoring, storage, list(scored), user_profile, restaurant_data, swaps, coordinates)
+
+
+def save_scoring(
+    storage,
+    scored: list,
+    user_profile: Optional[dict],
+    restaurant_data: Optional[dict],
+    swaps: Optional[List[dict]],
+    coordinates: Dict[str, tuple]
+):
+    """One transaction: scored dishes, enrichments, then swaps grouped by restaurant"""
+    with storage.batch():
+        storage.save_scored(scored, user_profile, restaurant_data, coordinates)
+        if swaps:
+            restaurant_of = {dish.id: dish.restaurant_name for dish in scored}
+            by_restaurant = {}
+            for swap in swaps:
+                by_restaurant.setdefault(restaurant_of.get(swap["dish_id"]), []).append(swap)
+            for name, restaurant_swaps in by_restaurant.items():
+                if name is not None:
+                    storage.save_swaps(name, restaurant_swaps)
+
+
+def projection_from_request(response_profile: str, fields) -> Optional[dict]:
+    """Dish fields to return (`fields` list or comma-separated string), 400 if unknown"""
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    try:
+        return dish_projection(response_profile, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def score_menu_request(request: ScoringRequest, projection: Optional[dict]) -> dict:
+    """Body of /api/score-menu (runs in the threadpool, shared by coalesced requests)"""
+    near = request.near
+
+    # Convert Pydantic models to dicts
+    menu_list = [dish.dict() for dish in request.menu_data]
+
+    # Candidate selection before any scoring (restaurant index, see geo_index.py)
+    nearby_restaurants = None
+    if near is not None:
+        geo_index = get_geo_index()
+        try:
+            geo_index.sync(get_storage())
+        except sqlite3.Error:
+            logger.exception("Geo index refresh failed")
+        menu_list, nearby_restaurants = select_nearby(
+            menu_list, near.lat, near.lng, radius_m=near.radius_m, k=near.k, index=geo_index
+        )
+    
+    scorer = ImprovedScorer()
+    budget = LLMBudget.from_env() if HAS_LLM else None
+
+    if request.mode == "consumer":
+        user_profile_dict = request.user_profile.dict() if request.user_profile else {
+            "dietary_restriction": "",
+            "goal": "",
+            "allergens": [],
+            "strict_filter": True
+        }
+        scored, filtered_out_count = scorer.score_dishes_for_consumer(
+            menu_list, user_profile_dict, budget
+        )
+        # Sub-scores kept for /api/rerank (before finalize sorts the list)
+        ranking_id = get_ranking_store().put(scored, request.mode, filtered_out_count)
+        results = scorer.finalize_consumer(
+            scored, filtered_out_count, request.top_n, budget, projection
+        )
+        persist_scoring(scored, user_profile_dict, menu=menu_list)
+    else:
+        scored = scorer.score_dishes_for_restaurant(menu_list, budget)
+        ranking_id = get_ranking_store().put(scored, request.mode)
+        results = scorer.finalize_restaurant(scored, request.top_n, budget, projection)
+        persist_scoring(scored, None, swaps=results.get("swap_suggestions"), menu=menu_list)
+    
+    ranking = get_ranking_store().get(ranking_id)
+    response = {
+        "success": True,
+        "mode": request.mode,
+        "ranking_id": ranking_id,
+        "next_cursor": ranking.next_cursor(DEFAULT_WEIGHTS, request.top_n, request.top_n),
+        "results": results
+    }
+    if nearby_restaurants is not None:
+        response["nearby_restaurants"] = nearby_restaurants
+    return response
+
+
+async def ndjson_lines(request: Request):
+    """Lines of an NDJSON request body, read chunk by chunk (never the whole body)"""
+    pending = bytearray()
+    async for chunk in request.stream():
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", start)
+            if end < 0:
+                break
+            yield bytes(pending[start:end])
+            start = end + 1
+        del pending[:start]
+        if len(pending) > NDJSON_MAX_LINE:
+            raise HTTPException(status_code=413, detail=f"NDJSON line longer than {NDJSON_MAX_LINE} bytes")
+    if pending:
+        yield bytes(pending)
+
+
+def score_ndjson_batch(
+    scorer: ImprovedScorer,
+    ranker: StreamingRanker,
+    batch: List[dict],
+    matcher: Optional[ProfileMatcher],
+    user_profile: Optional[dict],
+    budget: Optional[LLMBudget]
+):
+    """Score one batch of /api/score-menu/ndjson into the running ranking (threadpool)"""
+    if matcher is None:
+        scored = scorer.score_dishes_for_restaurant(batch, budget)
+    else:
+        scored = []
+        for dish in batch:
+            scored_dish = scorer.score_dish_for_consumer(dish, matcher, budget)
+            if scored_dish is None:
+                ranker.add_filtered()
+            else:
+                scored.append(scored_dish)
+
+    for scored_dish in scored:
+        ranker.add(scored_dish)
+    persist_scoring(scored, user_profile, menu=batch)
+
+
+def run_full_pipeline(
+    uploads: List[tuple],
+    restaurant_name: str,
+    mode: str,
+    user_profile: dict,
+    top_n: int,
+    projection: Optional[dict] = None
+) -> dict:
+    """Body of /api/full-pipeline (runs in the threadpool, shared by coalesced requests)"""
+    # Extract + score: dishes are scored as soon as the parser emits them
+    for event in pipeline_events(uploads, restaurant_name, mode, user_profile, top_n, projection):
+        pass
+
+    return {
+        "success": True,
+        "ranking_id": event["ranking_id"],
+        "next_cursor": event["next_cursor"],
+        "restaurant": event["restaurant"],
+        "scoring": event["scoring"],
+        "mode": mode
+    }
+
+
+# ============================================================================
+# BACKGROUND JOB HANDLERS (run in the job worker processes, see job_queue.py)
+# ============================================================================
+
+def detach_ranking(response: dict) -> dict:
+    # Rankings live in the worker process memory: /api/rerank and
+    # /api/rankings/next cannot reach them from the API process
+    response.pop("ranking_id", None)
+    response.pop("next_cursor", None)
+    return response
+
+
+def score_menu_job(payload: dict, uploads: List[tuple]) -> dict:
+    request = ScoringRequest(**payload)
+    projection = projection_from_request(request.response_profile, request.fields)
+    return detach_ranking(score_menu_request(request, projection))
+
+
+def full_pipeline_job(payload: dict, uploads: List[tuple]) -> dict:
+    projection = projection_from_request(payload.pop("response_profile"), payload.pop("fields"))
+    return detach_ranking(run_full_pipeline(uploads, projection=projection, **payload))
+
+
+def extract_menu_job(payload: dict, uploads: List[tuple]) -> dict:
+    menu_data, restaurant_data = extract_menu_from_uploads(uploads, payload["restaurant_name"])
+    return {
+        "success": True,
+        "restaurant": restaurant_data,
+        "menu_items": menu_data,
+        "count": len(menu_data)
+    }
+
+
+async def submit_job(kind: str, payload: dict, uploads: List[tuple], priority: Optional[int]) -> dict:
+    handler, default_priority = JOB_KINDS[kind]
+    priority = clamp_priority(default_priority if priority is None else priority)
+    job_id = await run_in_threadpool(
+        get_job_queue().submit, kind, handler, payload, uploads, priority
+    )
+    return {
+        "success": True,
+        "job_id": job_id,
+        "kind": kind,
+        "priority": priority,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events"
+    }
+
+
+def profile_from_form(dietary_restriction: str, goal: str, allergens: str, strict_filter: bool) -> dict:
+    return {
+        "dietary_restriction": dietary_restriction,
+        "goal": goal,
+        "allergens": [a.strip() for a in allergens.split(",") if a.strip()],
+        "strict_filter": strict_filter
+    }
 
 
 # ============================================================================
@@ -216,25 +586,29 @@ async def root():
 
 @app.post("/api/extract-menu")
 async def extract_menu(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
     restaurant_name: str = Form("Unknown Restaurant")
 ):
     """
-    Extract menu from uploaded image
+    Extract menu from uploaded image(s)
     
-    - **file**: Menu image (JPG, PNG, etc.)
+    - **file**: Menu image (JPG, PNG, etc.) or PDF
+    - **files**: Several images / PDFs of the same menu (pages are merged)
     - **restaurant_name**: Optional restaurant name
     """
-    
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+
+    uploads = await read_uploads(file, files)
     
     try:
-        # Read image data
-        image_data = await file.read()
-        
-        # Extract menu
-        menu_data, restaurant_data = extract_menu_from_image(image_data, restaurant_name)
+        # Extract menu (OCR of page n+1 overlaps parsing of page n); the same
+        # images uploaded concurrently share one OCR + parse
+        menu_data, restaurant_data = await get_coalescer().run(
+            upload_key(uploads, endpoint="extract-menu", restaurant_name=restaurant_name),
+            extract_menu_from_uploads,
+            uploads,
+            restaurant_name,
+        )
         
         return {
             "success": True,
@@ -256,79 +630,293 @@ async def score_menu(request: ScoringRequest):
     - **user_profile**: User dietary preferences (optional)
     - **mode**: "consumer" or "restaurant"
     - **top_n**: Number of top dishes to return
+    - **near**: Optional {lat, lng, radius_m and/or k}: only restaurants around
+      this point are scored (coordinates from storage, or lat/lng on the dishes)
+    - **response_profile** / **fields**: Dish fields to return ("map" for the
+      mobile map view, or an explicit list such as ["name", "sub_scores.s_planet"])
     """
-    
+
+    near = request.near
+    if near is not None and near.radius_m is None and near.k is None:
+        raise HTTPException(status_code=400, detail="near requires radius_m and/or k")
+
+    projection = projection_from_request(request.response_profile, request.fields)
+
     try:
-        # Convert Pydantic models to dicts
-        menu_list = [dish.dict() for dish in request.menu_data]
-        
-        if request.mode == "consumer":
-            user_profile_dict = request.user_profile.dict() if request.user_profile else {
-                "dietary_restriction": "",
-                "goal": "",
-                "allergens": [],
-                "strict_filter": True
-            }
-            results = score_menu_for_consumer(menu_list, user_profile_dict, request.top_n)
-        else:
-            results = score_menu_for_restaurant(menu_list, request.top_n)
-        
+        # Identical concurrent requests (same menu, profile and options) share one scoring
+        return await get_coalescer().run(
+            payload_key(request.model_dump()), score_menu_request, request, projection
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Scoring failed: {str(e)}")
+
+
+@app.post("/api/score-menu/ndjson")
+async def score_menu_ndjson(
+    request: Request,
+    mode: str = "consumer",
+    dietary_restriction: str = "",
+    goal: str = "",
+    allergens: str = "",  # Comma-separated
+    strict_filter: bool = True,
+    top_n: int = 10,
+    response_profile: str = "full",
+    fields: str = ""  # Comma-separated
+):
+    """
+    Score a very large menu sent as NDJSON (one MenuDish object per line)
+
+    - Query parameters: same options as /api/score-menu (profile fields flattened)
+    - Dishes are validated and scored in batches of NDJSON_BATCH_SIZE as the
+      body arrives: only the top_n dishes are kept (plus a few integers per
+      dish for the stats, see streaming_scoring.py)
+    - Same results as /api/score-menu, without ranking_id / next_cursor (the
+      full ranking is never kept) and without `near`
+    """
+
+    if top_n < 0:
+        raise HTTPException(status_code=400, detail="top_n must be >= 0")
+    projection = projection_from_request(response_profile, fields)
+
+    scorer = ImprovedScorer()
+    budget = LLMBudget.from_env() if HAS_LLM else None
+    ranker = StreamingRanker(mode, top_n, scorer)
+    user_profile, matcher = None, None
+    if mode == "consumer":
+        user_profile = profile_from_form(dietary_restriction, goal, allergens, strict_filter)
+        matcher = ProfileMatcher(user_profile)
+
+    received = 0
+    batch = []
+    line_no = 0
+    try:
+        async for line in ndjson_lines(request):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append(MenuDish(**json.loads(line)).dict())
+            except (ValueError, TypeError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid dish on line {line_no}: {e}")
+            received += 1
+
+            if len(batch) >= NDJSON_BATCH_SIZE:
+                await run_in_threadpool(score_ndjson_batch, scorer, ranker, batch, matcher, user_profile, budget)
+                batch = []
+
+        if batch:
+            await run_in_threadpool(score_ndjson_batch, scorer, ranker, batch, matcher, user_profile, budget)
+
         return {
             "success": True,
-            "mode": request.mode,
-            "results": results
+            "mode": mode,
+            "dishes_received": received,
+            "results": ranker.result(budget, projection)
         }
-        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scoring failed: {str(e)}")
 
 
+@app.post("/api/rerank")
+async def rerank(request: RerankRequest):
+    """
+    Re-rank a previous scoring with custom weights (UI sliders)
+
+    Totals and ordering are recomputed from the cached sub-scores only:
+    no OCR, enrichment or scoring. With the default weights the result
+    matches the original ranking exactly.
+    """
+
+    started = time.perf_counter()
+
+    try:
+        weights = validate_weights(request.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    projection = projection_from_request(request.response_profile, request.fields)
+
+    ranking = get_ranking_store().get(request.ranking_id)
+    if ranking is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired ranking_id")
+
+    totals, order = ranking.order(weights)
+    n = len(totals)
+
+    return {
+        "success": True,
+        "ranking_id": ranking.ranking_id,
+        "mode": ranking.mode,
+        "weights": weights,
+        "next_cursor": ranking.next_cursor(weights, request.top_n, request.top_n),
+        "results": {
+            "scored_dishes": ranking.page(weights, 0, request.top_n, projection),
+            "average_total_score": round(sum(totals) / n, 2) if n else 0,
+            "restaurant_rankings": ranking.restaurant_rankings(totals),
+        },
+        "server_time_us": round((time.perf_counter() - started) * 1e6)
+    }
+
+
+@app.get("/api/rankings/next")
+async def rankings_next(
+    cursor: str,
+    limit: Optional[int] = None,
+    response_profile: str = "full",
+    fields: str = ""  # Comma-separated
+):
+    """
+    Next page of a ranking (infinite scroll)
+
+    - **cursor**: `next_cursor` from /api/score-menu, /api/full-pipeline,
+      /api/rerank or a previous page
+    - **limit**: Page size (defaults to the size of the first page)
+    - **response_profile** / **fields**: Dish fields to return
+
+    Slices the stored order: no rescoring.
+    """
+
+    try:
+        ranking_id, offset, page_size, weights = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    projection = projection_from_request(response_profile, fields)
+
+    ranking = get_ranking_store().get(ranking_id)
+    if ranking is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired ranking_id")
+
+    if limit is not None:
+        if limit <= 0:
+            raise HTTPException(status_code=400, detail="limit must be > 0")
+        page_size = limit
+
+    return {
+        "success": True,
+        "ranking_id": ranking_id,
+        "offset": offset,
+        "total": len(ranking),
+        "scored_dishes": ranking.page(weights, offset, page_size, projection),
+        "next_cursor": ranking.next_cursor(weights, offset + page_size, page_size)
+    }
+
+
+@app.post("/api/optimize-swaps")
+async def optimize_swaps_endpoint(request: SwapOptimizationRequest):
+    """
+    B2B: best set of ingredient swaps across a whole menu (or chain)
+
+    Maximizes CO2 savings + planet-score uplift under a food-cost budget,
+    a maximum number of changed dishes and a minimum plant-based share.
+    """
+
+    if not 0.0 <= request.min_plant_based_pct <= 100.0:
+        raise HTTPException(status_code=400, detail="min_plant_based_pct must be between 0 and 100")
+
+    def run_optimization():
+        scorer = ImprovedScorer()
+        budget = LLMBudget.from_env() if HAS_LLM else None
+        scored = [
+            scorer.score_dish_for_restaurant(dish.dict(), budget) for dish in request.menu_data
+        ]
+
+        return optimize_swaps(
+            scored,
+            cost_budget=request.cost_budget,
+            max_changes=request.max_changes,
+            min_plant_based_pct=request.min_plant_based_pct,
+            planet_weight=request.planet_weight,
+            scorer=scorer,
+        )
+
+    try:
+        # Enrichment, scoring and the optimizer run off the event loop
+        plan = await run_in_threadpool(run_optimization)
+
+        return {
+            "success": True,
+            "plan": plan
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Swap optimization failed: {str(e)}")
+
+
+@app.post("/api/simulate")
+async def simulate_menu(request: SimulationRequest):
+    """
+    B2B what-if: menu stats, planet-score distribution and rank among
+    neighbours for a batch of hypothetical edits of one restaurant's menu
+
+    The base menu is scored once; each scenario only rescores the dishes it
+    touches (see menu_simulator.py).
+    """
+
+    if len(request.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios per request")
+
+    def run_simulation():
+        budget = LLMBudget.from_env() if HAS_LLM else None
+        simulator = MenuSimulator(
+            [dish.dict() for dish in request.menu_data], request.restaurant_name, budget=budget
+        )
+        return simulator, simulator.simulate_batch(request.scenarios), simulator.baseline()
+
+    try:
+        # Scoring (and possibly LLM calls) off the event loop
+        simulator, scenarios, baseline = await run_in_threadpool(run_simulation)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scenario: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
+
+    return {
+        "success": True,
+        "restaurant_name": simulator.restaurant_name,
+        "baseline": baseline,
+        "scenarios": scenarios
+    }
+
+
 @app.post("/api/full-pipeline")
 async def full_pipeline(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
     restaurant_name: str = Form("Unknown Restaurant"),
     dietary_restriction: str = Form(""),
     goal: str = Form(""),
     allergens: str = Form(""),  # Comma-separated
     strict_filter: bool = Form(True),
     mode: str = Form("consumer"),
-    top_n: int = Form(10)
+    top_n: int = Form(10),
+    response_profile: str = Form("full"),
+    fields: str = Form("")  # Comma-separated
 ):
     """
-    Complete pipeline: Extract menu from image + Score dishes
+    Complete pipeline: Extract menu from image(s) + Score dishes
     
-    This is the main endpoint for frontend integration.
+    This is the main endpoint for frontend integration. Accepts a single
+    `file` or several `files` (photos and/or a multi-page PDF).
     """
     
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    projection = projection_from_request(response_profile, fields)
+    uploads = await read_uploads(file, files)
     
     try:
-        # Step 1: Extract menu
-        image_data = await file.read()
-        menu_data, restaurant_data = extract_menu_from_image(image_data, restaurant_name)
-        
-        if not menu_data:
-            raise HTTPException(status_code=400, detail="No menu items extracted from image")
-        
-        # Step 2: Score menu
-        if mode == "consumer":
-            user_profile = {
-                "dietary_restriction": dietary_restriction,
-                "goal": goal,
-                "allergens": [a.strip() for a in allergens.split(",") if a.strip()],
-                "strict_filter": strict_filter
-            }
-            scoring_results = score_menu_for_consumer(menu_data, user_profile, top_n)
-        else:
-            scoring_results = score_menu_for_restaurant(menu_data, top_n)
-        
-        return {
-            "success": True,
-            "restaurant": restaurant_data,
-            "scoring": scoring_results,
-            "mode": mode
-        }
+        user_profile = profile_from_form(dietary_restriction, goal, allergens, strict_filter)
+        key = upload_key(
+            uploads,
+            endpoint="full-pipeline",
+            restaurant_name=restaurant_name,
+            mode=mode,
+            user_profile=user_profile,
+            top_n=top_n,
+            projection=projection,
+        )
+        return await get_coalescer().run(
+            key, run_full_pipeline, uploads, restaurant_name, mode, user_profile, top_n, projection
+        )
         
     except HTTPException:
         raise
@@ -336,20 +924,374 @@ async def full_pipeline(
         raise HTTPException(status_code=500, detail=f"Pipeline failed: {str(e)}")
 
 
+@app.post("/api/full-pipeline/stream")
+async def full_pipeline_stream(
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    restaurant_name: str = Form("Unknown Restaurant"),
+    dietary_restriction: str = Form(""),
+    goal: str = Form(""),
+    allergens: str = Form(""),  # Comma-separated
+    strict_filter: bool = Form(True),
+    mode: str = Form("consumer"),
+    top_n: int = Form(10),
+    response_profile: str = Form("full"),
+    fields: str = Form("")  # Comma-separated
+):
+    """
+    Streaming pipeline (NDJSON): one line per scored dish as soon as it is
+    parsed, then a final "result" line with the ranking and stats.
+
+    Same parameters as /api/full-pipeline.
+    """
+
+    projection = projection_from_request(response_profile, fields)
+    uploads = await read_uploads(file, files)
+    user_profile = profile_from_form(dietary_restriction, goal, allergens, strict_filter)
+
+    def ndjson():
+        started = time.perf_counter()
+        try:
+            for event in pipeline_events(
+                uploads, restaurant_name, mode, user_profile, top_n, projection
+            ):
+                event["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "detail": e.detail}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": f"Pipeline failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/api/jobs/score-menu")
+async def submit_score_menu_job(request: JobScoringRequest):
+    """
+    Queue a scoring job (same body as /api/score-menu, plus `priority`)
+
+    Returns a job_id at once: poll /api/jobs/{job_id} or subscribe to
+    /api/jobs/{job_id}/events. Score-only jobs run before pipelines and
+    bulk extraction by default.
+    """
+
+    near = request.near
+    if near is not None and near.radius_m is None and near.k is None:
+        raise HTTPException(status_code=400, detail="near requires radius_m and/or k")
+    projection_from_request(request.response_profile, request.fields)
+
+    payload = request.model_dump(exclude={"priority"})
+    return await submit_job("score-menu", payload, [], request.priority)
+
+
+@app.post("/api/jobs/full-pipeline")
+async def submit_full_pipeline_job(
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    restaurant_name: str = Form("Unknown Restaurant"),
+    dietary_restriction: str = Form(""),
+    goal: str = Form(""),
+    allergens: str = Form(""),  # Comma-separated
+    strict_filter: bool = Form(True),
+    mode: str = Form("consumer"),
+    top_n: int = Form(10),
+    response_profile: str = Form("full"),
+    fields: str = Form(""),  # Comma-separated
+    priority: Optional[int] = Form(None)
+):
+    """
+    Queue a full pipeline job (same form as /api/full-pipeline, plus `priority`)
+
+    Use this instead of /api/full-pipeline for large menus behind proxies
+    with short timeouts.
+    """
+
+    projection_from_request(response_profile, fields)
+    uploads = await read_uploads(file, files)
+
+    payload = {
+        "restaurant_name": restaurant_name,
+        "mode": mode,
+        "user_profile": profile_from_form(dietary_restriction, goal, allergens, strict_filter),
+        "top_n": top_n,
+        "response_profile": response_profile,
+        "fields": fields,
+    }
+    return await submit_job("full-pipeline", payload, uploads, priority)
+
+
+@app.post("/api/jobs/extract-menu")
+async def submit_extract_menu_job(
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+    restaurant_name: str = Form("Unknown Restaurant"),
+    priority: Optional[int] = Form(None)
+):
+    """
+    Queue a menu extraction job (bulk ingestion: lowest priority by default)
+    """
+
+    uploads = await read_uploads(file, files)
+    return await submit_job("extract-menu", {"restaurant_name": restaurant_name}, uploads, priority)
+
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    """
+    Job status: "queued" (with queue_position), "running", "done" (with
+    result) or "failed" (with error)
+    """
+
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events: one event per status change (event name = status,
+    data = same JSON as /api/jobs/{job_id}), the stream ends once the job is
+    done or failed. Comment lines keep idle connections open through proxies.
+    """
+
+    queue = get_job_queue()
+    if await run_in_threadpool(queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+
+    async def events():
+        last_state = None
+        idle = 0.0
+        while True:
+            job = await run_in_threadpool(queue.get, job_id)
+            if job is None:
+                expired = {"job_id": job_id, "status": "failed", "error": "Job expired"}
+                yield f"event: failed\ndata: {json.dumps(expired)}\n\n"
+                return
+
+            state = (job["status"], job.get("queue_position"))
+            if state != last_state:
+                yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                last_state = state
+                idle = 0.0
+            elif idle >= JOB_EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+
+            if job["status"] in FINISHED:
+                return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+            idle += JOB_EVENTS_INTERVAL
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.websocket("/ws/rescore")
+async def ws_rescore(websocket: WebSocket):
+    """
+    Live rescoring for the settings screen (see live_session.py)
+
+    The client sends {"type": "init", "menu_data", "user_profile", "top_n",
+    "response_profile"?, "fields"?} once, then {"type": "profile", "delta": {...}}
+    per toggle. The server answers a "snapshot", then one "diff" per delta
+    (dishes entering/leaving the top N and score updates only). Invalid
+    messages get {"type": "error", "detail"} and the session stays open.
+    """
+
+    await websocket.accept()
+    session = None
+
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+                kind = message.get("type")
+
+                if kind == "init":
+                    menu = [MenuDish(**dish).dict() for dish in message.get("menu_data", [])]
+                    profile = UserProfile(**(message.get("user_profile") or {})).dict()
+                    projection = dish_projection(
+                        message.get("response_profile", "full"), message.get("fields")
+                    )
+                    budget = LLMBudget.from_env() if HAS_LLM else None
+                    # Enrichment may call the LLM: keep it off the event loop
+                    session = await run_in_threadpool(
+                        LiveSession, menu, profile, message.get("top_n", 10), projection, budget=budget
+                    )
+                    await websocket.send_json(session.snapshot())
+                elif kind == "profile":
+                    if session is None:
+                        raise ValueError("Send an init message first")
+                    await websocket.send_json(session.apply(message.get("delta") or {}))
+                else:
+                    raise ValueError(f"Unknown message type: {kind}")
+
+            except (ValueError, TypeError, AttributeError) as e:
+                # Invalid JSON, validation errors (pydantic), unknown fields...
+                await websocket.send_json({"type": "error", "detail": str(e)})
+
+    except WebSocketDisconnect:
+        pass
+
+
+def stored_profile(
+    mode: str, dietary_restriction: str, goal: str, allergens: str, strict_filter: bool
+) -> Optional[dict]:
+    if mode == "restaurant":
+        return None
+    return profile_from_form(dietary_restriction, goal, allergens, strict_filter)
+
+
+@app.get("/api/restaurants/{restaurant_name}")
+async def stored_restaurant(
+    restaurant_name: str,
+    mode: str = "restaurant",
+    dietary_restriction: str = "",
+    goal: str = "",
+    allergens: str = "",  # Comma-separated
+    strict_filter: bool = True
+):
+    """
+    Saved restaurant: restaurant data, menu, scored dishes and swap suggestions
+
+    Scores are read from storage (no recomputation) for the given profile
+    (mode "consumer") or the B2B scoring (mode "restaurant").
+    """
+
+    storage = get_storage()
+    if storage is None:
+        raise HTTPException(status_code=503, detail="Storage disabled (set STORAGE_PATH)")
+
+    profile = stored_profile(mode, dietary_restriction, goal, allergens, strict_filter)
+    restaurant = await run_in_threadpool(storage.restaurant, restaurant_name, profile)
+    if restaurant is None:
+        raise HTTPException(status_code=404, detail=f"Unknown restaurant: {restaurant_name}")
+    return {"success": True, **restaurant}
+
+
+@app.get("/api/dishes")
+async def stored_dishes(
+    mode: str = "restaurant",
+    dietary_restriction: str = "",
+    goal: str = "",
+    allergens: str = "",  # Comma-separated
+    strict_filter: bool = True,
+    restaurant: Optional[str] = None,
+    tag: Optional[str] = None,
+    exclude_allergens: str = "",  # Comma-separated
+    min_score: Optional[float] = None,
+    limit: int = 20,
+    offset: int = 0
+):
+    """
+    Saved scored dishes, best total score first (indexed reads, no recomputation)
+
+    - **mode** + profile fields: which saved scoring to read
+    - **restaurant** / **tag** / **exclude_allergens** / **min_score**: filters
+    """
+
+    storage = get_storage()
+    if storage is None:
+        raise HTTPException(status_code=503, detail="Storage disabled (set STORAGE_PATH)")
+    if limit <= 0 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be > 0 and offset >= 0")
+
+    dishes = await run_in_threadpool(
+        storage.top_dishes,
+        stored_profile(mode, dietary_restriction, goal, allergens, strict_filter),
+        restaurant=restaurant,
+        tag=tag,
+        exclude_allergens=[a.strip() for a in exclude_allergens.split(",") if a.strip()],
+        min_score=min_score,
+        limit=limit,
+        offset=offset,
+    )
+    return {"success": True, "count": len(dishes), "dishes": dishes}
+
+
+@app.get("/api/store/dishes")
+async def store_dishes(
+    tag: Optional[str] = None,
+    exclude_allergens: str = "",  # Comma-separated
+    limit: int = 20
+):
+    """
+    Read pre-scored dishes from the memory-mapped dish store
+
+    - **tag**: Only dishes with this dietary tag ("vegan", "vegetarian", ...)
+    - **exclude_allergens**: Comma-separated allergens to exclude
+    - **limit**: Number of dishes to return (best total score first)
+    """
+
+    if dish_store is None:
+        raise HTTPException(status_code=503, detail="Dish store not loaded (set DISH_STORE_PATH)")
+
+    if tag and tag not in dish_store.tag_vocab:
+        raise HTTPException(status_code=400, detail=f"Unknown tag: {tag}")
+
+    rows = dish_store.rows_with_tag(tag) if tag else range(len(dish_store))
+    allergens = [a.strip() for a in exclude_allergens.split(",") if a.strip()]
+    if allergens:
+        allowed = set(dish_store.rows_without_allergens(allergens))
+        rows = [i for i in rows if i in allowed]
+
+    totals = dish_store.column("total_score")
+    best = sorted(rows, key=lambda i: totals[i], reverse=True)[:limit]
+
+    return {
+        "success": True,
+        "count": len(best),
+        "dishes": [dish_store.row(i) for i in best]
+    }
+
+
 # ============================================================================
 # STARTUP MESSAGE
 # ============================================================================
 
 @app.on_event("startup")
 async def startup_event():
+    global dish_store, job_workers
+    dish_store = open_dish_store()
+
+    workers = job_workers_from_env()
+    if workers > 0:
+        job_workers = JobWorkerPool(get_job_queue().path, workers)
+        job_workers.start()
+
     print("\n" + "="*60)
     print("🚀 Plant-Based Menu Scoring API Started!")
     print("="*60)
     print("📖 API Docs: http://localhost:8000/docs")
     print("🔍 Health Check: http://localhost:8000/")
+    if not ocr_available():
+        print("⚡ Scoring-only mode: /api/extract-menu and /api/full-pipeline disabled")
+    if dish_store is not None:
+        print(f"📦 Dish store: {len(dish_store)} dishes ({dish_store.path})")
+    if get_storage() is not None:
+        print(f"🗄️  Storage: {get_storage().path}")
+        try:
+            get_geo_index().sync(get_storage())
+            print(f"🗺️  Geo index: {len(get_geo_index())} restaurants")
+        except sqlite3.Error:
+            logger.exception("Geo index build failed")
+    if job_workers is not None:
+        print(f"🧵 Job workers: {job_workers.workers} ({job_workers.path})")
     print("="*60 + "\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if job_workers is not None:
+        await run_in_threadpool(job_workers.stop)
+    if get_storage() is not None:
+        # Pending write-behind saves (scores of the last requests)
+        await run_in_threadpool(get_storage().flush, 10.0)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
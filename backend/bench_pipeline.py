@@ -0,0 +1,169 @@
+"""
+PIPELINE BENCHMARK (RECORD / REPLAY)
+====================================
+Benchmark bout en bout extraction (OCR Mistral + parsing Haiku, même chemin
+que extract_menu_from_image de l'API) + scoring, sur un corpus fixe d'images
+de menus, avec les appels amont enregistrés puis rejoués (upstream_replay.py).
+
+    # 1. Enregistrer une fois (appels réels, clés API nécessaires)
+    python bench_pipeline.py --record menus/2abdum.jpg
+
+    # 2. Rejouer autant que voulu (sans réseau ni clé), instantané...
+    python bench_pipeline.py --repeat 20 menus/2abdum.jpg
+    # ... ou avec les latences enregistrées
+    python bench_pipeline.py --latency 1 menus/2abdum.jpg
+
+Le résultat du premier menu est comparé à --expected (par défaut
+test_pipeline_results.json : profil vegan, mode consumer, top 10).
+
+Configuration:
+    UPSTREAM_FIXTURES  dossier des fixtures (défaut: fixtures/upstream)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+CONTENT_TYPES = {".pdf": "application/pdf"}
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_once(path: str, restaurant_name: str, mode: str, profile: dict, top_n: int) -> dict:
+    """Extraction + scoring d'un menu, au format de /api/full-pipeline"""
+    from clients import get_anthropic_client, get_mistral_client
+    from menu_extraction import document_from_upload, stream_menu_pages
+    from scoring_multi_resto import score_menu_for_consumer, score_menu_for_restaurant
+
+    with open(path, "rb") as f:
+        data = f.read()
+    content_type = CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), "image/jpeg")
+
+    timings = {}
+    started = time.perf_counter()
+    menu_data, restaurant_data = [], {}
+    for kind, payload in stream_menu_pages(
+        get_mistral_client(),
+        get_anthropic_client(),
+        [document_from_upload(data, content_type)],
+        restaurant_name,
+    ):
+        if kind == "dish":
+            menu_data.append(payload)
+        else:
+            restaurant_data = payload
+    timings["extraction_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if mode == "consumer":
+        scoring = score_menu_for_consumer(menu_data, profile, top_n)
+    else:
+        scoring = score_menu_for_restaurant(menu_data, top_n)
+    timings["scoring_s"] = time.perf_counter() - started
+
+    return {
+        "result": {"success": True, "restaurant": restaurant_data, "scoring": scoring, "mode": mode},
+        "timings": timings,
+    }
+
+
+def compare_with_expected(result: dict, expected: dict) -> list:
+    """Sections qui diffèrent du résultat de référence"""
+    restaurant = {k: v for k, v in result["restaurant"].items() if k != "pages"}
+    scoring = {k: v for k, v in result["scoring"].items() if k != "llm_info"}
+    expected_scoring = {k: v for k, v in expected.get("scoring", {}).items() if k != "llm_info"}
+
+    diffs = []
+    if restaurant != expected.get("restaurant"):
+        diffs.append("restaurant")
+    if scoring != expected_scoring:
+        diffs.append("scoring")
+    if result["mode"] != expected.get("mode"):
+        diffs.append("mode")
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction + scoring with recorded upstream calls")
+    parser.add_argument("images", nargs="+", help="Menu images / PDFs (the fixed corpus)")
+    parser.add_argument("--record", action="store_true", help="Call the real APIs and record fixtures")
+    parser.add_argument("--fixtures", help="Fixtures directory (default: UPSTREAM_FIXTURES)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Replay: factor applied to recorded latencies (0 = instant, 1 = real time)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per menu (replay only)")
+    parser.add_argument("--restaurant-name", default="Unknown Restaurant")
+    parser.add_argument("--mode", choices=["consumer", "restaurant"], default="consumer")
+    parser.add_argument("--diet", default="vegan")
+    parser.add_argument("--goal", default="")
+    parser.add_argument("--allergens", default="", help="Comma-separated")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--expected", default="test_pipeline_results.json",
+                        help="Reference result for the first menu ('' to skip)")
+    args = parser.parse_args()
+
+    # Avant tout import de clients / scoring_multi_resto (lu à l'import)
+    os.environ["UPSTREAM_MODE"] = "record" if args.record else "replay"
+    os.environ["UPSTREAM_LATENCY"] = str(args.latency)
+    if args.fixtures:
+        os.environ["UPSTREAM_FIXTURES"] = args.fixtures
+
+    from upstream_replay import FixtureMissingError, get_fixture_store
+
+    profile = {
+        "dietary_restriction": args.diet,
+        "goal": args.goal,
+        "allergens": [a.strip() for a in args.allergens.split(",") if a.strip()],
+        "strict_filter": True,
+    }
+    repeat = 1 if args.record else max(1, args.repeat)
+    store = get_fixture_store()
+
+    print(f"\n{'=' * 60}")
+    print(f"⏱️  PIPELINE BENCHMARK ({os.environ['UPSTREAM_MODE'].upper()}, fixtures: {store.path})")
+    print(f"{'=' * 60}\n")
+
+    totals = []
+    first_result = None
+    for path in args.images:
+        runs = []
+        for _ in range(repeat):
+            try:
+                run = run_once(path, args.restaurant_name, args.mode, profile, args.top_n)
+            except FixtureMissingError as e:
+                print(f"❌ {path}: {e.args[0]} (record it first with --record)")
+                sys.exit(1)
+            runs.append(run)
+            totals.append(run["timings"]["extraction_s"] + run["timings"]["scoring_s"])
+        if first_result is None:
+            first_result = runs[0]["result"]
+
+        extraction = [r["timings"]["extraction_s"] * 1000 for r in runs]
+        scoring = [r["timings"]["scoring_s"] * 1000 for r in runs]
+        dishes = len(runs[0]["result"]["restaurant"].get("menu", []))
+        print(f"📄 {path}: {dishes} dishes, {repeat} run(s)")
+        print(f"   extraction  median {statistics.median(extraction):8.1f} ms   max {max(extraction):8.1f} ms")
+        print(f"   scoring     median {statistics.median(scoring):8.1f} ms   max {max(scoring):8.1f} ms")
+
+    print(f"\n📊 End to end: {len(totals)} run(s), "
+          f"p50 {percentile(totals, 50) * 1000:.1f} ms, p95 {percentile(totals, 95) * 1000:.1f} ms")
+    print(f"🗂️  Fixtures: {store.stats()}")
+
+    if args.expected and os.path.exists(args.expected):
+        with open(args.expected, encoding="utf-8") as f:
+            expected = json.load(f)
+        diffs = compare_with_expected(first_result, expected)
+        if diffs:
+            print(f"❌ {args.images[0]} differs from {args.expected}: {', '.join(diffs)}")
+            sys.exit(1)
+        print(f"✅ {args.images[0]} matches {args.expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+IMPORT-TIME BUDGET CHECK
+========================
+Measure the cold import time of the scoring engine (and of the API in
+scoring-only mode) in fresh interpreters, and fail if it exceeds the budget.
+
+Usage:
+    python check_import_time.py
+    IMPORT_BUDGET_SCORING=0.2 IMPORT_BUDGET_API=0.8 python check_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+
+RUNS = 5
+
+# module -> (budget env var, default budget in seconds, extra env)
+CHECKS = {
+    "scoring_multi_resto": ("IMPORT_BUDGET_SCORING", 0.25, {}),
+    "api": ("IMPORT_BUDGET_API", 0.6, {"SCORING_ONLY": "1"}),
+}
+
+_SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure(module: str, extra_env: dict) -> float:
+    """Best-of-N cold import time, each run in a fresh interpreter"""
+    env = dict(os.environ, **extra_env)
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(module=module)],
+            cwd=here,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def main():
+    failed = False
+    for module, (env_var, default, extra_env) in CHECKS.items():
+        budget = float(os.getenv(env_var, default))
+        elapsed = measure(module, extra_env)
+        status = "✅" if elapsed <= budget else "❌"
+        failed |= elapsed > budget
+        print(f"{status} import {module}: {elapsed * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
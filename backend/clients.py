@@ -0,0 +1,85 @@
+"""
+UPSTREAM CLIENTS
+================
+Lazily built Mistral (OCR) and Anthropic (parsing) clients.
+
+The SDKs are only imported on first use, so scoring-only processes
+(SCORING_ONLY=1) boot without OCR credentials and without paying the
+`mistralai` / `anthropic` import cost.
+
+With UPSTREAM_MODE=record|replay the clients are wrapped to record their
+exchanges to fixtures or serve them back (see upstream_replay.py); replay
+needs no API keys and no SDK.
+"""
+
+import os
+import threading
+
+from upstream_replay import upstream_mode, wrap_client
+
+_lock = threading.Lock()
+_mistral_client = None
+_anthropic_client = None
+
+OCR_KEYS = ["MISTRAL_API_KEY", "ANTHROPIC_API_KEY"]
+
+
+class MissingCredentialsError(RuntimeError):
+    """Raised when an OCR endpoint is used without upstream API keys"""
+
+
+def scoring_only() -> bool:
+    """True when the process is configured to serve scoring endpoints only"""
+    return os.getenv("SCORING_ONLY", "").lower() in ("1", "true", "yes")
+
+
+def missing_ocr_keys() -> list:
+    if upstream_mode() == "replay":
+        return []
+    return [key for key in OCR_KEYS if not os.environ.get(key)]
+
+
+def ocr_available() -> bool:
+    return not scoring_only() and not missing_ocr_keys()
+
+
+def _require_ocr():
+    if scoring_only():
+        raise MissingCredentialsError("OCR disabled (SCORING_ONLY mode)")
+    missing = missing_ocr_keys()
+    if missing:
+        raise MissingCredentialsError(
+            f"Missing API keys in environment variables: {', '.join(missing)}"
+        )
+
+
+def get_mistral_client():
+    """Mistral client, imported and built on first call"""
+    global _mistral_client
+    if _mistral_client is None:
+        _require_ocr()
+        with _lock:
+            if _mistral_client is None:
+                client = None
+                if upstream_mode() != "replay":
+                    from mistralai import Mistral
+
+                    client = Mistral(api_key=os.environ["MISTRAL_API_KEY"])
+                _mistral_client = wrap_client("mistral", client)
+    return _mistral_client
+
+
+def get_anthropic_client():
+    """Anthropic client, imported and built on first call"""
+    global _anthropic_client
+    if _anthropic_client is None:
+        _require_ocr()
+        with _lock:
+            if _anthropic_client is None:
+                client = None
+                if upstream_mode() != "replay":
+                    from anthropic import Anthropic
+
+                    client = Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+                _anthropic_client = wrap_client("anthropic", client)
+    return _anthropic_client
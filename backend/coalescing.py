@@ -0,0 +1,86 @@
+"""
+REQUEST COALESCING
+==================
+Déduplication des requêtes identiques en cours : quand la même photo de menu
+est envoyée par plusieurs utilisateurs en même temps (ou qu'un client relance
+après un timeout), un seul OCR Mistral + parsing Haiku tourne, et toutes les
+requêtes reçoivent son résultat.
+
+- Clé : hash du contenu (octets des images + paramètres pour les uploads,
+  menu + profil + options pour /api/score-menu).
+- Le calcul tourne dans le threadpool (run_in_threadpool) comme une tâche
+  indépendante : si le client qui l'a lancé se déconnecte, les autres
+  requêtes attachées reçoivent quand même le résultat.
+- Seulement les calculs EN COURS : une fois terminé, la clé est libérée (les
+  résultats sont mis en cache ailleurs, voir llm_cache.py / ranking_store.py).
+- Le résultat est partagé tel quel entre les requêtes : ne pas le modifier.
+- Local au processus : derrière plusieurs workers, seules les requêtes
+  arrivées sur le même worker sont fusionnées.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional
+import asyncio
+import hashlib
+import json
+
+from starlette.concurrency import run_in_threadpool
+
+
+def upload_key(uploads: Iterable[tuple], **params) -> str:
+    """Clé d'un upload : sha256 des (octets, content_type) + paramètres de la requête"""
+    digest = hashlib.sha256()
+    for data, content_type in uploads:
+        digest.update(hashlib.sha256(data).digest())
+        digest.update((content_type or "").encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def payload_key(payload: Any) -> str:
+    """Clé d'une requête JSON (menu + profil + options) : sha256 du JSON canonique"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RequestCoalescer:
+    """clé → calcul en cours ; les appels concurrents avec la même clé l'attendent"""
+
+    def __init__(self):
+        self.started = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, fn: Callable, *args, **kwargs):
+        """Résultat de fn(*args, **kwargs), calculé une seule fois par clé en cours"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(run_in_threadpool(fn, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.coalesced += 1
+        # shield : l'annulation d'un appelant n'annule pas le calcul partagé
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Marque l'erreur comme lue si tous les appelants sont partis
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "started": self.started, "coalesced": self.coalesced}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+_COALESCER: Optional[RequestCoalescer] = None
+
+
+def get_coalescer() -> RequestCoalescer:
+    # Utilisé uniquement depuis la boucle asyncio : pas besoin de verrou
+    global _COALESCER
+    if _COALESCER is None:
+        _COALESCER = RequestCoalescer()
+    return _COALESCER
@@ -0,0 +1,47 @@
+"""
+PYTEST SETUP
+============
+Tests de non-régression du backend, sans réseau ni fichiers persistants :
+scoring seul (pas de clés OCR), pas de LLM, pas de cache ni de stockage SQLite.
+
+    cd backend && python -m pytest -q
+"""
+
+import json
+import os
+from pathlib import Path
+
+# Avant tout import de api / scoring_multi_resto (configuration lue à l'import)
+os.environ["SCORING_ONLY"] = "1"
+os.environ["BLACKBOX_API_KEY"] = ""
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["STORAGE_PATH"] = ""
+os.environ["JOB_WORKERS"] = "0"
+
+import pytest
+
+# Client manuel contre une URL ngrok déployée, pas un test automatisé
+collect_ignore = ["test_api.py"]
+
+TEST_RESULTS = Path(__file__).parent / "test_pipeline_results.json"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import api
+
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def menu():
+    """Menu extrait de test_pipeline_results.json (12 plats)"""
+    with open(TEST_RESULTS, encoding="utf-8") as f:
+        dishes = json.load(f)["restaurant"]["menu"]
+    for dish in dishes:
+        dish["price"] = float(dish.get("price") or 0)
+        dish.setdefault("description", "")
+        dish.setdefault("restaurant_name", "Test Restaurant")
+    return dishes
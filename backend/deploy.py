@@ -12,6 +12,8 @@ import requests
 from pathlib import Path
 from dotenv import load_dotenv
 
+from clients import missing_ocr_keys, scoring_only
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -138,9 +140,8 @@ def main():
     """Main deployment function"""
     print("\n🌱 PLANT-BASED MENU API DEPLOYMENT\n")
 
-    # Check API keys
-    required_keys = ["MISTRAL_API_KEY", "ANTHROPIC_API_KEY"]
-    missing_keys = [k for k in required_keys if not os.environ.get(k)]
+    # Check API keys (not needed for scoring-only deployments)
+    missing_keys = [] if scoring_only() else missing_ocr_keys()
 
     if missing_keys:
         print(f"❌ Missing environment variables: {', '.join(missing_keys)}")
@@ -148,6 +149,7 @@ def main():
         print("MISTRAL_API_KEY=your_key_here")
         print("ANTHROPIC_API_KEY=your_key_here")
         print("NGROK_AUTHTOKEN=your_token_here (optional)")
+        print("\nOr set SCORING_ONLY=1 to serve /api/score-menu without OCR")
         sys.exit(1)
 
     # Check dependencies
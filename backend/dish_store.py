@@ -0,0 +1,336 @@
+"""
+COLUMNAR DISH STORE
+===================
+Format disque colonnaire pour les plats enrichis et scorés, mappé en mémoire
+(mmap) au démarrage : toutes les workers partagent les mêmes pages via le
+page cache, sans copie par processus.
+
+Layout du fichier (little-endian) :
+    MAGIC (4 octets) | version u32 | header_len u32 | header JSON | colonnes
+
+Chaque colonne est alignée sur 8 octets :
+    - colonnes numériques à largeur fixe (carbone, coût, NOVA, nutri, sous-scores)
+    - colonnes bitmask (tags alimentaires, allergènes)
+    - tables de chaînes : offsets u32 (n + 1) + blob UTF-8
+
+Usage:
+    python dish_store.py build scoring_results_consumer.json dishes.nfds
+    python dish_store.py info dishes.nfds
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional
+import json
+import mmap
+import os
+import struct
+import sys
+
+from scoring_multi_resto import ALLERGEN_DB, ImprovedAnalyzer
+
+MAGIC = b"NFDS"
+VERSION = 1
+_ALIGN = 8
+
+NUTRI_GRADES = "ABCDE"
+
+# Vocabulaires des bitmasks (recopiés dans le header : le fichier reste lisible
+# même si les listes évoluent dans le moteur)
+TAG_VOCAB = list(ImprovedAnalyzer.DIETARY_TAGS) + ["pescatarian"]
+ALLERGEN_VOCAB = list(ALLERGEN_DB)
+
+# name -> typecode (array / memoryview.cast)
+NUMERIC_COLUMNS = {
+    "id": "q",
+    "price": "f",
+    "carbon_estimate": "f",
+    "estimated_cost": "f",
+    "nova_score": "B",
+    "nutriscore": "B",
+    "s_planet": "f",
+    "s_pleasure": "f",
+    "s_fit": "f",
+    "total_score": "f",
+    "rank_index": "I",
+    "dietary_tags": "I",
+    "allergens": "I",
+    "restaurant": "I",
+}
+
+STRING_COLUMNS = ["name", "description", "primary_protein"]
+
+# Table dédupliquée : un restaurant apparaît une fois, les plats y pointent
+RESTAURANT_TABLE = "restaurant_names"
+
+
+def _encode_mask(values: Iterable[str], vocab: List[str]) -> int:
+    mask = 0
+    for value in values:
+        if value in vocab:
+            mask |= 1 << vocab.index(value)
+    return mask
+
+
+def _decode_mask(mask: int, vocab: List[str]) -> List[str]:
+    return [value for i, value in enumerate(vocab) if mask & (1 << i)]
+
+
+def _pad(size: int) -> int:
+    return (-size) % _ALIGN
+
+
+# ============================================================================
+# WRITER
+# ============================================================================
+
+
+def write_dish_store(path: str, dishes: List[dict]) -> int:
+    """
+    Écrit une liste de plats scorés (ScoredDish.model_dump()) au format colonnaire
+
+    Args:
+        path: Fichier de sortie (écrit via un fichier temporaire puis renommé)
+        dishes: Plats tels que retournés dans results["scored_dishes"]
+
+    Returns:
+        Nombre de plats écrits
+    """
+    columns = {name: array(code) for name, code in NUMERIC_COLUMNS.items()}
+    strings: Dict[str, List[str]] = {name: [] for name in STRING_COLUMNS}
+    restaurants: List[str] = []
+    restaurant_index: Dict[str, int] = {}
+
+    for dish in dishes:
+        if hasattr(dish, "model_dump"):
+            dish = dish.model_dump()
+        enriched = dish.get("enriched_attributes", {})
+        sub = dish.get("sub_scores", {})
+        resto = dish.get("restaurant_name", "Unknown")
+        if resto not in restaurant_index:
+            restaurant_index[resto] = len(restaurants)
+            restaurants.append(resto)
+
+        columns["id"].append(int(dish["id"]))
+        columns["price"].append(float(dish.get("price") or 0.0))
+        columns["carbon_estimate"].append(float(enriched.get("carbon_estimate", 5.0)))
+        columns["estimated_cost"].append(float(enriched.get("estimated_cost", 0.0)))
+        columns["nova_score"].append(int(enriched.get("nova_score", 2)))
+        columns["nutriscore"].append(NUTRI_GRADES.index(enriched.get("nutriscore", "C")))
+        columns["s_planet"].append(float(sub.get("s_planet", 0.0)))
+        columns["s_pleasure"].append(float(sub.get("s_pleasure", 0.0)))
+        columns["s_fit"].append(float(sub.get("s_fit", 0.0)))
+        columns["total_score"].append(float(dish.get("total_score", 0.0)))
+        columns["rank_index"].append(int(dish.get("rank_index", 0)))
+        columns["dietary_tags"].append(
+            _encode_mask(enriched.get("dietary_tags", []), TAG_VOCAB)
+        )
+        columns["allergens"].append(
+            _encode_mask(enriched.get("allergens", []), ALLERGEN_VOCAB)
+        )
+        columns["restaurant"].append(restaurant_index[resto])
+
+        strings["name"].append(dish.get("name", ""))
+        strings["description"].append(dish.get("description", ""))
+        strings["primary_protein"].append(enriched.get("primary_protein") or "")
+
+    strings[RESTAURANT_TABLE] = restaurants
+
+    # Sérialisation des blocs (offsets relatifs à la zone de données)
+    blocks: List[bytes] = []
+    layout = {}
+    offset = 0
+
+    def add_block(key: str, data: bytes, **meta):
+        nonlocal offset
+        layout[key] = dict(offset=offset, nbytes=len(data), **meta)
+        blocks.append(data + b"\0" * _pad(len(data)))
+        offset += len(data) + _pad(len(data))
+
+    for name, values in columns.items():
+        add_block(name, values.tobytes(), typecode=values.typecode)
+
+    for name, values in strings.items():
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = array("I", [0])
+        for raw in encoded:
+            offsets.append(offsets[-1] + len(raw))
+        add_block(f"{name}.offsets", offsets.tobytes(), typecode="I")
+        add_block(f"{name}.data", b"".join(encoded), typecode="B")
+
+    header = json.dumps(
+        {
+            "rows": len(columns["id"]),
+            "tag_vocab": TAG_VOCAB,
+            "allergen_vocab": ALLERGEN_VOCAB,
+            "nutri_grades": NUTRI_GRADES,
+            "columns": layout,
+        }
+    ).encode("utf-8")
+    prefix = MAGIC + struct.pack("<II", VERSION, len(header)) + header
+    prefix += b"\0" * _pad(len(prefix))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+
+    return len(columns["id"])
+
+
+# ============================================================================
+# READER (MMAP, ZERO-COPY)
+# ============================================================================
+
+
+class DishStore:
+    """Vue en lecture seule sur un fichier colonnaire mappé en mémoire"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            # MAP_SHARED en lecture : pages partagées entre processus
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:4] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a dish store file: {path}")
+
+        version, header_len = struct.unpack_from("<II", self._mm, 4)
+        if version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported dish store version: {version}")
+
+        header_end = 12 + header_len
+        self.header = json.loads(self._mm[12:header_end])
+        self._data_start = header_end + _pad(header_end)
+        self._buffer = memoryview(self._mm)
+        self._views: Dict[str, memoryview] = {}
+
+        self.rows: int = self.header["rows"]
+        self.tag_vocab: List[str] = self.header["tag_vocab"]
+        self.allergen_vocab: List[str] = self.header["allergen_vocab"]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        self._buffer.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _view(self, key: str) -> memoryview:
+        if key not in self._views:
+            meta = self.header["columns"][key]
+            start = self._data_start + meta["offset"]
+            raw = self._buffer[start : start + meta["nbytes"]]
+            self._views[key] = raw.cast(meta["typecode"])
+        return self._views[key]
+
+    def column(self, name: str) -> memoryview:
+        """Colonne numérique brute (memoryview typée, sans copie)"""
+        if name not in NUMERIC_COLUMNS:
+            raise KeyError(name)
+        return self._view(name)
+
+    def string(self, name: str, index: int) -> str:
+        offsets = self._view(f"{name}.offsets")
+        data = self._view(f"{name}.data")
+        return bytes(data[offsets[index] : offsets[index + 1]]).decode("utf-8")
+
+    def restaurant_name(self, index: int) -> str:
+        return self.string(RESTAURANT_TABLE, self._view("restaurant")[index])
+
+    def tags(self, index: int) -> List[str]:
+        return _decode_mask(self._view("dietary_tags")[index], self.tag_vocab)
+
+    def allergens(self, index: int) -> List[str]:
+        return _decode_mask(self._view("allergens")[index], self.allergen_vocab)
+
+    def rows_with_tag(self, tag: str) -> List[int]:
+        bit = 1 << self.tag_vocab.index(tag)
+        return [i for i, mask in enumerate(self._view("dietary_tags")) if mask & bit]
+
+    def rows_without_allergens(self, allergens: List[str]) -> List[int]:
+        forbidden = _encode_mask(allergens, self.allergen_vocab)
+        return [
+            i for i, mask in enumerate(self._view("allergens")) if not mask & forbidden
+        ]
+
+    def row(self, index: int) -> dict:
+        """Reconstruit un plat au format ScoredDish (sans ingrédients détaillés)"""
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        col = self.column
+        protein = self.string("primary_protein", index)
+        return {
+            "id": col("id")[index],
+            "name": self.string("name", index),
+            "description": self.string("description", index),
+            "price": round(col("price")[index], 2),
+            "restaurant_name": self.restaurant_name(index),
+            "total_score": round(col("total_score")[index], 2),
+            "sub_scores": {
+                "s_planet": round(col("s_planet")[index], 2),
+                "s_pleasure": round(col("s_pleasure")[index], 2),
+                "s_fit": round(col("s_fit")[index], 2),
+            },
+            "rank_index": col("rank_index")[index],
+            "enriched_attributes": {
+                "nova_score": col("nova_score")[index],
+                "nutriscore": self.header["nutri_grades"][col("nutriscore")[index]],
+                "dietary_tags": self.tags(index),
+                "allergens": self.allergens(index),
+                "primary_protein": protein or None,
+                "carbon_estimate": round(col("carbon_estimate")[index], 3),
+                "estimated_cost": round(col("estimated_cost")[index], 2),
+            },
+        }
+
+
+def open_dish_store(path: Optional[str] = None) -> Optional[DishStore]:
+    """Ouvre le store désigné par DISH_STORE_PATH (None si absent)"""
+    path = path or os.getenv("DISH_STORE_PATH", "")
+    if not path or not os.path.exists(path):
+        return None
+    return DishStore(path)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("build", "info"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "build":
+        *inputs, output = sys.argv[2:]
+        dishes = []
+        for input_path in inputs:
+            with open(input_path, encoding="utf-8") as f:
+                results = json.load(f)
+            # Accepte la sortie de score_menu_* ou celle de /api/full-pipeline
+            results = results.get("scoring", results)
+            dishes.extend(results.get("scored_dishes", []))
+        count = write_dish_store(output, dishes)
+        print(f"✅ Wrote {count} dishes to {output}")
+    else:
+        with DishStore(sys.argv[2]) as store:
+            print(f"📦 {store.path}: {len(store)} dishes")
+            print(f"   Columns: {', '.join(store.header['columns'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+TRIGRAM FUZZY MATCHER
+=====================
+Index de trigrammes pour retrouver les ingrédients mal orthographiés ou
+abîmés par l'OCR ("scargots" → "escargots", "saumonn" → "saumon").
+
+Similarité de Jaccard sur les trigrammes complétés par des espaces
+(même convention que pg_trgm : deux espaces devant, un derrière). Les
+candidats viennent des listes de postings, donc le coût d'une requête dépend
+du nombre de termes partageant un trigramme, pas de la taille du lexique.
+
+Termes de plusieurs mots ("pomme de terre", "pois chiches") : le texte est
+découpé en fenêtres de 1 à MAX_WINDOW mots consécutifs, et une fenêtre de n
+mots n'est comparée qu'aux termes de n mots ("pome de tere" → "pomme de
+terre"). Les fenêtres longues passent d'abord ; un mot déjà couvert par une
+correspondance n'est plus cherché seul.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import re
+
+DEFAULT_THRESHOLD = 0.5
+MIN_TOKEN_LENGTH = 4
+# Termes de plus de MAX_WINDOW mots : jamais cherchés approximativement
+MAX_WINDOW = 3
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Index inversé trigramme → termes du lexique"""
+
+    def __init__(self, lexicon: Iterable[str], min_length: int = MIN_TOKEN_LENGTH):
+        self.min_length = min_length
+        self.terms: List[str] = [t for t in lexicon if len(t) >= min_length]
+        self._sizes: List[int] = []
+        self._words: List[int] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        for idx, term in enumerate(self.terms):
+            grams = trigrams(term)
+            self._sizes.append(len(grams))
+            self._words.append(len(term.split()))
+            for gram in grams:
+                self._postings[gram].append(idx)
+        self._postings = dict(self._postings)
+        self.max_words = min(max(self._words, default=1), MAX_WINDOW)
+
+    def search(
+        self,
+        word: str,
+        threshold: float = DEFAULT_THRESHOLD,
+        limit: int = 3,
+        words: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Termes dont la similarité avec `word` atteint le seuil, meilleurs d'abord
+        (words : seulement les termes de ce nombre de mots)
+        """
+        grams = trigrams(word)
+        overlap: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for idx in self._postings.get(gram, ()):
+                overlap[idx] += 1
+
+        results = []
+        for idx, common in overlap.items():
+            if words is not None and self._words[idx] != words:
+                continue
+            similarity = common / (len(grams) + self._sizes[idx] - common)
+            if similarity >= threshold:
+                results.append((self.terms[idx], similarity))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
+
+    def best_matches(
+        self, text: str, exclude: Iterable[str] = (), threshold: float = DEFAULT_THRESHOLD
+    ) -> List[str]:
+        """
+        Meilleur terme pour chaque mot (ou groupe de mots consécutifs) du texte
+
+        Les fenêtres déjà couvertes par une correspondance exacte (un terme de
+        `exclude` y apparaît) sont ignorées.
+        """
+        exclude = list(exclude)
+        words = _WORD_RE.findall(text)
+        covered = [False] * len(words)
+        # Mots d'une correspondance exacte ("saumon" couvre "saumonn", "pomme de terre" ses 3 mots)
+        for term in exclude:
+            parts = _WORD_RE.findall(term)
+            if not parts:
+                continue
+            for start in range(len(words) - len(parts) + 1):
+                if all(part in words[start + i] for i, part in enumerate(parts)):
+                    covered[start : start + len(parts)] = [True] * len(parts)
+        found = []
+        best: Dict[str, Optional[str]] = {}  # Fenêtres déjà cherchées (mots répétés)
+
+        for size in range(self.max_words, 0, -1):
+            for start in range(len(words) - size + 1):
+                if any(covered[start : start + size]):
+                    continue
+                window = " ".join(words[start : start + size])
+                if len(window) < self.min_length or any(term in window for term in exclude):
+                    continue
+                if window not in best:
+                    matches = self.search(window, threshold, limit=1, words=size)
+                    best[window] = matches[0][0] if matches else None
+                term = best[window]
+                if term is None:
+                    continue
+                covered[start : start + size] = [True] * size
+                if term not in found and term not in exclude:
+                    found.append(term)
+        return found
@@ -0,0 +1,313 @@
+"""
+GEO INDEX
+=========
+Index spatial en grille des restaurants : requêtes "dans un rayon de R
+mètres" et "k plus proches", pour ne scorer que les restaurants autour de
+l'utilisateur (MapPage).
+
+- Grille régulière en degrés (GEO_CELL_DEGREES, défaut 0.01° ≈ 1.1 km) :
+  une requête ne visite que les cellules qui recoupent la zone cherchée.
+- Distances en mètres (haversine).
+- Pas de gestion de l'antiméridien (inutile à l'échelle d'une ville).
+
+Un index par processus (get_geo_index), gardé entre les requêtes :
+- construit depuis les restaurants stockés (storage.py, colonnes lat/lng)
+  puis rafraîchi avant chaque requête avec les restaurants écrits depuis
+  (par ce processus ou un autre), lus par updated_at ;
+- complété par les coordonnées envoyées avec les menus (lat/lng des plats).
+
+Configuration :
+    GEO_CELL_DEGREES  taille d'une cellule en degrés (défaut: 0.01)
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import math
+import os
+import threading
+
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+DEFAULT_CELL_DEGREES = 0.01
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance orthodromique en mètres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_coordinates(lat: Optional[float], lon: Optional[float]) -> bool:
+    return (
+        lat is not None
+        and lon is not None
+        and -90.0 <= lat <= 90.0
+        and -180.0 <= lon <= 180.0
+    )
+
+
+class GeoGridIndex:
+    """Grille lat/lon → clés (noms de restaurants), avec rayon et k plus proches"""
+
+    def __init__(self, cell_degrees: Optional[float] = None):
+        self.cell = cell_degrees or float(os.getenv("GEO_CELL_DEGREES", DEFAULT_CELL_DEGREES))
+        self._cells: Dict[Tuple[int, int], List[Hashable]] = defaultdict(list)
+        self._points: Dict[Hashable, Tuple[float, float]] = {}
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def insert(self, key: Hashable, lat: float, lon: float):
+        """Ajoute (ou déplace) un point ; les coordonnées invalides sont ignorées"""
+        if not valid_coordinates(lat, lon):
+            return
+        if key in self._points:
+            if self._points[key] == (lat, lon):
+                return
+            self.remove(key)
+        self._points[key] = (lat, lon)
+        self._cells[self._cell_of(lat, lon)].append(key)
+
+    def remove(self, key: Hashable):
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell_of(*point)
+        self._cells[cell].remove(key)
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    @classmethod
+    def from_points(
+        cls, points: Iterable[Tuple[Hashable, float, float]], cell_degrees: Optional[float] = None
+    ) -> "GeoGridIndex":
+        index = cls(cell_degrees)
+        for key, lat, lon in points:
+            index.insert(key, lat, lon)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def point(self, key: Hashable) -> Optional[Tuple[float, float]]:
+        return self._points.get(key)
+
+    def _distances(
+        self, lat: float, lon: float, cells, accept: Optional[Callable[[Hashable], bool]] = None
+    ) -> List[Tuple[float, Hashable]]:
+        found = []
+        for cell in cells:
+            for key in self._cells.get(cell, ()):
+                if accept is not None and not accept(key):
+                    continue
+                plat, plon = self._points[key]
+                found.append((haversine_m(lat, lon, plat, plon), key))
+        return found
+
+    def within(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        accept: Optional[Callable[[Hashable], bool]] = None,
+    ) -> List[Tuple[float, Hashable]]:
+        """(distance_m, clé) des points à moins de radius_m, du plus proche au plus loin"""
+        dlat = radius_m / METERS_PER_DEGREE
+        # Au-delà de ~89°, un rayon couvre toutes les longitudes
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = min(180.0, dlat / cos_lat)
+
+        lat_min, lon_min = self._cell_of(lat - dlat, lon - dlon)
+        lat_max, lon_max = self._cell_of(lat + dlat, lon + dlon)
+
+        if (lat_max - lat_min + 1) * (lon_max - lon_min + 1) > len(self._cells):
+            # Rayon très large : moins coûteux de parcourir les cellules occupées
+            cells = [
+                c
+                for c in self._cells
+                if lat_min <= c[0] <= lat_max and lon_min <= c[1] <= lon_max
+            ]
+        else:
+            cells = [
+                (i, j) for i in range(lat_min, lat_max + 1) for j in range(lon_min, lon_max + 1)
+            ]
+
+        found = [hit for hit in self._distances(lat, lon, cells, accept) if hit[0] <= radius_m]
+        found.sort(key=lambda hit: hit[0])
+        return found
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        accept: Optional[Callable[[Hashable], bool]] = None,
+    ) -> List[Tuple[float, Hashable]]:
+        """k plus proches (distance_m, clé), par anneaux de cellules croissants"""
+        if k <= 0 or not self._points:
+            return []
+
+        ci, cj = self._cell_of(lat, lon)
+        # Plus petite dimension d'une cellule en mètres : borne inférieure de la
+        # distance aux cellules pas encore visitées
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        cell_m = self.cell * METERS_PER_DEGREE * min(1.0, cos_lat)
+
+        found: List[Tuple[float, Hashable]] = []
+        visited_cells = 0
+        ring = 0
+        while True:
+            if 8 * ring > len(self._cells):
+                # Points clairsemés/lointains : un anneau coûterait plus qu'un parcours complet
+                found = self._distances(lat, lon, list(self._cells), accept)
+                found.sort(key=lambda hit: hit[0])
+                break
+            if ring == 0:
+                cells = [(ci, cj)]
+            else:
+                cells = [
+                    (ci + di, cj + dj)
+                    for di in range(-ring, ring + 1)
+                    for dj in range(-ring, ring + 1)
+                    if max(abs(di), abs(dj)) == ring
+                ]
+            visited_cells += sum(1 for cell in cells if cell in self._cells)
+            found.extend(self._distances(lat, lon, cells, accept))
+
+            found.sort(key=lambda hit: hit[0])
+            if visited_cells == len(self._cells):
+                break
+            if len(found) >= k and found[k - 1][0] <= ring * cell_m:
+                break
+            ring += 1
+
+        return found[:k]
+
+
+class RestaurantGeoIndex:
+    """
+    Index des restaurants du processus (thread-safe) : restaurants stockés,
+    rafraîchis par updated_at, et coordonnées reçues avec les menus
+    """
+
+    def __init__(self, cell_degrees: Optional[float] = None):
+        self.grid = GeoGridIndex(cell_degrees)
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.grid)
+
+    def sync(self, storage) -> int:
+        """Ajoute les restaurants stockés écrits depuis la dernière lecture, renvoie leur nombre"""
+        if storage is None:
+            return 0
+        rows = storage.restaurant_coordinates(since=self._synced_at)
+        with self._lock:
+            for name, lat, lng, updated_at in rows:
+                self.grid.insert(name, lat, lng)
+                if self._synced_at is None or updated_at > self._synced_at:
+                    self._synced_at = updated_at
+        return len(rows)
+
+    def update(self, points: Iterable[Tuple[str, float, float]]):
+        with self._lock:
+            for name, lat, lng in points:
+                self.grid.insert(name, lat, lng)
+
+    def near(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: Optional[float] = None,
+        k: Optional[int] = None,
+        among: Optional[Set[str]] = None,
+    ) -> List[Tuple[float, str]]:
+        """
+        (distance_m, nom) des restaurants dans le rayon et/ou des k plus proches,
+        du plus proche au plus loin ; among limite la recherche à ces noms
+        """
+        accept = among.__contains__ if among is not None else None
+        with self._lock:
+            if among is not None and len(among) * 8 < len(self.grid):
+                # Quelques restaurants candidats dans un grand index : leurs
+                # coordonnées suffisent, sans parcourir de cellules
+                hits = []
+                for name in among:
+                    point = self.grid.point(name)
+                    if point is not None:
+                        hits.append((haversine_m(lat, lon, *point), name))
+                hits.sort(key=lambda hit: hit[0])
+                if radius_m is not None:
+                    hits = [hit for hit in hits if hit[0] <= radius_m]
+                return hits[:k] if k is not None else hits
+
+            if k is not None:
+                hits = self.grid.nearest(lat, lon, k, accept)
+                if radius_m is not None:
+                    hits = [hit for hit in hits if hit[0] <= radius_m]
+                return hits
+            return self.grid.within(lat, lon, radius_m, accept)
+
+
+_GEO_INDEX: Optional[RestaurantGeoIndex] = None
+_GEO_INDEX_LOCK = threading.Lock()
+
+
+def get_geo_index() -> RestaurantGeoIndex:
+    """Index du processus, construit au premier appel"""
+    global _GEO_INDEX
+    if _GEO_INDEX is None:
+        with _GEO_INDEX_LOCK:
+            if _GEO_INDEX is None:
+                _GEO_INDEX = RestaurantGeoIndex()
+    return _GEO_INDEX
+
+
+def select_nearby(
+    dishes: List[dict],
+    lat: float,
+    lon: float,
+    radius_m: Optional[float] = None,
+    k: Optional[int] = None,
+    index: Optional[RestaurantGeoIndex] = None,
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Garde, avant scoring, les plats des restaurants proches selon l'index
+
+    Les restaurants du menu sont cherchés par nom dans l'index (coordonnées
+    stockées, ou envoyées avec les plats en "lat"/"lng", qui sont ajoutées à
+    l'index). Avec radius_m et k, on garde les k plus proches dans le rayon.
+    Les restaurants sans coordonnées connues sont exclus.
+
+    Returns:
+        (plats retenus, [{"restaurant_name", "distance_m"}] du plus proche au plus loin)
+    """
+    if index is None:
+        index = get_geo_index()
+
+    names: Set[str] = set()
+    sent: Dict[str, Tuple[float, float]] = {}
+    for dish in dishes:
+        name = dish.get("restaurant_name", "Unknown")
+        names.add(name)
+        if name not in sent and valid_coordinates(dish.get("lat"), dish.get("lng")):
+            sent[name] = (dish["lat"], dish["lng"])
+    if sent:
+        index.update((name, plat, plon) for name, (plat, plon) in sent.items())
+
+    hits = index.near(lat, lon, radius_m=radius_m, k=k, among=names)
+
+    distances = {name: distance for distance, name in hits}
+    selected = [d for d in dishes if d.get("restaurant_name", "Unknown") in distances]
+    restaurants = [
+        {"restaurant_name": name, "distance_m": round(distance, 1)} for distance, name in hits
+    ]
+    return selected, restaurants
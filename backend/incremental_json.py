@@ -0,0 +1,111 @@
+"""
+INCREMENTAL MENU JSON PARSER
+============================
+Parse la sortie JSON du LLM au fil du streaming et émet chaque plat dès que
+son objet se ferme, sans attendre la fin de la réponse.
+
+Formats reconnus (mêmes que normalize_parsed_menu) :
+    {"name": ..., "menu": [{...}, {...}]}     → objets du premier tableau
+    {"dishes": [{...}]}                        (valeur d'une clé de premier niveau)
+    [{...}, {...}]                             → tableau de premier niveau
+
+Le texte éventuel avant le premier "{" / "[" (fences markdown) est ignoré.
+"""
+
+from typing import List, Optional
+import json
+
+
+class MenuStreamParser:
+    """Scanner JSON incrémental : feed(chunk) → plats complétés"""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._target_depth: Optional[int] = None
+        self._target_start: Optional[int] = None
+        self._object_start: Optional[int] = None
+        self.header: Optional[dict] = None
+        self.dishes: List[dict] = []
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Ajoute du texte et retourne les plats complétés par ce morceau"""
+        self.buffer += chunk
+        emitted = []
+        buf = self.buffer
+
+        for i in range(self._pos, len(buf)):
+            char = buf[i]
+
+            if self._root_start is None:
+                if char in "{[":
+                    self._root_start = i
+                else:
+                    continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+                depth = len(self._stack)
+                if char == "[" and self._target_depth is None and (
+                    depth == 1 or (depth == 2 and self._stack[0] == "{")
+                ):
+                    self._target_depth = depth
+                    self._target_start = i
+                elif char == "{" and depth - 1 == self._target_depth:
+                    self._object_start = i
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                depth = len(self._stack)
+                if (
+                    char == "}"
+                    and depth == self._target_depth
+                    and self._object_start is not None
+                ):
+                    dish = self._decode(buf[self._object_start : i + 1])
+                    self._object_start = None
+                    if dish is not None:
+                        if self.header is None:
+                            self.header = self._parse_header()
+                        self.dishes.append(dish)
+                        emitted.append(dish)
+                elif char == "]" and depth == self._target_depth - 1:
+                    # Fin du tableau de plats : plus rien à émettre
+                    self._target_depth = -1
+
+        self._pos = len(buf)
+        return emitted
+
+    @staticmethod
+    def _decode(text: str) -> Optional[dict]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
+
+    def _parse_header(self) -> dict:
+        """Champs de premier niveau écrits avant le tableau de plats (nom, type, adresse)"""
+        if self._root_start is None or self.buffer[self._root_start] != "{":
+            return {}
+        prefix = self.buffer[self._root_start : self._target_start + 1]
+        header = self._decode(prefix + "]}")
+        if not header:
+            return {}
+        return {k: v for k, v in header.items() if not isinstance(v, list)}
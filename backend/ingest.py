@@ -0,0 +1,272 @@
+"""
+BULK MENU INGESTION
+===================
+Ingest a whole directory (or manifest) of menu images:
+OCR (Mistral) → parsing (Claude Haiku) → one JSONL record per restaurant.
+
+- Bounded concurrency: separate worker pools for OCR and parsing; OCR jobs
+  are submitted through a window of 2 x ocr_workers, so Ctrl-C cancels
+  the paid calls that have not started yet (re-run to resume)
+- Checkpoints: the output JSONL is the checkpoint, already ingested images
+  are skipped when the command is re-run (failures are retried)
+- Throughput summary at the end of the run
+
+Usage:
+    python ingest.py menus/paris17/ -o paris17.jsonl
+    python ingest.py manifest.jsonl -o paris17.jsonl --ocr-workers 8 --parse-workers 4
+
+Manifest format: one image path per line, or one JSON object per line
+with {"image": "path/or/url", "restaurant_name": "..."}.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Set
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from clients import get_anthropic_client, get_mistral_client
+from menu_extraction import image_document_from_path, parse_menu_text, run_ocr
+
+load_dotenv()
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+
+
+# ============================================================================
+# INPUTS & CHECKPOINT
+# ============================================================================
+
+
+def load_jobs(source: str) -> List[Dict[str, str]]:
+    """List images to ingest from a directory or a manifest file"""
+    path = Path(source)
+
+    if path.is_dir():
+        images = sorted(
+            p for p in path.rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        return [{"image": str(p), "restaurant_name": p.stem} for p in images]
+
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                image = entry["image"]
+                name = entry.get("restaurant_name") or Path(image).stem
+            else:
+                image, name = line, Path(line).stem
+            # Relative paths in a manifest are relative to the manifest itself
+            if not image.startswith(("http://", "https://")) and not os.path.isabs(image):
+                image = str(path.parent / image)
+            jobs.append({"image": image, "restaurant_name": name})
+    return jobs
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Images already present in the output JSONL"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["source"])
+            except (json.JSONDecodeError, KeyError):
+                # Partial last line from an interrupted run: ignored, redone
+                continue
+    return done
+
+
+def append_jsonl(handle, record: dict):
+    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+
+def ingest(
+    jobs: List[Dict[str, str]],
+    output_path: str,
+    ocr_workers: int = 4,
+    parse_workers: int = 4,
+) -> dict:
+    """Run OCR + parsing over all jobs and append results to output_path"""
+    mistral_client = get_mistral_client()
+    anthropic_client = get_anthropic_client()
+
+    done = load_checkpoint(output_path)
+    pending = [job for job in jobs if job["image"] not in done]
+    errors_path = f"{output_path}.errors.jsonl"
+
+    stats = {
+        "total": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "ingested": 0,
+        "failed": 0,
+        "dishes": 0,
+        "ocr_seconds": 0.0,
+        "parse_seconds": 0.0,
+    }
+
+    print(f"📂 {len(jobs)} menus found, {stats['skipped']} already ingested")
+    if not pending:
+        return stats
+
+    def ocr_job(job):
+        start = time.perf_counter()
+        text = run_ocr(mistral_client, image_document_from_path(job["image"]))
+        return text, time.perf_counter() - start
+
+    def parse_job(job, ocr_text):
+        start = time.perf_counter()
+        menu_data, restaurant_data = parse_menu_text(
+            anthropic_client, ocr_text, job["restaurant_name"]
+        )
+        return menu_data, restaurant_data, time.perf_counter() - start
+
+    started = time.perf_counter()
+    queue = iter(pending)
+    ocr_window = 2 * ocr_workers
+
+    with ThreadPoolExecutor(ocr_workers) as ocr_pool, ThreadPoolExecutor(
+        parse_workers
+    ) as parse_pool, open(output_path, "a", encoding="utf-8") as out, open(
+        errors_path, "a", encoding="utf-8"
+    ) as err:
+        # future -> (stage, job, ocr_seconds)
+        in_flight = {}
+
+        def fill_ocr_window():
+            """Submit OCR jobs until ocr_window of them are queued or running"""
+            ocr_in_flight = sum(1 for stage, _, _ in in_flight.values() if stage == "ocr")
+            while ocr_in_flight < ocr_window:
+                job = next(queue, None)
+                if job is None:
+                    return
+                in_flight[ocr_pool.submit(ocr_job, job)] = ("ocr", job, 0.0)
+                ocr_in_flight += 1
+
+        try:
+            fill_ocr_window()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, job, ocr_seconds = in_flight.pop(future)
+
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        stats["failed"] += 1
+                        append_jsonl(
+                            err, {"source": job["image"], "stage": stage, "error": str(e)}
+                        )
+                        print(f"❌ [{stage}] {job['image']}: {e}")
+                        continue
+
+                    if stage == "ocr":
+                        ocr_text, ocr_seconds = result
+                        stats["ocr_seconds"] += ocr_seconds
+                        in_flight[parse_pool.submit(parse_job, job, ocr_text)] = (
+                            "parse",
+                            job,
+                            ocr_seconds,
+                        )
+                        continue
+
+                    menu_data, restaurant_data, parse_seconds = result
+                    stats["parse_seconds"] += parse_seconds
+                    stats["ingested"] += 1
+                    stats["dishes"] += len(menu_data)
+
+                    append_jsonl(
+                        out,
+                        {
+                            "source": job["image"],
+                            "restaurant": restaurant_data,
+                            "menu_items": menu_data,
+                            "count": len(menu_data),
+                            "timings": {
+                                "ocr_seconds": round(ocr_seconds, 3),
+                                "parse_seconds": round(parse_seconds, 3),
+                            },
+                        },
+                    )
+                    progress = stats["ingested"] + stats["failed"]
+                    print(
+                        f"✅ [{progress}/{len(pending)}] {restaurant_data.get('name', job['restaurant_name'])}: "
+                        f"{len(menu_data)} dishes"
+                    )
+                fill_ocr_window()
+        except KeyboardInterrupt:
+            # Don't pay for calls that have not started: only running ones finish
+            ocr_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+            print(f"\n⏹️ Interrupted: {stats['ingested']} ingested, re-run to resume")
+            raise
+
+    stats["elapsed_seconds"] = time.perf_counter() - started
+    return stats
+
+
+def print_summary(stats: dict):
+    elapsed = stats.get("elapsed_seconds", 0.0)
+    ingested = stats["ingested"]
+
+    print(f"\n{'=' * 60}")
+    print(f"📊 INGESTION SUMMARY")
+    print(f"{'=' * 60}")
+    print(f"   Menus found: {stats['total']}")
+    print(f"   Skipped (checkpoint): {stats['skipped']}")
+    print(f"   Ingested: {ingested}")
+    print(f"   Failed: {stats['failed']}")
+    print(f"   Dishes extracted: {stats['dishes']}")
+    if elapsed > 0:
+        print(f"   Wall time: {elapsed:.1f}s")
+        print(f"   Throughput: {ingested / elapsed * 60:.1f} menus/min")
+        print(f"   Dishes/s: {stats['dishes'] / elapsed:.2f}")
+    if ingested:
+        print(f"   Avg OCR: {stats['ocr_seconds'] / ingested:.2f}s/menu")
+        print(f"   Avg parsing: {stats['parse_seconds'] / ingested:.2f}s/menu")
+    print(f"{'=' * 60}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk menu image ingestion")
+    parser.add_argument("source", help="Directory of images or manifest file")
+    parser.add_argument(
+        "-o", "--output", default="restaurants.jsonl", help="Output JSONL (checkpoint)"
+    )
+    parser.add_argument("--ocr-workers", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.source)
+    if not jobs:
+        print(f"❌ No menu images found in {args.source}")
+        sys.exit(1)
+
+    stats = ingest(jobs, args.output, args.ocr_workers, args.parse_workers)
+    print_summary(stats)
+
+    if stats["failed"]:
+        print(f"⚠️ Failures logged to {args.output}.errors.jsonl (re-run to retry)")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+INGREDIENT DATABASE & INDEX
+===========================
+Base ingrédients extensible (Agribalyse, mercuriales...) avec index de
+recherche précompilé.
+
+La détection d'ingrédients dans le texte d'un plat se fait avec un automate
+Aho-Corasick : un seul passage sur le texte, quel que soit le nombre de clés
+(O(len(texte) + matches) au lieu de O(nb_clés × len(texte))).
+
+Datasets externes (INGREDIENT_DB_PATH) en CSV ou JSON, une ligne par ingrédient :
+    name          nom (obligatoire, mis en minuscules)
+    carbon        kg CO2e/kg
+    price         €/kg
+    nutriscore    1-5 ou lettre A-E
+    aliases       autres noms, séparés par "|" (optionnel)
+
+Les en-têtes Agribalyse usuels sont aussi reconnus (voir COLUMN_ALIASES).
+Les index sont construits sur les clés repliées (text_normalize.fold : casse,
+accents, ligatures) et interrogés avec le texte replié du plat ; ils renvoient
+la clé d'origine de la table (la clé "comté" trouve "Comté" comme "comte").
+Le passage approximatif (trigrammes) garde les accents (text_normalize.fold_case) :
+sans eux, "pâté" ressemblerait assez à "pâtes" pour être pris pour des pâtes.
+L'index compilé est mis en cache dans "<dataset>.idx" (pickle) et reconstruit
+si le dataset ou les bases intégrées changent.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+import csv
+import hashlib
+import json
+import os
+import pickle
+
+from fuzzy_match import TrigramIndex
+from text_normalize import fold, fold_case
+
+INDEX_VERSION = 5
+
+COLUMN_ALIASES = {
+    "name": ["name", "ingredient", "nom", "Nom du Produit en Français", "LIB_ALIM"],
+    "carbon": [
+        "carbon",
+        "co2",
+        "co2_kg",
+        "Changement climatique",
+        "Changement climatique (kg CO2 eq/kg de produit)",
+    ],
+    "price": ["price", "prix", "price_kg"],
+    "nutriscore": ["nutriscore", "nutri_score", "nutri"],
+    "aliases": ["aliases", "synonymes"],
+}
+
+_NUTRI_LETTERS = {"A": 5, "B": 4, "C": 3, "D": 2, "E": 1}
+
+
+# ============================================================================
+# AHO-CORASICK
+# ============================================================================
+
+
+class KeywordAutomaton:
+    """Automate Aho-Corasick : trouve toutes les clés présentes (sous-chaînes) d'un texte"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for idx, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(idx)
+
+        # Liens d'échec en largeur
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        """Indices des clés présentes dans le texte"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def find_keywords(self, text: str) -> List[str]:
+        """Clés présentes dans le texte, dans l'ordre de la liste d'origine"""
+        return [self.keywords[i] for i in sorted(self.find(text))]
+
+
+# ============================================================================
+# DATASET LOADING
+# ============================================================================
+
+
+def _pick(row: dict, field: str):
+    for column in COLUMN_ALIASES[field]:
+        value = row.get(column)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _to_nutri(value) -> Optional[int]:
+    if value is None:
+        return None
+    letter = str(value).strip().upper()
+    if letter in _NUTRI_LETTERS:
+        return _NUTRI_LETTERS[letter]
+    number = _to_float(value)
+    return int(number) if number is not None and 1 <= number <= 5 else None
+
+
+def read_dataset(path: str) -> List[dict]:
+    """Lit un dataset CSV/JSON en lignes normalisées {name, carbon, price, nutriscore, aliases}"""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        if isinstance(raw, dict):
+            # {"beef": {"carbon": 28.0, ...}, ...}
+            raw = [dict(values, name=name) for name, values in raw.items()]
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            raw = list(csv.DictReader(f, dialect=dialect))
+
+    rows = []
+    for row in raw:
+        name = _pick(row, "name")
+        if not name:
+            continue
+        aliases = _pick(row, "aliases") or []
+        if isinstance(aliases, str):
+            aliases = aliases.split("|")
+        rows.append(
+            {
+                "name": str(name).strip().lower(),
+                "carbon": _to_float(_pick(row, "carbon")),
+                "price": _to_float(_pick(row, "price")),
+                "nutriscore": _to_nutri(_pick(row, "nutriscore")),
+                "aliases": [a.strip().lower() for a in aliases if a.strip()],
+            }
+        )
+    return rows
+
+
+# ============================================================================
+# DATABASE
+# ============================================================================
+
+
+class IngredientDatabase:
+    """Tables carbone / prix / Nutri-Score + index compilés (exact et trigrammes) sur les clés carbone"""
+
+    def __init__(
+        self,
+        carbon: Dict[str, float],
+        price: Dict[str, float],
+        nutriscore: Dict[str, int],
+    ):
+        self.carbon = carbon
+        self.price = price
+        self.nutriscore = nutriscore
+
+        # Forme repliée → première clé de la table (les variantes accentuées fusionnent)
+        self.folded_keys: Dict[str, str] = {}
+        for key in carbon:
+            self.folded_keys.setdefault(fold(key), key)
+
+        self.carbon_index = KeywordAutomaton(self.folded_keys)
+
+        # Trigrammes sensibles aux accents (casse et ligatures repliées seulement)
+        self.cased_keys: Dict[str, str] = {}
+        for key in carbon:
+            self.cased_keys.setdefault(fold_case(key), key)
+        self.fuzzy_index = TrigramIndex(self.cased_keys)
+
+        # Recherches de valeurs sur la forme repliée (noms d'ingrédients du LLM compris)
+        self._folded_carbon = _fold_table(carbon)
+        self._folded_price = _fold_table(price)
+        self._folded_nutriscore = _fold_table(nutriscore)
+
+    def match(self, text: str) -> List[str]:
+        """Ingrédients (clés de la table carbone) présents dans le texte replié, ordre de la table"""
+        return [self.folded_keys[key] for key in self.carbon_index.find_keywords(text)]
+
+    def fuzzy_match(self, text: str, exact: List[str]) -> List[str]:
+        """
+        Second passage approximatif (trigrammes) pour les mots non reconnus
+
+        `text` est le texte du plat non replié : les accents comptent ici.
+        """
+        matches = self.fuzzy_index.best_matches(
+            fold_case(text), exclude=[fold_case(key) for key in exact]
+        )
+        return [self.cased_keys[key] for key in matches]
+
+    def carbon_of(self, ingredient: str, default: float = 5.0) -> float:
+        return self._folded_carbon.get(fold(ingredient), default)
+
+    def price_of(self, ingredient: str, default: float = 10.0) -> float:
+        return self._folded_price.get(fold(ingredient), default)
+
+    def nutriscore_of(self, ingredient: str, default: int = 3) -> int:
+        return self._folded_nutriscore.get(fold(ingredient), default)
+
+    def __len__(self) -> int:
+        return len(self.carbon)
+
+    @classmethod
+    def load(
+        cls,
+        carbon: Dict[str, float],
+        price: Dict[str, float],
+        nutriscore: Dict[str, int],
+        dataset_path: Optional[str] = None,
+    ) -> "IngredientDatabase":
+        """
+        Bases intégrées + dataset externe optionnel (les valeurs intégrées,
+        curées à la main, restent prioritaires)
+        """
+        if not dataset_path:
+            return cls(carbon, price, nutriscore)
+
+        cache_path = f"{dataset_path}.idx"
+        cache_key = _cache_key(dataset_path, carbon, price, nutriscore)
+
+        cached = _read_cache(cache_path, cache_key)
+        if cached is not None:
+            return cached
+
+        merged_carbon, merged_price, merged_nutri = dict(carbon), dict(price), dict(nutriscore)
+        for row in read_dataset(dataset_path):
+            for name in [row["name"]] + row["aliases"]:
+                if row["carbon"] is not None:
+                    merged_carbon.setdefault(name, row["carbon"])
+                if row["price"] is not None:
+                    merged_price.setdefault(name, row["price"])
+                if row["nutriscore"] is not None:
+                    merged_nutri.setdefault(name, row["nutriscore"])
+
+        db = cls(merged_carbon, merged_price, merged_nutri)
+        _write_cache(cache_path, cache_key, db)
+        return db
+
+
+def _fold_table(table: Dict[str, float]) -> Dict[str, float]:
+    """Table indexée par forme repliée (la première variante gagne, bases intégrées d'abord)"""
+    folded: Dict[str, float] = {}
+    for key, value in table.items():
+        folded.setdefault(fold(key), value)
+    return folded
+
+
+def _cache_key(dataset_path: str, *tables: dict) -> str:
+    digest = hashlib.sha256(f"v{INDEX_VERSION}".encode())
+    with open(dataset_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    for table in tables:
+        digest.update(json.dumps(table, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_cache(cache_path: str, cache_key: str) -> Optional[IngredientDatabase]:
+    try:
+        with open(cache_path, "rb") as f:
+            key, db = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+        return None
+    return db if key == cache_key else None
+
+
+def _write_cache(cache_path: str, cache_key: str, db: IngredientDatabase):
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((cache_key, db), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Read-only dataset directory: the index is simply rebuilt next time
+        pass
@@ -0,0 +1,113 @@
+"""
+ENRICHMENT INTERNING
+====================
+Déduplication des plats identiques entre restaurants ("Frites", "Tiramisu",
+"Salade César"... apparaissent des centaines de fois dans un dataset ville).
+
+- Un même texte de plat (nom + description en minuscules + prix) correspond à un seul
+  enregistrement d'enrichissement partagé : il n'est calculé qu'une fois.
+- Les chaînes répétées (ingrédients, tags, allergènes, mots-clés) sont
+  internées avec sys.intern : une seule copie en mémoire.
+- Les enregistrements partagés sont figés (frozen) : ne jamais les modifier.
+
+Seuls les enrichissements reproductibles sont internés : un repli sur les
+règles dû à une cause passagère (budget épuisé, disjoncteur, timeout) n'est
+pas mémorisé, pour que le plat suivant retente le LLM.
+
+Configuration :
+    ENRICHMENT_INTERN_MAX  nombre max d'enregistrements gardés (LRU, défaut: 50 000, 0 pour désactiver)
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+import os
+import sys
+import threading
+
+DEFAULT_MAX_ITEMS = 50_000
+
+# Raisons de repli reproductibles (même entrée → même résultat)
+STABLE_FALLBACKS = (None, "disabled", "low_confidence")
+
+
+def dish_key(name: str, description: str, price) -> Tuple[str, str, Optional[float]]:
+    """
+    Clé de contenu d'un plat : le texte tel que le voient les règles (minuscules)
+    et le prix, qui entre dans le coût estimé
+    """
+    return (
+        (name or "").lower(),
+        (description or "").lower(),
+        float(price) if price is not None else None,
+    )
+
+
+def intern_strings(values: Iterable[str]) -> List[str]:
+    return [sys.intern(v) for v in values]
+
+
+def intern_keys(mapping: Dict[str, Any]) -> Dict[str, Any]:
+    return {sys.intern(k): v for k, v in mapping.items()}
+
+
+class EnrichmentInterner:
+    """Table LRU thread-safe : clé de contenu → (enregistrement partagé, raison de repli)"""
+
+    def __init__(self, max_items: int = DEFAULT_MAX_ITEMS):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._records: "OrderedDict[Hashable, Tuple[Any, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, Optional[str]]]:
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._records.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, record, fallback_reason: Optional[str] = None):
+        """Mémorise un enregistrement (ignoré si le repli n'est pas reproductible)"""
+        if fallback_reason not in STABLE_FALLBACKS:
+            return record
+        with self._lock:
+            # Un autre thread a pu calculer le même plat entre-temps : garder le premier
+            existing = self._records.get(key)
+            if existing is not None:
+                return existing[0]
+            self._records[key] = (record, fallback_reason)
+            if len(self._records) > self.max_items:
+                self._records.popitem(last=False)
+        return record
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {"records": len(self._records), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+_INTERNER: Optional[EnrichmentInterner] = None
+_INTERNER_LOCK = threading.Lock()
+
+
+def get_enrichment_interner() -> Optional[EnrichmentInterner]:
+    """Table du processus (None si désactivée avec ENRICHMENT_INTERN_MAX=0)"""
+    global _INTERNER
+    if _INTERNER is None:
+        max_items = int(os.getenv("ENRICHMENT_INTERN_MAX", DEFAULT_MAX_ITEMS))
+        if max_items <= 0:
+            return None
+        with _INTERNER_LOCK:
+            if _INTERNER is None:
+                _INTERNER = EnrichmentInterner(max_items)
+    return _INTERNER
@@ -0,0 +1,473 @@
+"""
+JOB QUEUE
+=========
+File de jobs locale pour le travail long (OCR + parsing LLM + scoring) :
+le client soumet un job, reçoit un job_id tout de suite, puis interroge
+(/api/jobs/{id}) ou s'abonne (/api/jobs/{id}/events, SSE) pour le statut et
+le résultat. Plus de timeouts proxy/ngrok sur les gros menus.
+
+- Persistée dans SQLite (WAL) : les jobs en attente survivent à un redémarrage.
+- Priorités : le job en attente de plus haute priorité passe d'abord (puis le
+  plus ancien) ; un scoring seul passe devant l'ingestion en masse. Bornées à
+  [PRIORITY_LOW, PRIORITY_HIGH] : un client ne peut pas passer devant tout le monde.
+- Workers = processus séparés (multiprocessing, spawn) : le scoring et le
+  parsing ne bloquent ni la boucle asyncio ni le GIL de l'API. La prise d'un
+  job est atomique (BEGIN IMMEDIATE), plusieurs workers/serveurs peuvent
+  partager le même fichier.
+- Heartbeat : un job "running" dont le worker ne donne plus signe de vie
+  (crash, redémarrage) est remis en attente, au plus JOB_MAX_ATTEMPTS fois.
+- Un résultat non sérialisable fait échouer le job, pas le worker ; le pool
+  remplace les processus workers morts.
+- Handlers référencés par chemin "module:fonction" (importables dans un
+  processus spawn) : handler(payload: dict, uploads: [(bytes, content_type)]) -> dict.
+- Les jobs terminés sont gardés JOB_RETENTION secondes puis supprimés.
+
+Workers à part (recommandé), ou lancés par l'API au démarrage si JOB_WORKERS > 0 :
+    python job_queue.py --workers 4
+
+Configuration :
+    JOB_QUEUE_PATH     fichier SQLite (défaut: jobs.sqlite3)
+    JOB_WORKERS        nombre de processus workers lancés par l'API (défaut: 0, aucun :
+                       pas de processus en plus au démarrage de chaque worker uvicorn)
+    JOB_MAX_ATTEMPTS   tentatives max d'un job dont le worker a disparu (défaut: 3)
+    JOB_RETENTION      durée de conservation des jobs terminés en secondes (défaut: 1 jour)
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = "jobs.sqlite3"
+DEFAULT_WORKERS = 0  # Lancés par l'API (opt-in)
+DEFAULT_CLI_WORKERS = 2  # python job_queue.py
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETENTION = 24 * 3600
+
+PRIORITY_HIGH = 10  # Scoring seul (quelques secondes)
+PRIORITY_NORMAL = 5  # Pipeline complet d'un menu
+PRIORITY_LOW = 0  # Ingestion en masse
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+HEARTBEAT_INTERVAL = 5.0
+# Un job "running" sans heartbeat depuis ce délai est considéré comme perdu
+STALE_AFTER = 6 * HEARTBEAT_INTERVAL
+POLL_INTERVAL = 0.5
+# Fréquence de vérification des processus workers (remplacement des morts)
+SUPERVISE_INTERVAL = 2.0
+
+# Purge des jobs terminés toutes les N soumissions
+_PURGE_EVERY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    handler TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    content_type TEXT,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+"""
+
+
+def clamp_priority(priority: int) -> int:
+    """Priorité bornée à [PRIORITY_LOW, PRIORITY_HIGH]"""
+    return min(max(int(priority), PRIORITY_LOW), PRIORITY_HIGH)
+
+
+def resolve_handler(path: str):
+    """"module:fonction" → fonction"""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+class JobQueue:
+    """Jobs persistés dans SQLite, sûr entre threads et processus"""
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retention: float = DEFAULT_RETENTION,
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._local = threading.local()
+        self._submits = 0
+
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par thread, recréée après un fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ------------------------------------------------------------------
+    # Côté API
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        kind: str,
+        handler: str,
+        payload: dict,
+        uploads: Optional[List[tuple]] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> str:
+        """Met un job en attente et renvoie son job_id (priorité bornée, voir clamp_priority)"""
+        priority = clamp_priority(priority)
+        job_id = secrets.token_urlsafe(12)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, handler, priority, status, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, handler, priority, QUEUED, json.dumps(payload), time.time()),
+            )
+            conn.executemany(
+                "INSERT INTO job_files (job_id, position, content_type, data) VALUES (?, ?, ?, ?)",
+                [
+                    (job_id, i, content_type, data)
+                    for i, (data, content_type) in enumerate(uploads or [])
+                ],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._submits += 1
+        if self._submits % _PURGE_EVERY == 0:
+            self.purge()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Statut public d'un job (résultat si terminé, position si en attente)"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, kind, priority, status, result, error, attempts, created_at, "
+            "started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "priority": row["priority"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["status"] == QUEUED:
+            job["queue_position"] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND "
+                "(priority > ? OR (priority = ? AND created_at < ?))",
+                (QUEUED, row["priority"], row["priority"], row["created_at"]),
+            ).fetchone()[0]
+        if row["status"] == DONE:
+            job["result"] = json.loads(row["result"])
+        if row["status"] == FAILED:
+            job["error"] = row["error"]
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def purge(self):
+        """Supprime les jobs terminés depuis plus de `retention` secondes"""
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (*FINISHED, time.time() - self.retention),
+        )
+        # Fichiers des jobs abandonnés ("Worker lost") ou supprimés
+        conn.execute(
+            "DELETE FROM job_files WHERE job_id NOT IN "
+            "(SELECT id FROM jobs WHERE status IN (?, ?))",
+            (QUEUED, RUNNING),
+        )
+
+    # ------------------------------------------------------------------
+    # Côté worker
+    # ------------------------------------------------------------------
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """Prend atomiquement le prochain job (priorité, puis ancienneté)"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs de workers disparus : remis en attente, ou abandonnés
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL "
+                "WHERE status = ? AND heartbeat_at < ? AND attempts < ?",
+                (QUEUED, RUNNING, now - STALE_AFTER, self.max_attempts),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Worker lost', finished_at = ? "
+                "WHERE status = ? AND heartbeat_at < ?",
+                (FAILED, now, RUNNING, now - STALE_AFTER),
+            )
+            row = conn.execute(
+                "SELECT id, kind, handler, payload FROM jobs WHERE status = ? "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                    (RUNNING, worker, now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        uploads = [
+            (data, content_type)
+            for content_type, data in conn.execute(
+                "SELECT content_type, data FROM job_files WHERE job_id = ? ORDER BY position",
+                (row["id"],),
+            )
+        ]
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "handler": row["handler"],
+            "payload": json.loads(row["payload"]),
+            "uploads": uploads,
+        }
+
+    def heartbeat(self, job_id: str, worker: str):
+        self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time(), job_id, worker, RUNNING),
+        )
+
+    def finish(self, job_id: str, worker: str, result: Optional[dict] = None, error: Optional[str] = None):
+        """
+        Enregistre le résultat (ou l'erreur) ; ignoré si le job a été repris par un
+        autre worker. TypeError/ValueError si le résultat n'est pas sérialisable.
+        """
+        encoded = json.dumps(result, ensure_ascii=False) if error is None else None
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (
+                    FAILED if error is not None else DONE,
+                    encoded,
+                    error,
+                    time.time(),
+                    job_id,
+                    worker,
+                    RUNNING,
+                ),
+            ).rowcount
+            if updated:
+                conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def run(self, job: dict, worker: str):
+        """Exécute un job pris avec claim(), avec heartbeat pendant le calcul"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                self.heartbeat(job["job_id"], worker)
+
+        beater = threading.Thread(target=beat, daemon=True)
+        beater.start()
+        try:
+            result = resolve_handler(job["handler"])(job["payload"], job["uploads"])
+        except Exception as e:
+            # HTTPException (api.py) porte son message dans .detail
+            self.finish(job["job_id"], worker, error=str(getattr(e, "detail", e)))
+        else:
+            try:
+                self.finish(job["job_id"], worker, result=result)
+            except (TypeError, ValueError) as e:
+                self.finish(job["job_id"], worker, error=f"Result is not JSON serializable: {e}")
+        finally:
+            stop.set()
+            beater.join()
+
+
+# ============================================================================
+# WORKERS (PROCESSUS)
+# ============================================================================
+
+
+def _worker_main(path: str, name: str, stop):
+    # Ctrl-C arrive à tout le groupe de processus : l'arrêt passe par `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    queue = JobQueue(path)
+    while not stop.is_set():
+        try:
+            job = queue.claim(name)
+            if job is None:
+                stop.wait(POLL_INTERVAL)
+                continue
+            queue.run(job, name)
+        except sqlite3.Error as e:
+            # Base verrouillée trop longtemps, disque plein... : le job éventuel
+            # sera repris via le heartbeat, le worker continue
+            print(f"⚠️ Job worker {name}: {e}")
+            stop.wait(POLL_INTERVAL)
+
+
+class JobWorkerPool:
+    """N processus qui consomment la file"""
+
+    def __init__(self, path: str, workers: int = DEFAULT_WORKERS):
+        self.path = path
+        self.workers = workers
+        # spawn : pas de fork d'un processus qui a déjà des threads/connexions
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._processes: List[multiprocessing.Process] = []
+        self._supervisor: Optional[threading.Thread] = None
+        self.restarts = 0
+
+    def _spawn(self, i: int) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.path, f"{socket.gethostname()}-{os.getpid()}-{i}", self._stop),
+            name=f"job-worker-{i}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self):
+        self._processes = [self._spawn(i) for i in range(self.workers)]
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor.start()
+
+    def replace_dead(self) -> int:
+        """Relance les processus workers morts, renvoie leur nombre"""
+        replaced = 0
+        for i, process in enumerate(self._processes):
+            if self._stop.is_set():
+                break
+            if not process.is_alive():
+                print(f"⚠️ Job worker {process.name} died (exit code {process.exitcode}), restarting")
+                self._processes[i] = self._spawn(i)
+                replaced += 1
+        self.restarts += replaced
+        return replaced
+
+    def _supervise(self):
+        while not self._stop.wait(SUPERVISE_INTERVAL):
+            self.replace_dead()
+
+    def stop(self, timeout: float = 10.0):
+        """Arrêt propre : les jobs en cours se terminent (ou sont repris au redémarrage)"""
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+            self._supervisor = None
+        deadline = time.time() + timeout
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def __len__(self) -> int:
+        return sum(p.is_alive() for p in self._processes)
+
+
+_QUEUE: Optional[JobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        with _QUEUE_LOCK:
+            if _QUEUE is None:
+                _QUEUE = JobQueue(
+                    os.getenv("JOB_QUEUE_PATH", DEFAULT_PATH),
+                    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+                    retention=float(os.getenv("JOB_RETENTION", DEFAULT_RETENTION)),
+                )
+    return _QUEUE
+
+
+def job_workers_from_env() -> int:
+    return int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--workers", type=int, default=job_workers_from_env() or DEFAULT_CLI_WORKERS)
+    parser.add_argument("--path", default=os.getenv("JOB_QUEUE_PATH", DEFAULT_PATH))
+    args = parser.parse_args()
+
+    queue = JobQueue(args.path)
+    print(f"🧵 {args.workers} job workers on {args.path} ({queue.counts()})")
+    pool = JobWorkerPool(args.path, args.workers)
+    pool.start()
+    try:
+        # Les workers morts sont relancés par le pool : on tourne jusqu'à Ctrl-C
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping workers (running jobs finish first)...")
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
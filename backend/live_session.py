@@ -0,0 +1,209 @@
+"""
+LIVE RESCORING SESSION
+======================
+Session WebSocket (/ws/rescore) pour le SettingsModal : le menu est enrichi
+une seule fois à l'ouverture et gardé côté serveur ; chaque changement de
+profil (un allergène, une restriction) ne renvoie que ce qui bouge dans le top N,
+au lieu d'un /api/score-menu complet avec tout le menu.
+
+- Enrichissement, score planète et score plaisir ne dépendent pas du profil :
+  calculés à l'ouverture. Un changement de profil ne recalcule que le fit
+  (ProfileMatcher) et les totaux.
+- Classement identique à /api/score-menu (mêmes totaux arrondis, tri stable
+  dans l'ordre du menu, plats incompatibles filtrés).
+- Diff : plats qui entrent dans le top N (complets, projetés comme demandé),
+  ids qui en sortent, plats restés dont le rang, le score ou le commentaire change.
+
+Protocole (messages JSON) :
+    → {"type": "init", "menu_data": [...], "user_profile": {...}, "top_n": 10,
+       "response_profile": "compact", "fields": [...]}
+    ← {"type": "snapshot", "version": 0, "scored_dishes": [...], ...}
+    → {"type": "profile", "delta": {"add_allergens": ["gluten"]}}
+    ← {"type": "diff", "version": 1, "entered": [...], "left": [ids], "updated": [...], "order": [ids]}
+
+Deltas de profil : dietary_restriction, goal, allergens (remplace la liste),
+add_allergens, remove_allergens, strict_filter, top_n.
+"""
+
+from array import array
+from typing import Dict, List, Optional
+
+from scoring_multi_resto import ImprovedScorer, ProfileMatcher, project_dish
+
+PROFILE_DELTA_KEYS = {
+    "dietary_restriction",
+    "goal",
+    "allergens",
+    "add_allergens",
+    "remove_allergens",
+    "strict_filter",
+    "top_n",
+}
+
+DEFAULT_PROFILE = {
+    "dietary_restriction": "",
+    "goal": "",
+    "allergens": [],
+    "strict_filter": True,
+}
+
+
+def _allergen_list(value, key: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(a, str) for a in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return [a.strip() for a in value if a.strip()]
+
+
+class LiveSession:
+    """Menu enrichi une fois + top N courant, rescoré à chaque delta de profil"""
+
+    def __init__(
+        self,
+        menu: List[dict],
+        profile: Optional[dict] = None,
+        top_n: int = 10,
+        projection: Optional[dict] = None,
+        scorer: Optional[ImprovedScorer] = None,
+        budget=None,
+    ):
+        if top_n <= 0:
+            raise ValueError("top_n must be > 0")
+        self.scorer = scorer or ImprovedScorer()
+        self.menu = menu
+        self.profile = {**DEFAULT_PROFILE, **(profile or {})}
+        self.top_n = top_n
+        self.projection = projection
+        self.version = 0
+
+        # Partie du score indépendante du profil
+        self.enriched = [self.scorer.analyzer.enrich_dish(dish, budget) for dish in menu]
+        self.planet = array("d", (self.scorer._planet_score_v2(e) for e in self.enriched))
+        self.pleasure = array("d", (self.scorer._pleasure_score_v2(e) for e in self.enriched))
+
+        self._fits: Dict[int, float] = {}
+        self._top: List[int] = self._rescore()
+
+    def __len__(self) -> int:
+        return len(self.menu)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _rescore(self) -> List[int]:
+        """Indices du top N pour le profil courant (même ordre que finalize_consumer)"""
+        matcher = ProfileMatcher(self.profile)
+        fits: Dict[int, float] = {}
+        totals: Dict[int, float] = {}
+        for i, e in enumerate(self.enriched):
+            s_fit = self.scorer._fit_consumer(e, matcher)
+            if s_fit == 0.0:
+                continue
+            fits[i] = s_fit
+            totals[i] = self.scorer.consumer_total(s_fit, self.pleasure[i], self.planet[i])
+
+        self._fits = fits
+        self.compatible_count = len(totals)
+        # Clés dans l'ordre du menu + tri stable : mêmes égalités que /api/score-menu
+        return sorted(totals, key=totals.__getitem__, reverse=True)[: self.top_n]
+
+    def _rounded_fit(self, i: int) -> float:
+        return round(self._fits[i], 2)
+
+    def dish_dict(self, i: int, rank: int) -> dict:
+        scored = self.scorer.build_consumer_dish(
+            self.menu[i], self.enriched[i], self._fits[i], self.pleasure[i], self.planet[i]
+        )
+        scored.rank_index = rank
+        return scored.model_dump(include=self.projection)
+
+    def _update_dict(self, i: int, rank: int) -> dict:
+        """Champs qui dépendent du profil, pour un plat resté dans le top N"""
+        s_fit = self._fits[i]
+        update = project_dish(
+            {
+                "total_score": self.scorer.consumer_total(s_fit, self.pleasure[i], self.planet[i]),
+                "sub_scores": {"s_fit": round(s_fit, 2)},
+                "rank_index": rank,
+                "comment": self.scorer._comment_consumer(
+                    self.enriched[i], self.planet[i], self.pleasure[i], s_fit
+                ),
+            },
+            self.projection,
+        )
+        return {"id": self.menu[i]["id"], **update}
+
+    # ------------------------------------------------------------------
+    # Messages
+    # ------------------------------------------------------------------
+
+    def _counts(self) -> dict:
+        return {
+            "top_n": self.top_n,
+            "compatible_count": self.compatible_count,
+            "filtered_out_count": len(self.menu) - self.compatible_count,
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "snapshot",
+            "version": self.version,
+            "user_profile": self.profile,
+            "scored_dishes": [self.dish_dict(i, rank) for rank, i in enumerate(self._top)],
+            **self._counts(),
+        }
+
+    def apply(self, delta: dict) -> dict:
+        """Applique un delta de profil et renvoie le diff du top N (ValueError si invalide)"""
+        unknown = set(delta) - PROFILE_DELTA_KEYS
+        if unknown:
+            raise ValueError(f"Unknown profile field: {sorted(unknown)[0]}")
+
+        profile = dict(self.profile)
+        top_n = self.top_n
+        for key in ("dietary_restriction", "goal"):
+            if key in delta:
+                if not isinstance(delta[key], str):
+                    raise ValueError(f"{key} must be a string")
+                profile[key] = delta[key]
+        if "strict_filter" in delta:
+            profile["strict_filter"] = bool(delta["strict_filter"])
+        if "allergens" in delta:
+            profile["allergens"] = _allergen_list(delta["allergens"], "allergens")
+        if "add_allergens" in delta:
+            added = _allergen_list(delta["add_allergens"], "add_allergens")
+            profile["allergens"] = profile["allergens"] + [
+                a for a in added if a not in profile["allergens"]
+            ]
+        if "remove_allergens" in delta:
+            removed = set(_allergen_list(delta["remove_allergens"], "remove_allergens"))
+            profile["allergens"] = [a for a in profile["allergens"] if a not in removed]
+        if "top_n" in delta:
+            if not isinstance(delta["top_n"], int) or delta["top_n"] <= 0:
+                raise ValueError("top_n must be a positive integer")
+            top_n = delta["top_n"]
+
+        before = {i: (rank, self._rounded_fit(i)) for rank, i in enumerate(self._top)}
+        self.profile = profile
+        self.top_n = top_n
+        self._top = self._rescore()
+        self.version += 1
+
+        entered, updated = [], []
+        for rank, i in enumerate(self._top):
+            previous = before.pop(i, None)
+            if previous is None:
+                entered.append(self.dish_dict(i, rank))
+            elif previous != (rank, self._rounded_fit(i)):
+                updated.append(self._update_dict(i, rank))
+
+        return {
+            "type": "diff",
+            "version": self.version,
+            "user_profile": self.profile,
+            "entered": entered,
+            "left": [self.menu[i]["id"] for i in before],
+            "updated": updated,
+            "order": [self.menu[i]["id"] for i in self._top],
+            **self._counts(),
+        }
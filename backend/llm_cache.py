@@ -0,0 +1,171 @@
+"""
+LLM RESPONSE CACHE
+==================
+Cache SQLite partagé entre processus pour les réponses de extract_with_llm.
+
+- Clé : hash du (nom du plat, description) normalisés + modèle + version du prompt
+- TTL et taille max (éviction des entrées les moins récemment lues)
+- Accès concurrent : mode WAL + busy_timeout, une connexion par thread/processus
+- Le cache ne casse jamais le scoring :
+  - base impossible à ouvrir ou schéma impossible à créer : cache désactivé
+    pour le processus (journalisé une fois) ;
+  - autre erreur SQLite sur une lecture/écriture ("database is locked" après
+    busy_timeout, disque plein...) : cette opération seule est sautée (lecture
+    = absent, écriture = ignorée), le cache reste actif
+
+Configuration :
+    LLM_CACHE_PATH       fichier SQLite (défaut: llm_cache.sqlite3, "" pour désactiver)
+    LLM_CACHE_TTL        durée de vie en secondes (défaut: 30 jours)
+    LLM_CACHE_MAX_ITEMS  nombre max d'entrées (défaut: 100 000)
+"""
+
+from typing import Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ITEMS = 100_000
+
+# Éviction vérifiée toutes les N écritures (évite un COUNT(*) par insertion)
+_EVICT_EVERY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at);
+"""
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").casefold()).strip()
+
+
+def cache_key(dish_name: str, description: str, model: str, prompt_version: int) -> str:
+    payload = json.dumps(
+        [_normalize(dish_name), _normalize(description), model, prompt_version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Cache clé → JSON persistant, sûr entre threads et processus"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        max_items: int = DEFAULT_MAX_ITEMS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_items = max_items
+        self._local = threading.local()
+        self._writes = 0
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par thread, recréée après un fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[dict]:
+        """Valeur en cache (None si absente, expirée ou si la lecture échoue)"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read skipped (%s): %s", self.path, e)
+            return None
+
+    def set(self, key: str, value: dict):
+        """Enregistre une valeur (ignoré si l'écriture échoue)"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write skipped (%s): %s", self.path, e)
+
+    def evict(self):
+        """Supprime les entrées expirées puis les moins récemment lues au-delà de max_items"""
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_items,),
+        )
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+_CACHE: Optional[LLMCache] = None
+_CACHE_FAILED = False
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Cache du processus (None si désactivé avec LLM_CACHE_PATH="", ou si la
+    base n'a pas pu être ouverte)
+    """
+    global _CACHE, _CACHE_FAILED
+    if _CACHE is None:
+        path = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+        if not path or _CACHE_FAILED:
+            return None
+        with _CACHE_LOCK:
+            if _CACHE is None and not _CACHE_FAILED:
+                try:
+                    _CACHE = LLMCache(
+                        path,
+                        ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+                        max_items=int(os.getenv("LLM_CACHE_MAX_ITEMS", DEFAULT_MAX_ITEMS)),
+                    )
+                except sqlite3.Error as e:
+                    _CACHE_FAILED = True
+                    logger.error("LLM cache disabled (%s): %s", path, e)
+                    return None
+    return _CACHE
@@ -0,0 +1,175 @@
+"""
+LLM GUARDS
+==========
+Budget de temps par requête + disjoncteur (circuit breaker) pour l'enrichissement
+LLM (extract_with_llm).
+
+- LLMBudget : une échéance partagée par tous les plats d'une requête. Chaque
+  appel LLM est borné par le temps restant ; une fois épuisé, les plats
+  suivants passent directement par les règles.
+- CircuitBreaker : après N échecs (erreurs, réponses invalides ou appels trop
+  lents) consécutifs, le LLM est ignoré pendant un temps de refroidissement,
+  puis un seul appel de test est autorisé (half-open).
+
+Un timeout raccourci par l'échéance de la requête ne dit rien de la santé du
+LLM (il a seulement manqué de temps) : il ne compte pas comme un échec. Seul
+un timeout à la pleine valeur LLM_CALL_TIMEOUT en est un.
+
+Configuration :
+    LLM_BUDGET_SECONDS        budget par requête (défaut: 3.0)
+    LLM_CALL_TIMEOUT          timeout max d'un appel (défaut: 20)
+    LLM_BREAKER_FAILURES      échecs consécutifs avant ouverture (défaut: 3)
+    LLM_BREAKER_SLOW_SECONDS  au-delà, un appel réussi compte comme un échec
+                              (défaut: LLM_BUDGET_SECONDS, un appel plus lent qu'un
+                              budget de requête entier ; sert aux appels sans budget)
+    LLM_BREAKER_COOLDOWN      durée d'ouverture en secondes (défaut: 60)
+"""
+
+from typing import List, Optional
+import os
+import threading
+import time
+
+DEFAULT_BUDGET_SECONDS = 3.0
+DEFAULT_CALL_TIMEOUT = 20.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def budget_seconds() -> float:
+    return float(os.getenv("LLM_BUDGET_SECONDS", DEFAULT_BUDGET_SECONDS))
+
+
+def full_call_timeout() -> float:
+    """Timeout d'un appel LLM hors échéance de requête"""
+    return float(os.getenv("LLM_CALL_TIMEOUT", DEFAULT_CALL_TIMEOUT))
+
+
+class LLMBudget:
+    """Échéance partagée par tous les appels LLM d'une requête"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.fallbacks: List[dict] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMBudget":
+        return cls(budget_seconds())
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def call_timeout(self) -> float:
+        """Timeout d'un appel : borné par le budget restant"""
+        return min(full_call_timeout(), self.remaining())
+
+    def record_fallback(self, dish_id, dish_name: str, reason: str):
+        with self._lock:
+            self.fallbacks.append({"id": dish_id, "name": dish_name, "reason": reason})
+
+    def report(self) -> dict:
+        return {
+            "budget_seconds": self.seconds,
+            "circuit_state": LLM_BREAKER.state,
+            "fallback_dish_ids": [f["id"] for f in self.fallbacks],
+            "fallbacks": self.fallbacks,
+        }
+
+
+class CircuitBreaker:
+    """Disjoncteur thread-safe : closed → open (cooldown) → half_open → closed"""
+
+    def __init__(self, failure_threshold: int, slow_call_seconds: float, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", 3)),
+            slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_SECONDS", budget_seconds())),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", 60)),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """True si un appel LLM peut être tenté maintenant"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self._state = HALF_OPEN
+            # Half-open : un seul appel de test à la fois
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, elapsed: float):
+        if elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def record_timeout(self, timeout: float):
+        """
+        Timeout d'un appel : échec seulement si l'appel avait son timeout
+        complet, pas un timeout raccourci par l'échéance de la requête
+        """
+        if timeout >= full_call_timeout():
+            self.record_failure()
+            return
+        # Le LLM n'est pas en cause : on libère juste l'appel de test (half-open)
+        with self._lock:
+            self._probe_in_flight = False
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+
+# Un disjoncteur par processus, partagé par toutes les requêtes
+LLM_BREAKER = CircuitBreaker.from_env()
+
+
+def guard_llm_call(budget: Optional[LLMBudget]) -> Optional[str]:
+    """Raison de ne pas appeler le LLM (None si l'appel est autorisé)"""
+    if budget is not None and budget.expired():
+        return "deadline"
+    if not LLM_BREAKER.allow():
+        return "circuit_open"
+    return None
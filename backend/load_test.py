@@ -0,0 +1,405 @@
+"""
+HTTP LOAD HARNESS
+=================
+Test de charge de l'API : un mélange configurable de /api/score-menu,
+/api/extract-menu et /api/full-pipeline envoyé à débit cible (boucle
+ouverte : les requêtes partent à l'heure prévue même si les précédentes
+traînent), avec débit, p50/p95/p99 et taux d'erreur comparés à des SLOs.
+
+- En processus par défaut : l'`app` FastAPI est appelée via
+  httpx.ASGITransport (pas de socket, pas d'événements startup : ni job
+  workers ni dish store). --url vise un vrai serveur.
+- Amont simulé localement : fixtures synthétiques OCR / parsing /
+  extract_with_llm rejouées par upstream_replay.py (UPSTREAM_MODE=replay),
+  avec des latences configurables. Aucun appel réseau ni clé API.
+- Latence mesurée depuis l'heure d'envoi PRÉVUE : un harness ou un serveur
+  en retard se voit dans les percentiles (pas d'omission coordonnée).
+- Requêtes variées (plats tirés du corpus, prix et profils aléatoires,
+  plusieurs images) pour ne pas tout fusionner dans coalescing.py.
+
+Usage:
+    python load_test.py                                   # 20 req/s pendant 30 s
+    python load_test.py --rate 50 --duration 60 --mix score-menu=8,full-pipeline=1,extract-menu=1
+    python load_test.py --ocr-latency 1.5 --parse-latency 3 --slo full-pipeline.p95_ms=6000
+
+    # Serveur réel : le démarrer sur les fixtures générées par le harness
+    python load_test.py --fixtures /tmp/nutrifork-load --prepare-only
+    UPSTREAM_MODE=replay UPSTREAM_FIXTURES=/tmp/nutrifork-load UPSTREAM_LATENCY=1 uvicorn api:app
+    python load_test.py --url http://localhost:8000 --fixtures /tmp/nutrifork-load
+
+Code de sortie 1 si un SLO n'est pas tenu.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+ENDPOINTS = {
+    "score-menu": "/api/score-menu",
+    "extract-menu": "/api/extract-menu",
+    "full-pipeline": "/api/full-pipeline",
+}
+
+DEFAULT_MIX = "score-menu=8,extract-menu=1,full-pipeline=1"
+
+# SLOs par endpoint (latences en ms, taux d'erreur entre 0 et 1).
+# Extraction : dominée par l'amont simulé (--ocr-latency + --parse-latency)
+DEFAULT_SLOS = {
+    "score-menu": {"p95_ms": 300, "p99_ms": 1000, "error_rate": 0.01},
+    "extract-menu": {"p95_ms": 3000, "p99_ms": 5000, "error_rate": 0.01},
+    "full-pipeline": {"p95_ms": 3500, "p99_ms": 6000, "error_rate": 0.01},
+}
+
+RESTAURANT_NAME = "Load Test Restaurant"
+
+PROFILES = [
+    {"dietary_restriction": "", "goal": "", "allergens": [], "strict_filter": True},
+    {"dietary_restriction": "vegetarian", "goal": "", "allergens": ["gluten"], "strict_filter": True},
+    {"dietary_restriction": "vegan", "goal": "weight_loss", "allergens": [], "strict_filter": True},
+    {"dietary_restriction": "", "goal": "muscle_gain", "allergens": ["lactose", "nuts"], "strict_filter": True},
+]
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name!r} (expected {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("Mix weights must not all be 0")
+    return mix
+
+
+def parse_slos(overrides: List[str]) -> Dict[str, dict]:
+    """DEFAULT_SLOS + surcharges "endpoint.metric=value" (metric: p50_ms, p95_ms, p99_ms, error_rate)"""
+    slos = {name: dict(values) for name, values in DEFAULT_SLOS.items()}
+    for override in overrides:
+        target, _, value = override.partition("=")
+        name, _, metric = target.partition(".")
+        if name not in ENDPOINTS or metric not in ("p50_ms", "p95_ms", "p99_ms", "error_rate"):
+            raise ValueError(f"Invalid SLO {override!r} (expected e.g. score-menu.p95_ms=250)")
+        slos[name][metric] = float(value)
+    return slos
+
+
+def load_corpus(path: str) -> List[dict]:
+    """Plats du corpus : menu d'un résultat de pipeline (test_pipeline_results.json)"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    menu = data.get("restaurant", data).get("menu", [])
+    return [
+        {"name": d["name"], "description": d.get("description", ""), "price": float(d.get("price") or 0)}
+        for d in menu
+    ]
+
+
+# ============================================================================
+# AMONT SIMULÉ (fixtures rejouées par upstream_replay.py)
+# ============================================================================
+
+
+def menu_image(index: int) -> bytes:
+    """Octets d'une « photo » de menu : seul leur hash compte pour les fixtures"""
+    return f"nutrifork load test menu #{index}".encode("utf-8").ljust(4096, b"\0")
+
+
+def prepare_fixtures(store, corpus: List[dict], images: int, args):
+    from menu_extraction import image_document_from_bytes
+    from scoring_multi_resto import _llm_fallback
+    from upstream_replay import synthesize_enrichment, synthesize_menu
+
+    for index in range(images):
+        restaurant = {
+            "restaurant_id": 1,
+            "name": f"{RESTAURANT_NAME} #{index}",
+            "type": "Bistro",
+            "location": "Paris 17",
+            "menu": [dict(dish, id=i + 1) for i, dish in enumerate(corpus)],
+        }
+        ocr_text = "\n".join(f"{d['name']} - {d['description']} - {d['price']:.2f}€" for d in corpus)
+        synthesize_menu(
+            store,
+            image_document_from_bytes(menu_image(index)),
+            f"{restaurant['name']}\n{ocr_text}",
+            RESTAURANT_NAME,
+            json.dumps(restaurant, ensure_ascii=False),
+            ocr_latency=args.ocr_latency,
+            parse_latency=args.parse_latency,
+        )
+
+    # Réponse Blackbox simulée : repli sur les règles, après --llm-latency
+    for dish in corpus:
+        synthesize_enrichment(
+            store, dish["name"], dish["description"], _llm_fallback("disabled"), args.llm_latency
+        )
+
+
+# ============================================================================
+# REQUÊTES
+# ============================================================================
+
+
+def build_request(endpoint: str, rng: random.Random, corpus: List[dict], args) -> dict:
+    """Arguments de httpx.AsyncClient.post pour une requête de l'endpoint"""
+    profile = rng.choice(PROFILES)
+
+    if endpoint == "score-menu":
+        menu = [
+            {
+                "id": i + 1,
+                **dish,
+                "price": round(dish["price"] + rng.randint(0, 20) * 0.5, 2),
+                "restaurant_name": f"Resto {rng.randrange(args.restaurants)}",
+            }
+            for i, dish in enumerate(rng.choice(corpus) for _ in range(args.menu_size))
+        ]
+        return {
+            "json": {
+                "menu_data": menu,
+                "user_profile": profile,
+                "mode": rng.choice(["consumer", "consumer", "consumer", "restaurant"]),
+                "top_n": 10,
+                "response_profile": rng.choice(["full", "compact", "map"]),
+            }
+        }
+
+    files = {"file": ("menu.jpg", menu_image(rng.randrange(args.images)), "image/jpeg")}
+    if endpoint == "extract-menu":
+        return {"files": files, "data": {"restaurant_name": RESTAURANT_NAME}}
+
+    return {
+        "files": files,
+        "data": {
+            "restaurant_name": RESTAURANT_NAME,
+            "mode": "consumer",
+            "dietary_restriction": profile["dietary_restriction"],
+            "goal": profile["goal"],
+            "allergens": ",".join(profile["allergens"]),
+            "top_n": "10",
+        },
+    }
+
+
+async def send(client, endpoint: str, request: dict, scheduled: float, semaphore, loop) -> dict:
+    async with semaphore:
+        try:
+            response = await client.post(ENDPOINTS[endpoint], **request)
+            status = response.status_code
+            error = None if status < 400 else response.text[:200]
+        except Exception as e:
+            status, error = None, f"{type(e).__name__}: {e}"
+    return {
+        "endpoint": endpoint,
+        "status": status,
+        "error": error,
+        "latency": loop.time() - scheduled,
+        "finished": loop.time(),
+    }
+
+
+async def run_load(client, mix: Dict[str, float], corpus: List[dict], args) -> dict:
+    """Boucle ouverte : requête i envoyée à start + i / rate"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.max_in_flight)
+    names, weights = list(mix), list(mix.values())
+
+    total = max(1, int(args.rate * args.duration))
+    tasks = []
+    max_lag = 0.0
+    start = loop.time()
+    for i in range(total):
+        scheduled = start + i / args.rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+        endpoint = rng.choices(names, weights)[0]
+        request = build_request(endpoint, rng, corpus, args)
+        tasks.append(asyncio.ensure_future(send(client, endpoint, request, scheduled, semaphore, loop)))
+
+    results = await asyncio.gather(*tasks)
+    return {"results": results, "start": start, "end": loop.time(), "max_lag": max_lag}
+
+
+# ============================================================================
+# RAPPORT
+# ============================================================================
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile au rang le plus proche (valeurs non vides)"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(results: List[dict], start: float, end: float) -> Dict[str, dict]:
+    """Statistiques par endpoint ; le débit de chaque ligne est rapporté à la même fenêtre [start, end]"""
+    elapsed = end - start
+    by_endpoint: Dict[str, List[dict]] = {}
+    for result in results:
+        by_endpoint.setdefault(result["endpoint"], []).append(result)
+    by_endpoint["all"] = results
+
+    summary = {}
+    for name, rows in by_endpoint.items():
+        if not rows:
+            continue
+        latencies = [r["latency"] * 1000 for r in rows]
+        errors = [r for r in rows if r["error"] is not None]
+        summary[name] = {
+            "requests": len(rows),
+            "errors": len(errors),
+            "error_rate": len(errors) / len(rows),
+            "statuses": dict(Counter(r["status"] for r in errors)),
+            "first_error": errors[0]["error"] if errors else None,
+            "throughput": len(rows) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+    return summary
+
+
+def check_slos(summary: Dict[str, dict], slos: Dict[str, dict]) -> List[tuple]:
+    """
+    [(endpoint, metric, mesuré, objectif, tenu)]
+
+    Un endpoint sans aucune requête n'a rien prouvé : ses SLOs sont manqués
+    (mesuré = None).
+    """
+    checks = []
+    for name, objectives in slos.items():
+        for metric, target in objectives.items():
+            if name not in summary:
+                checks.append((name, metric, None, target, False))
+                continue
+            measured = summary[name][metric]
+            checks.append((name, metric, measured, target, measured <= target))
+    return checks
+
+
+def print_report(summary: Dict[str, dict], checks: List[tuple], max_lag: float, args):
+    print(f"\n{'=' * 78}")
+    print(f"📊 LOAD TEST REPORT ({args.rate:g} req/s target, {args.duration:g} s, {args.url or 'in-process ASGI'})")
+    print(f"{'=' * 78}\n")
+    print(f"{'endpoint':<15}{'requests':>9}{'errors':>8}{'err %':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, s in summary.items():
+        print(
+            f"{name:<15}{s['requests']:>9}{s['errors']:>8}{s['error_rate'] * 100:>7.1f}%"
+            f"{s['throughput']:>8.1f}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+        )
+        if s["errors"]:
+            print(f"   ⚠️  statuses {s['statuses']}: {s['first_error']}")
+
+    if max_lag > 0.05:
+        print(f"\n⚠️  Harness fell up to {max_lag * 1000:.0f} ms behind schedule (client-side saturation)")
+
+    print("\n🎯 SLOs:")
+    for name, metric, measured, target, ok in checks:
+        unit = "%" if metric == "error_rate" else " ms"
+        scale = 100 if metric == "error_rate" else 1
+        value = "no requests" if measured is None else f"{measured * scale:.1f}{unit}"
+        print(
+            f"   {'✅' if ok else '❌'} {name} {metric}: {value} "
+            f"(objective ≤ {target * scale:g}{unit})"
+        )
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+
+async def run(args, mix, corpus) -> dict:
+    import httpx
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits)
+    else:
+        import api
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.app), base_url="http://loadtest", timeout=timeout
+        )
+    async with client:
+        return await run_load(client, mix, corpus, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the scoring API against latency SLOs")
+    parser.add_argument("--url", help="Real server base URL (default: in-process ASGI transport)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--slo", action="append", default=[], help="Override, e.g. score-menu.p95_ms=250")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Cap on outstanding requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (s)")
+    parser.add_argument("--corpus", default="test_pipeline_results.json", help="Dishes to draw menus from")
+    parser.add_argument("--menu-size", type=int, default=40, help="Dishes per /api/score-menu request")
+    parser.add_argument("--restaurants", type=int, default=5, help="Restaurants per /api/score-menu request")
+    parser.add_argument("--images", type=int, default=16, help="Distinct menu photos for the OCR endpoints")
+    parser.add_argument("--ocr-latency", type=float, default=0.5, help="Simulated Mistral OCR latency (s)")
+    parser.add_argument("--parse-latency", type=float, default=1.5, help="Simulated Haiku parsing latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated extract_with_llm latency (s)")
+    parser.add_argument("--fixtures", help="Fixtures directory (default: a temporary directory)")
+    parser.add_argument("--prepare-only", action="store_true", help="Write the fixtures and exit")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.rate <= 0 or args.duration <= 0:
+        parser.error("--rate and --duration must be > 0")
+    try:
+        mix = parse_mix(args.mix)
+        slos = parse_slos(args.slo)
+    except ValueError as e:
+        parser.error(str(e))
+
+    fixtures = args.fixtures or tempfile.mkdtemp(prefix="nutrifork-load-")
+    # Avant l'import de l'API (clients et extract_with_llm lisent UPSTREAM_* à l'import)
+    os.environ["UPSTREAM_MODE"] = "replay"
+    os.environ["UPSTREAM_FIXTURES"] = fixtures
+    os.environ["UPSTREAM_LATENCY"] = "1"
+    os.environ.pop("SCORING_ONLY", None)
+    os.environ.setdefault("STORAGE_PATH", os.path.join(fixtures, "storage.sqlite3"))
+
+    from upstream_replay import get_fixture_store
+
+    corpus = load_corpus(args.corpus)
+    prepare_fixtures(get_fixture_store(), corpus, args.images, args)
+    print(f"🗂️  Upstream fixtures: {fixtures} ({args.images} menu photos, {len(corpus)} dishes)")
+    if args.prepare_only:
+        return
+
+    started = time.perf_counter()
+    outcome = asyncio.run(run(args, mix, corpus))
+    print(f"⏱️  Done in {time.perf_counter() - started:.1f} s")
+
+    summary = summarize(outcome["results"], outcome["start"], outcome["end"])
+    checks = check_slos(summary, slos)
+    print_report(summary, checks, outcome["max_lag"], args)
+
+    if not all(ok for *_, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
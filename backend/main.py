@@ -4,11 +4,8 @@ END-TO-END MENU SCORING PIPELINE
 Extract menu from image → Score dishes → Display results
 """
 
-import os
 import json
 import sys
-from mistralai import Mistral
-from anthropic import Anthropic
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -17,18 +14,15 @@ load_dotenv()
 
 # Import scoring engine (must be in same directory or Python path)
 from scoring_multi_resto import score_menu_for_consumer, score_menu_for_restaurant
+from menu_extraction import image_document_from_path, parse_menu_text, run_ocr
+from clients import get_anthropic_client, get_mistral_client, missing_ocr_keys
+from storage import get_storage
 
-# Initialize clients
-mistral_api_key = os.environ.get("MISTRAL_API_KEY")
-anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
-
-if not mistral_api_key:
-    raise ValueError("MISTRAL_API_KEY environment variable not set")
-if not anthropic_api_key:
-    raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-
-mistral_client = Mistral(api_key=mistral_api_key)
-anthropic_client = Anthropic(api_key=anthropic_api_key)
+# Check credentials (clients are built lazily, see clients.py; none needed
+# when replaying recorded upstream calls, see upstream_replay.py)
+missing = missing_ocr_keys()
+if missing:
+    raise ValueError(f"{', '.join(missing)} environment variable not set")
 
 
 def extract_menu_from_image(
@@ -41,25 +35,8 @@ def extract_menu_from_image(
     print(f"{'=' * 60}")
     print(f"Processing: {image_path}")
 
-    # Prepare image for OCR
-    if image_path.startswith(("http://", "https://")):
-        document = {"type": "image_url", "image_url": image_path}
-    else:
-        import base64
-
-        with open(image_path, "rb") as f:
-            image_data = base64.b64encode(f.read()).decode("utf-8")
-        document = {
-            "type": "image_url",
-            "image_url": f"data:image/jpeg;base64,{image_data}",
-        }
-
     # OCR with Mistral
-    ocr_response = mistral_client.ocr.process(
-        model="mistral-ocr-latest", document=document, include_image_base64=False
-    )
-
-    ocr_text = ocr_response.text if hasattr(ocr_response, "text") else str(ocr_response)
+    ocr_text = run_ocr(get_mistral_client(), image_document_from_path(image_path))
     print(f"✅ Extracted {len(ocr_text)} characters")
     print(f"\n--- OCR Preview (first 300 chars) ---")
     print(f"{ocr_text[:300]}...\n")
@@ -69,106 +46,14 @@ def extract_menu_from_image(
     print(f"🧠 STEP 2: STRUCTURED PARSING (Claude Haiku)")
     print(f"{'=' * 60}")
 
-    parsing_prompt = f"""You are a menu data extractor. Parse this restaurant menu OCR text into structured JSON.
-
-OCR TEXT:
-{ocr_text}
-
-INSTRUCTIONS:
-1. Extract the restaurant name, type, and location if available from the menu
-2. Extract ALL dishes from the menu
-3. For each dish, identify: name, description (ingredients/details), price
-4. Assign sequential IDs starting from 1
-5. If price is missing, use 0.0
-6. If description is missing, use empty string
-7. Return ONLY valid JSON, no markdown, no explanation
-
-OUTPUT FORMAT:
-{{
-    "restaurant_id": 1,
-    "name": "{restaurant_name}",
-    "type": "Restaurant type from OCR or 'Unknown'",
-    "location": "Address from OCR or 'Unknown'",
-    "menu": [
-        {{
-            "id": 1,
-            "name": "Dish name",
-            "description": "Ingredients and details",
-            "price": 12.50
-        }}
-    ]
-}}
-
-JSON OUTPUT:"""
-
-    chat_response = anthropic_client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=4096,
-        temperature=0.1,
-        messages=[{"role": "user", "content": parsing_prompt}],
-    )
-
-    llm_output = chat_response.content[0].text.strip()
-
-    # Clean markdown artifacts
-    if llm_output.startswith("```json"):
-        llm_output = llm_output[7:]
-    if llm_output.startswith("```"):
-        llm_output = llm_output[3:]
-    if llm_output.endswith("```"):
-        llm_output = llm_output[:-3]
-    llm_output = llm_output.strip()
-
-    # Parse JSON
     try:
-        parsed_data = json.loads(llm_output)
-
-        # Handle structured restaurant format
-        if isinstance(parsed_data, dict) and "menu" in parsed_data:
-            restaurant_data = parsed_data
-            dishes = restaurant_data.get("menu", [])
-        elif isinstance(parsed_data, dict):
-            # Old format or wrapped data
-            dishes = (
-                parsed_data.get("dishes")
-                or parsed_data.get("menu")
-                or next((v for v in parsed_data.values() if isinstance(v, list)), [])
-            )
-            restaurant_data = {
-                "restaurant_id": 1,
-                "name": restaurant_name,
-                "type": "Unknown",
-                "location": "Unknown",
-                "menu": dishes,
-            }
-        else:
-            # Array format (fallback)
-            dishes = parsed_data
-            restaurant_data = {
-                "restaurant_id": 1,
-                "name": restaurant_name,
-                "type": "Unknown",
-                "location": "Unknown",
-                "menu": dishes,
-            }
-
+        menu_data, restaurant_data = parse_menu_text(
+            get_anthropic_client(), ocr_text, restaurant_name
+        )
     except json.JSONDecodeError as e:
         print(f"❌ JSON parsing error: {e}")
-        print(f"LLM OUTPUT:\n{llm_output}")
-        return []
-
-    # Format for scoring engine (flatten to dish list with restaurant name)
-    menu_data = []
-    for dish in dishes:
-        menu_data.append(
-            {
-                "id": dish.get("id", len(menu_data) + 1),
-                "name": dish.get("name", "Unknown Dish"),
-                "description": dish.get("description", ""),
-                "price": float(dish.get("price", 0.0)),
-                "restaurant_name": restaurant_data.get("name", restaurant_name),
-            }
-        )
+        print(f"LLM OUTPUT:\n{e.doc}")
+        return [], {}
 
     print(
         f"✅ Extracted {len(menu_data)} dishes from {restaurant_data.get('name', restaurant_name)}"
@@ -298,6 +183,21 @@ def main():
         json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"\n💾 Saved scoring results to: {output_file}")
 
+    # Persist menu, enrichments and scores (survives restarts, see storage.py)
+    storage = get_storage()
+    if storage is not None:
+        name = restaurant_data.get("name", RESTAURANT_NAME)
+        with storage.batch():
+            storage.save_menu(name, menu_data, restaurant_data)
+            storage.save_scored(
+                results["scored_dishes"],
+                USER_PROFILE if SCORING_MODE == "consumer" else None,
+                restaurant_data,
+            )
+            if results.get("swap_suggestions"):
+                storage.save_swaps(name, results["swap_suggestions"])
+        print(f"🗄️  Saved to storage: {storage.path}")
+
     print(f"\n{'=' * 60}")
     print(f"✅ PIPELINE COMPLETE!")
     print(f"{'=' * 60}\n")
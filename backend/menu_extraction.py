@@ -0,0 +1,381 @@
+"""
+MENU EXTRACTION HELPERS
+=======================
+OCR (Mistral) + structured parsing (Claude Haiku) shared by main.py, api.py
+and the bulk ingestion CLI. Clients are passed in explicitly.
+
+Multi-page menus (several photos or a PDF) are pipelined: the OCR of the next
+documents runs in background threads while the current page is parsed, and
+dishes are de-duplicated and merged into a single restaurant.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import base64
+import json
+import re
+
+from incremental_json import MenuStreamParser
+
+OCR_MODEL = "mistral-ocr-latest"
+PARSING_MODEL = "claude-haiku-4-5-20251001"
+
+
+def image_document_from_bytes(image_data: bytes) -> dict:
+    """Build a Mistral OCR document from raw image bytes"""
+    image_base64 = base64.b64encode(image_data).decode("utf-8")
+    return {
+        "type": "image_url",
+        "image_url": f"data:image/jpeg;base64,{image_base64}",
+    }
+
+
+def image_document_from_path(image_path: str) -> dict:
+    """Build a Mistral OCR document from a local path or an http(s) URL"""
+    if image_path.startswith(("http://", "https://")):
+        return {"type": "image_url", "image_url": image_path}
+
+    with open(image_path, "rb") as f:
+        return image_document_from_bytes(f.read())
+
+
+def pdf_document_from_bytes(pdf_data: bytes) -> dict:
+    """Build a Mistral OCR document from raw PDF bytes (all pages)"""
+    pdf_base64 = base64.b64encode(pdf_data).decode("utf-8")
+    return {
+        "type": "document_url",
+        "document_url": f"data:application/pdf;base64,{pdf_base64}",
+    }
+
+
+def document_from_upload(data: bytes, content_type: str) -> dict:
+    if content_type == "application/pdf":
+        return pdf_document_from_bytes(data)
+    return image_document_from_bytes(data)
+
+
+def run_ocr_pages(mistral_client, document: dict) -> List[str]:
+    """OCR a document with Mistral and return the text of each page"""
+    ocr_response = mistral_client.ocr.process(
+        model=OCR_MODEL, document=document, include_image_base64=False
+    )
+    pages = getattr(ocr_response, "pages", None)
+    if pages:
+        return [getattr(page, "markdown", "") or "" for page in pages]
+    return [ocr_response.text if hasattr(ocr_response, "text") else str(ocr_response)]
+
+
+def run_ocr(mistral_client, document: dict) -> str:
+    """OCR a document with Mistral and return the extracted text"""
+    return "\n\n".join(run_ocr_pages(mistral_client, document))
+
+
+def build_parsing_prompt(ocr_text: str, restaurant_name: str) -> str:
+    return f"""You are a menu data extractor. Parse this restaurant menu OCR text into structured JSON.
+
+OCR TEXT:
+{ocr_text}
+
+INSTRUCTIONS:
+1. Extract the restaurant name, type, and location if available from the menu
+2. Extract ALL dishes from the menu
+3. For each dish, identify: name, description (ingredients/details), price
+4. Assign sequential IDs starting from 1
+5. If price is missing, use 0.0
+6. If description is missing, use empty string
+7. Return ONLY valid JSON, no markdown, no explanation
+
+OUTPUT FORMAT:
+{{
+    "restaurant_id": 1,
+    "name": "{restaurant_name}",
+    "type": "Restaurant type from OCR or 'Unknown'",
+    "location": "Address from OCR or 'Unknown'",
+    "menu": [
+        {{
+            "id": 1,
+            "name": "Dish name",
+            "description": "Ingredients and details",
+            "price": 12.50
+        }}
+    ]
+}}
+
+JSON OUTPUT:"""
+
+
+def clean_llm_output(llm_output: str) -> str:
+    """Strip markdown code fences around the LLM JSON answer"""
+    llm_output = llm_output.strip()
+    if llm_output.startswith("```json"):
+        llm_output = llm_output[7:]
+    if llm_output.startswith("```"):
+        llm_output = llm_output[3:]
+    if llm_output.endswith("```"):
+        llm_output = llm_output[:-3]
+    return llm_output.strip()
+
+
+def normalize_parsed_menu(parsed_data, restaurant_name: str) -> Tuple[list, dict]:
+    """
+    Normalize the parsed LLM JSON into (menu_data, restaurant_data)
+
+    menu_data is the flat dish list expected by the scoring engine,
+    restaurant_data the full structured restaurant record.
+    """
+    # Handle structured restaurant format
+    if isinstance(parsed_data, dict) and "menu" in parsed_data:
+        restaurant_data = parsed_data
+        dishes = restaurant_data.get("menu", [])
+    elif isinstance(parsed_data, dict):
+        # Old format or wrapped data
+        dishes = (
+            parsed_data.get("dishes")
+            or parsed_data.get("menu")
+            or next((v for v in parsed_data.values() if isinstance(v, list)), [])
+        )
+        restaurant_data = {
+            "restaurant_id": 1,
+            "name": restaurant_name,
+            "type": "Unknown",
+            "location": "Unknown",
+            "menu": dishes,
+        }
+    else:
+        # Array format (fallback)
+        dishes = parsed_data
+        restaurant_data = {
+            "restaurant_id": 1,
+            "name": restaurant_name,
+            "type": "Unknown",
+            "location": "Unknown",
+            "menu": dishes,
+        }
+
+    # Format for scoring engine (flatten to dish list with restaurant name)
+    menu_data = []
+    for dish in dishes:
+        menu_data.append(
+            format_menu_item(
+                dish, len(menu_data) + 1, restaurant_data.get("name", restaurant_name)
+            )
+        )
+
+    return menu_data, restaurant_data
+
+
+def format_menu_item(dish: dict, position: int, restaurant_name: str) -> dict:
+    """Flatten one parsed dish for the scoring engine (position is 1-based)"""
+    return {
+        "id": dish.get("id", position),
+        "name": dish.get("name", "Unknown Dish"),
+        "description": dish.get("description", ""),
+        "price": float(dish.get("price", 0.0)),
+        "restaurant_name": restaurant_name,
+    }
+
+
+def parsing_request(ocr_text: str, restaurant_name: str) -> dict:
+    """Keyword arguments of the Haiku parsing call (messages.create / messages.stream)"""
+    return {
+        "model": PARSING_MODEL,
+        "max_tokens": 4096,
+        "temperature": 0.1,
+        "messages": [
+            {"role": "user", "content": build_parsing_prompt(ocr_text, restaurant_name)}
+        ],
+    }
+
+
+def parse_menu_text(
+    anthropic_client, ocr_text: str, restaurant_name: str
+) -> Tuple[list, dict]:
+    """
+    Parse OCR text into (menu_data, restaurant_data) with Claude Haiku
+
+    Raises:
+        json.JSONDecodeError: if the LLM answer is not valid JSON
+    """
+    chat_response = anthropic_client.messages.create(
+        **parsing_request(ocr_text, restaurant_name)
+    )
+
+    llm_output = clean_llm_output(chat_response.content[0].text)
+    return normalize_parsed_menu(json.loads(llm_output), restaurant_name)
+
+
+def stream_menu_text(
+    anthropic_client, ocr_text: str, restaurant_name: str
+) -> Iterator[Tuple[str, dict]]:
+    """
+    Parse OCR text with Claude Haiku in streaming mode
+
+    Yields ("dish", menu_item) as soon as each dish object is complete in the
+    LLM output, then a final ("restaurant", restaurant_data).
+
+    Raises:
+        json.JSONDecodeError: if the answer is not valid JSON and no dish
+        could be recovered from the stream
+    """
+    parser = MenuStreamParser()
+
+    with anthropic_client.messages.stream(
+        **parsing_request(ocr_text, restaurant_name)
+    ) as stream:
+        for text in stream.text_stream:
+            for dish in parser.feed(text):
+                name = (parser.header or {}).get("name", restaurant_name)
+                yield "dish", format_menu_item(dish, len(parser.dishes), name)
+
+    try:
+        _, restaurant_data = normalize_parsed_menu(
+            json.loads(clean_llm_output(parser.buffer)), restaurant_name
+        )
+    except json.JSONDecodeError:
+        # Truncated answer (max_tokens): keep the dishes already streamed
+        if not parser.dishes:
+            raise
+        restaurant_data = {
+            "restaurant_id": 1,
+            "name": restaurant_name,
+            "type": "Unknown",
+            "location": "Unknown",
+            **(parser.header or {}),
+            "menu": parser.dishes,
+        }
+
+    yield "restaurant", restaurant_data
+
+
+# ============================================================================
+# MULTI-PAGE MENUS
+# ============================================================================
+
+# Documents OCR'd ahead of the parser (document n+1 while document n is parsed)
+OCR_PREFETCH = 2
+
+_UNKNOWN = ("", "Unknown", "Unknown Restaurant")
+
+
+class MenuMerger:
+    """Merge dishes from several pages into one restaurant, renumbering IDs"""
+
+    def __init__(self, restaurant_name: str):
+        self.restaurant_name = restaurant_name
+        self.restaurant: dict = {
+            "restaurant_id": 1,
+            "name": restaurant_name,
+            "type": "Unknown",
+            "location": "Unknown",
+        }
+        self.menu: List[dict] = []
+        self.pages = 0
+        self._seen = set()
+
+    @staticmethod
+    def _dish_key(item: dict) -> tuple:
+        name = re.sub(r"\s+", " ", item["name"].casefold()).strip()
+        return name, round(item["price"], 2)
+
+    def _merge_field(self, field: str, value):
+        """Keep the first known value of a restaurant field across pages"""
+        current = self.restaurant.get(field)
+        if value is None or value in _UNKNOWN:
+            return
+        if current in _UNKNOWN + (self.restaurant_name,):
+            self.restaurant[field] = value
+
+    def add_restaurant(self, restaurant_data: dict):
+        self.pages += 1
+        for field in ("name", "type", "location"):
+            self._merge_field(field, restaurant_data.get(field))
+
+    def add_dish(self, item: dict) -> Optional[dict]:
+        """Renumbered dish, or None if the same dish was already seen on another page"""
+        self._merge_field("name", item.get("restaurant_name"))
+
+        key = self._dish_key(item)
+        if key in self._seen:
+            return None
+        self._seen.add(key)
+
+        # Dishes from every page belong to the merged restaurant
+        item = dict(item, id=len(self.menu) + 1, restaurant_name=self.restaurant["name"])
+        self.menu.append(item)
+        return item
+
+    def restaurant_data(self) -> dict:
+        return {
+            **self.restaurant,
+            "pages": self.pages,
+            "menu": [
+                {k: v for k, v in item.items() if k != "restaurant_name"}
+                for item in self.menu
+            ],
+        }
+
+
+def stream_menu_pages(
+    mistral_client,
+    anthropic_client,
+    documents: List[dict],
+    restaurant_name: str,
+) -> Iterator[Tuple[str, dict]]:
+    """
+    OCR + streaming parse over several documents (images and/or PDFs)
+
+    OCR runs on a sliding window of OCR_PREFETCH documents: the next
+    document is submitted as each one comes back for parsing, so at most
+    OCR_PREFETCH OCR calls are pending at any time. Mistral OCRs a PDF in
+    a single call, so its pages are parsed once the whole PDF is back.
+    Yields ("dish", menu_item) with de-duplicated, sequential IDs, then
+    ("restaurant", merged_restaurant_data).
+
+    Raises:
+        json.JSONDecodeError: if no page could be parsed at all
+    """
+    merger = MenuMerger(restaurant_name)
+    last_error = None
+    remaining = iter(documents)
+    pending: deque = deque()
+
+    def submit_next(pool: ThreadPoolExecutor):
+        document = next(remaining, None)
+        if document is not None:
+            pending.append(pool.submit(run_ocr_pages, mistral_client, document))
+
+    with ThreadPoolExecutor(max_workers=OCR_PREFETCH) as pool:
+        try:
+            for _ in range(OCR_PREFETCH):
+                submit_next(pool)
+
+            while pending:
+                pages = pending.popleft().result()
+                submit_next(pool)
+
+                for page_text in pages:
+                    if not page_text.strip():
+                        continue
+                    try:
+                        for kind, payload in stream_menu_text(
+                            anthropic_client, page_text, restaurant_name
+                        ):
+                            if kind == "restaurant":
+                                merger.add_restaurant(payload)
+                                continue
+                            item = merger.add_dish(payload)
+                            if item is not None:
+                                yield "dish", item
+                    except json.JSONDecodeError as e:
+                        # One unreadable page should not lose the rest of the menu
+                        last_error = e
+        finally:
+            # Generator closed early or OCR failed: drop what has not started
+            for future in pending:
+                future.cancel()
+
+    if last_error is not None and not merger.menu:
+        raise last_error
+
+    yield "restaurant", merger.restaurant_data()
@@ -0,0 +1,255 @@
+"""
+MENU WHAT-IF SIMULATOR (B2B)
+============================
+"Et si on remplaçait le bœuf par des lentilles dans ces 5 plats et qu'on
+ajoutait 2 plats vegan ?" : des centaines de scénarios sur un menu de base,
+sans relancer process_menu_for_restaurant à chaque fois.
+
+Le menu de base est scoré une seule fois et stocké en colonnes (array) :
+sous-scores, total, végétal, NOVA élevé, plus les sommes et l'histogramme
+des scores planète. Un scénario ne re-score que les plats qu'il touche
+(enrichissements internés, voir interning.py) et met à jour les agrégats
+par différence : O(nb d'éditions) par scénario au lieu de O(taille du menu).
+Un plat modifié n'est scoré qu'une fois pour tout le lot : les scénarios qui
+partagent une édition (même swap sur les mêmes plats) ne font plus que
+l'arithmétique des différences.
+
+Pas de numpy dans ce projet : la vectorisation est adaptée en colonnes
+array + mises à jour par différence, un scénario après l'autre.
+
+Éditions d'un scénario :
+    {"type": "swap", "from": "boeuf", "to": "lentilles", "dish_ids": [1, 4]}
+        remplace l'ingrédient dans le nom/la description, comparé en forme
+        repliée (text_normalize : "boeuf" trouve "Bœuf") ; dish_ids optionnel,
+        par défaut tous les plats du restaurant qui le contiennent
+    {"type": "add", "dish": {"name": ..., "description": ..., "price": ...}}
+    {"type": "remove", "dish_id": 3}
+
+Le rang parmi les voisins (autres restaurants du menu fourni) est calculé
+par bisection sur leurs moyennes triées ; à égalité, le restaurant simulé
+prend le meilleur rang.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+from interning import dish_key
+from scoring_multi_resto import ImprovedScorer, ScoredDish
+from text_normalize import fold
+
+# Histogramme des scores planète : [1, 2), [2, 3), ..., [9, 10]
+PLANET_BINS = list(range(1, 10))
+
+_COLUMNS = ("s_planet", "s_pleasure", "s_fit", "total", "plant", "high_nova")
+
+
+def _values(dish: ScoredDish) -> tuple:
+    e = dish.enriched_attributes
+    return (
+        dish.sub_scores.s_planet,
+        dish.sub_scores.s_pleasure,
+        dish.sub_scores.s_fit,
+        dish.total_score,
+        int("vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags),
+        int(e.nova_score >= 3),
+    )
+
+
+def _planet_bin(s_planet: float) -> int:
+    return min(max(int(s_planet), 1), 9) - 1
+
+
+def _fold_replace(text: str, old: str, new: str) -> str:
+    """Remplace old par new dans text, en comparant les formes repliées"""
+    target = fold(old)
+    if not target or not text:
+        return text
+
+    # Texte replié caractère par caractère, avec la position d'origine de chacun
+    folded: List[str] = []
+    origin: List[int] = []
+    for i, char in enumerate(text):
+        piece = " " if char.isspace() else fold(char)
+        if piece == " " and folded and folded[-1] == " ":
+            continue
+        folded.extend(piece)
+        origin.extend([i] * len(piece))
+    folded_text = "".join(folded)
+
+    parts: List[str] = []
+    last = 0
+    start = folded_text.find(target)
+    while start != -1:
+        end = start + len(target)
+        parts.append(text[last : origin[start]])
+        parts.append(new)
+        last = origin[end - 1] + 1
+        start = folded_text.find(target, end)
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+class MenuSimulator:
+    """Menu de base scoré une fois + évaluation rapide de scénarios"""
+
+    def __init__(
+        self,
+        menu: List[dict],
+        restaurant_name: Optional[str] = None,
+        scorer: Optional[ImprovedScorer] = None,
+        budget=None,
+    ):
+        self.scorer = scorer or ImprovedScorer()
+        self.budget = budget
+        self.restaurant_name = restaurant_name or (
+            menu[0].get("restaurant_name", "Unknown") if menu else "Unknown"
+        )
+
+        self.dishes: List[dict] = []
+        self._row_of: Dict[int, int] = {}
+        # Valeurs des plats modifiés déjà scorés, par contenu (partagées entre scénarios)
+        self._values_of: Dict[tuple, tuple] = {}
+        self.columns: Dict[str, array] = {
+            name: array("d" if name in ("s_planet", "s_pleasure", "s_fit", "total") else "b")
+            for name in _COLUMNS
+        }
+        neighbour_totals: Dict[str, List[float]] = {}
+
+        for dish in menu:
+            scored = self.scorer.score_dish_for_restaurant(dish, budget)
+            resto = dish.get("restaurant_name", "Unknown")
+            if resto != self.restaurant_name:
+                neighbour_totals.setdefault(resto, []).append(scored.total_score)
+                continue
+            self._row_of[dish["id"]] = len(self.dishes)
+            self.dishes.append(dish)
+            for name, value in zip(_COLUMNS, _values(scored)):
+                self.columns[name].append(value)
+
+        self.sums = {name: sum(column) for name, column in self.columns.items()}
+        self.planet_histogram = array("l", [0] * len(PLANET_BINS))
+        for s_planet in self.columns["s_planet"]:
+            self.planet_histogram[_planet_bin(s_planet)] += 1
+
+        # Moyennes des voisins (arrondies comme restaurant_rankings), triées
+        self.neighbours = sorted(
+            round(sum(totals) / len(totals), 2) for totals in neighbour_totals.values()
+        )
+
+    def __len__(self) -> int:
+        return len(self.dishes)
+
+    # ------------------------------------------------------------------
+    # Scénarios
+    # ------------------------------------------------------------------
+
+    def _score_values(self, dish: dict) -> tuple:
+        dish = dict(dish, restaurant_name=self.restaurant_name)
+        dish.setdefault("id", 0)
+        dish.setdefault("description", "")
+        key = dish_key(dish["name"], dish["description"], dish.get("price"))
+        values = self._values_of.get(key)
+        if values is None:
+            values = _values(self.scorer.score_dish_for_restaurant(dish, self.budget))
+            self._values_of[key] = values
+        return values
+
+    def _apply_swap(self, edit: dict, replaced: Dict[int, dict]):
+        ids = edit.get("dish_ids")
+        rows = (
+            [self._row_of[i] for i in ids if i in self._row_of]
+            if ids is not None
+            else range(len(self.dishes))
+        )
+        for row in rows:
+            dish = replaced.get(row, self.dishes[row])
+            if dish is None:
+                continue  # Supprimé dans le même scénario
+            name = _fold_replace(dish["name"], edit["from"], edit["to"])
+            description = _fold_replace(dish.get("description", ""), edit["from"], edit["to"])
+            if (name, description) != (dish["name"], dish.get("description", "")):
+                replaced[row] = dict(dish, name=name, description=description)
+
+    def simulate(self, edits: List[dict]) -> dict:
+        """Stats, distribution planète et rang du restaurant pour un scénario"""
+        replaced: Dict[int, Optional[dict]] = {}
+        added: List[dict] = []
+
+        for edit in edits:
+            kind = edit.get("type")
+            if kind == "swap":
+                self._apply_swap(edit, replaced)
+            elif kind == "add":
+                added.append(edit["dish"])
+            elif kind == "remove":
+                row = self._row_of.get(edit["dish_id"])
+                if row is not None:
+                    replaced[row] = None
+            else:
+                raise ValueError(f"Unknown edit type: {kind}")
+
+        sums = dict(self.sums)
+        histogram = array("l", self.planet_histogram)
+        count = len(self.dishes)
+
+        def apply(values: tuple, sign: int):
+            for name, value in zip(_COLUMNS, values):
+                sums[name] += sign * value
+            histogram[_planet_bin(values[0])] += sign
+
+        for row, dish in replaced.items():
+            apply(tuple(self.columns[name][row] for name in _COLUMNS), -1)
+            count -= 1
+            if dish is not None:
+                apply(self._score_values(dish), +1)
+                count += 1
+        for dish in added:
+            apply(self._score_values(dish), +1)
+            count += 1
+
+        return self._report(sums, histogram, count, len(replaced), len(added))
+
+    def simulate_batch(self, scenarios: List[List[dict]]) -> List[dict]:
+        return [self.simulate(edits) for edits in scenarios]
+
+    def baseline(self) -> dict:
+        return self._report(self.sums, self.planet_histogram, len(self.dishes), 0, 0)
+
+    def _report(self, sums: dict, histogram: array, n: int, changed: int, added: int) -> dict:
+        if n:
+            stats = {
+                "average_sustainability_score": round(sums["s_planet"] / n, 2),
+                "average_pleasure_score": round(sums["s_pleasure"] / n, 2),
+                "average_fit_score": round(sums["s_fit"] / n, 2),
+                "average_total_score": round(sums["total"] / n, 2),
+                "total_dishes": n,
+                "plant_based_percentage": round(sums["plant"] / n * 100, 1),
+                "high_nova_percentage": round(sums["high_nova"] / n * 100, 1),
+            }
+        else:
+            stats = {
+                "average_sustainability_score": 0,
+                "average_pleasure_score": 0,
+                "average_fit_score": 0,
+                "average_total_score": 0,
+                "total_dishes": 0,
+                "plant_based_percentage": 0,
+                "high_nova_percentage": 0,
+            }
+
+        average = round(sums["total"] / n, 2) if n else 0.0
+        better = len(self.neighbours) - bisect_right(self.neighbours, average)
+
+        return {
+            "menu_stats": stats,
+            "planet_score_distribution": {
+                f"{low}-{low + 1}": histogram[low - 1] for low in PLANET_BINS
+            },
+            "rank": better + 1,
+            "restaurants_compared": len(self.neighbours) + 1,
+            "changed_dishes": changed,
+            "added_dishes": added,
+        }
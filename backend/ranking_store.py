@@ -0,0 +1,249 @@
+"""
+RANKING STORE
+=============
+Sous-scores (fit, pleasure, planet) des plats d'un classement gardés en
+mémoire, pour recalculer totaux et ordre avec d'autres poids (/api/rerank)
+sans relancer OCR, enrichissement ni scoring.
+
+- Un classement = un menu scoré pour un profil (le fit dépend du profil),
+  identifié par un ranking_id opaque renvoyé par /api/score-menu et
+  /api/full-pipeline.
+- Les sous-scores sont stockés non arrondis en colonnes (array) : avec les
+  poids par défaut, le rerank redonne exactement les totaux et l'ordre du
+  scoring initial (tri stable, égalités dans l'ordre du menu).
+- Pagination : un curseur opaque (ranking_id + position + poids + taille de
+  page) permet de lire la page suivante en découpant l'ordre stocké, sans
+  rescorer (/api/rankings/next).
+- Stockage local au processus (TTL + LRU) : derrière plusieurs workers, le
+  rerank doit arriver sur le même worker (sticky sessions) ou refaire un score-menu.
+
+Configuration :
+    RANKING_TTL        durée de vie d'un classement en secondes (défaut: 900)
+    RANKING_MAX_ITEMS  nombre max de classements gardés (défaut: 1000)
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import base64
+import json
+import os
+import secrets
+import threading
+import time
+
+from scoring_multi_resto import DEFAULT_WEIGHTS, ScoredDish, project_dish
+
+DEFAULT_TTL = 900
+DEFAULT_MAX_ITEMS = 1000
+
+# Ordres déjà calculés par classement (curseurs de pagination, sliders qui reviennent)
+_ORDER_CACHE_SIZE = 8
+
+
+def validate_weights(weights: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """Poids {fit, pleasure, planet} complétés par les défauts (ValueError si invalides)"""
+    merged = dict(DEFAULT_WEIGHTS)
+    for key, value in (weights or {}).items():
+        if key not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown weight: {key}")
+        if value is None or value < 0:
+            raise ValueError(f"Weight {key} must be >= 0")
+        merged[key] = float(value)
+    if sum(merged.values()) <= 0:
+        raise ValueError("At least one weight must be > 0")
+    return merged
+
+
+def encode_cursor(ranking_id: str, offset: int, limit: int, weights: Dict[str, float]) -> str:
+    payload = json.dumps(
+        [ranking_id, offset, limit, [weights["fit"], weights["pleasure"], weights["planet"]]],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int, Dict[str, float]]:
+    """(ranking_id, offset, limit, weights) - ValueError si le curseur est invalide"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ranking_id, offset, limit, (fit, pleasure, planet) = json.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+        offset, limit = int(offset), int(limit)
+        weights = validate_weights({"fit": fit, "pleasure": pleasure, "planet": planet})
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if offset < 0 or limit <= 0:
+        raise ValueError("Invalid cursor")
+    return str(ranking_id), offset, limit, weights
+
+
+class Ranking:
+    """Plats d'un classement (ordre du menu) + sous-scores bruts en colonnes"""
+
+    def __init__(self, ranking_id: str, scored: List[ScoredDish], mode: str, filtered_out_count: int):
+        self.ranking_id = ranking_id
+        self.mode = mode
+        self.filtered_out_count = filtered_out_count
+        self.created_at = time.time()
+        self.dishes = list(scored)
+
+        self.fit = array("d")
+        self.pleasure = array("d")
+        self.planet = array("d")
+        for dish in self.dishes:
+            fit, pleasure, planet = dish._raw_sub_scores or (
+                dish.sub_scores.s_fit,
+                dish.sub_scores.s_pleasure,
+                dish.sub_scores.s_planet,
+            )
+            self.fit.append(fit)
+            self.pleasure.append(pleasure)
+            self.planet.append(planet)
+
+        self.plant = [
+            "vegan" in d.enriched_attributes.dietary_tags
+            or "vegetarian" in d.enriched_attributes.dietary_tags
+            for d in self.dishes
+        ]
+        self._dumps: List[Optional[dict]] = [None] * len(self.dishes)
+        self._orders: "OrderedDict[tuple, Tuple[List[float], List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.dishes)
+
+    def order(self, weights: Dict[str, float]) -> Tuple[List[float], List[int]]:
+        """(totaux arrondis par plat, indices triés par total décroissant)"""
+        key = (weights["fit"], weights["pleasure"], weights["planet"])
+        with self._lock:
+            cached = self._orders.get(key)
+            if cached is not None:
+                self._orders.move_to_end(key)
+                return cached
+
+        w_fit, w_pleasure, w_planet = key
+        totals = [
+            round(fit * w_fit + pleasure * w_pleasure + planet * w_planet, 2)
+            for fit, pleasure, planet in zip(self.fit, self.pleasure, self.planet)
+        ]
+        # Tri stable : mêmes égalités que finalize_* (ordre du menu)
+        order = sorted(range(len(totals)), key=totals.__getitem__, reverse=True)
+
+        with self._lock:
+            self._orders[key] = (totals, order)
+            if len(self._orders) > _ORDER_CACHE_SIZE:
+                self._orders.popitem(last=False)
+        return totals, order
+
+    def dish_dict(
+        self, index: int, total: float, rank: int, projection: Optional[dict] = None
+    ) -> dict:
+        dump = self._dumps[index]
+        if dump is None:
+            dump = self._dumps[index] = self.dishes[index].model_dump()
+        return project_dish({**dump, "total_score": total, "rank_index": rank}, projection)
+
+    def page(
+        self,
+        weights: Dict[str, float],
+        offset: int,
+        limit: int,
+        projection: Optional[dict] = None,
+    ) -> List[dict]:
+        totals, order = self.order(weights)
+        return [
+            self.dish_dict(i, totals[i], rank, projection)
+            for rank, i in enumerate(order[offset : offset + limit], start=offset)
+        ]
+
+    def next_cursor(self, weights: Dict[str, float], offset: int, limit: int) -> Optional[str]:
+        """Curseur de la page qui commence à offset (None si plus rien à lire)"""
+        if offset >= len(self.dishes) or limit <= 0:
+            return None
+        return encode_cursor(self.ranking_id, offset, limit, weights)
+
+    def restaurant_rankings(self, totals: List[float]) -> List[dict]:
+        """Même calcul que ImprovedScorer._calculate_restaurant_rankings, sur les totaux donnés"""
+        restos: Dict[str, dict] = {}
+        for i, dish in enumerate(self.dishes):
+            data = restos.setdefault(
+                dish.restaurant_name, {"names": [], "scores": [], "plant_based_count": 0}
+            )
+            data["names"].append(dish.name)
+            data["scores"].append(totals[i])
+            data["plant_based_count"] += self.plant[i]
+
+        rankings = []
+        for resto, data in restos.items():
+            scores = data["scores"]
+            rankings.append(
+                {
+                    "restaurant_name": resto,
+                    "average_score": round(sum(scores) / len(scores), 2),
+                    "dish_count": len(scores),
+                    "best_dish": data["names"][scores.index(max(scores))],
+                    "plant_based_percentage": round(
+                        data["plant_based_count"] / len(scores) * 100, 1
+                    ),
+                }
+            )
+        rankings.sort(key=lambda r: r["average_score"], reverse=True)
+        return rankings
+
+
+class RankingStore:
+    """ranking_id → Ranking, avec TTL et taille max (LRU), thread-safe"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_items: int = DEFAULT_MAX_ITEMS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._rankings: "OrderedDict[str, Ranking]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, scored: List[ScoredDish], mode: str, filtered_out_count: int = 0) -> str:
+        """Enregistre les plats scorés (ordre du menu, avant finalize_*) et renvoie leur ranking_id"""
+        ranking = Ranking(secrets.token_urlsafe(12), scored, mode, filtered_out_count)
+        with self._lock:
+            self._rankings[ranking.ranking_id] = ranking
+            self._evict()
+        return ranking.ranking_id
+
+    def get(self, ranking_id: str) -> Optional[Ranking]:
+        with self._lock:
+            ranking = self._rankings.get(ranking_id)
+            if ranking is None:
+                return None
+            if time.time() - ranking.created_at > self.ttl:
+                del self._rankings[ranking_id]
+                return None
+            self._rankings.move_to_end(ranking_id)
+            return ranking
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        while self._rankings:
+            oldest = next(iter(self._rankings.values()))
+            if len(self._rankings) <= self.max_items and oldest.created_at >= cutoff:
+                break
+            self._rankings.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._rankings)
+
+
+_STORE: Optional[RankingStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_ranking_store() -> RankingStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = RankingStore(
+                    ttl=float(os.getenv("RANKING_TTL", DEFAULT_TTL)),
+                    max_items=int(os.getenv("RANKING_MAX_ITEMS", DEFAULT_MAX_ITEMS)),
+                )
+    return _STORE
@@ -4,17 +4,28 @@ SCORING ENGINE MVP HACKATHON - MULTI-RESTAURANT VERSION
 Moteur de scoring avec support multi-restaurants + allergènes
 """
 
-from typing import List, Dict, Optional
-from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 import os
+import sys
 import json
+import time
+
+from ingredient_db import IngredientDatabase
+from interning import dish_key, get_enrichment_interner, intern_keys, intern_strings
+from llm_cache import cache_key, get_llm_cache
+from llm_guard import LLM_BREAKER, LLMBudget, full_call_timeout, guard_llm_call
+from text_normalize import dish_text, fold, fold_keywords, fold_labeled, fold_lexicon
+from upstream_replay import wrap_extract_with_llm
 
 # LLM Integration (optional - falls back to rules if no API key)
+# `requests` is imported on first LLM call to keep the import of this module cheap
+# (scoring-only replicas, tests): see check_import_time.py
 try:
-    import requests
+    import importlib.util
 
     BLACKBOX_API_KEY = os.getenv("BLACKBOX_API_KEY", "")
-    HAS_LLM = bool(BLACKBOX_API_KEY)
+    HAS_LLM = bool(BLACKBOX_API_KEY) and importlib.util.find_spec("requests") is not None
 except:
     HAS_LLM = False
 
@@ -131,7 +142,6 @@ PRICE_DB = {
     "burrata": 18.0,
     "parmesan": 18.0,
     "pecorino": 16.0,
-    "comte": 16.0,
     "comté": 16.0,
     "goat cheese": 14.0,
     "chèvre": 14.0,
@@ -146,7 +156,6 @@ PRICE_DB = {
     "beurre": 8.0,
     # --- BASES ---
     "egg": 3.5,
-    "oeuf": 3.5,
     "œuf": 3.5,
     "bread": 1.5,
     "pain": 1.5,
@@ -356,6 +365,20 @@ CARBON_DB = {
     "fruit": 0.5,
 }
 
+# Index compilé (Aho-Corasick) sur les bases ci-dessus + dataset externe
+# optionnel (INGREDIENT_DB_PATH, ex: export Agribalyse), construit au premier usage
+_INGREDIENT_DB: Optional[IngredientDatabase] = None
+
+
+def get_ingredient_db() -> IngredientDatabase:
+    global _INGREDIENT_DB
+    if _INGREDIENT_DB is None:
+        _INGREDIENT_DB = IngredientDatabase.load(
+            CARBON_DB, PRICE_DB, NUTRISCORE_DB, os.getenv("INGREDIENT_DB_PATH")
+        )
+    return _INGREDIENT_DB
+
+
 # ============================================================================
 # NEW: ALLERGEN DATABASE
 # ============================================================================
@@ -363,7 +386,7 @@ CARBON_DB = {
 ALLERGEN_DB = {
     "gluten": [
         "wheat",
-        "blé",
+        " blé",  # début de mot : sans accent, "ble" est dans "vegetable"
         "bread",
         "pain",
         "pasta",
@@ -389,7 +412,7 @@ ALLERGEN_DB = {
         "mozzarella",
         "parmesan",
     ],
-    "eggs": ["egg", "oeuf", "œuf", "mayonnaise", "mayo"],
+    "eggs": ["egg", "œuf", "mayonnaise", "mayo"],
     "fish": [
         "fish",
         "poisson",
@@ -442,12 +465,29 @@ ALLERGEN_DB = {
     "mollusks": ["snail", "escargot", "squid", "calamar", "octopus", "poulpe"],
 }
 
+# Lexique replié (text_normalize), comparé au texte replié du plat
+_ALLERGEN_KEYWORDS = fold_lexicon(ALLERGEN_DB)
+
+# Bit positions for compact allergen masks (profile matching)
+ALLERGEN_BITS = {allergen: 1 << i for i, allergen in enumerate(ALLERGEN_DB)}
+
+
+def allergen_mask(allergens: List[str]) -> int:
+    """Encode a list of allergen names as a bitmask (unknown names are ignored)"""
+    mask = 0
+    for allergen in allergens:
+        mask |= ALLERGEN_BITS.get(allergen, 0)
+    return mask
+
 # ============================================================================
 # MODÈLES PYDANTIC - UPDATED
 # ============================================================================
 
 
 class EnrichedAttributes(BaseModel):
+    # Partagé entre plats identiques (voir interning.py) : immuable
+    model_config = ConfigDict(frozen=True)
+
     ingredients: List[str] = Field(default_factory=list)
     ingredient_weights: Dict[str, float] = Field(default_factory=dict)
     nova_score: int = Field(ge=1, le=4, default=2)
@@ -478,6 +518,9 @@ class ScoredDish(BaseModel):
     comment: str
     enriched_attributes: EnrichedAttributes
 
+    # (fit, pleasure, planet) non arrondis : rerank exact avec d'autres poids (ranking_store.py)
+    _raw_sub_scores: Optional[tuple] = PrivateAttr(default=None)
+
 
 class RestaurantRanking(BaseModel):  # NEW!
     restaurant_name: str
@@ -515,21 +558,292 @@ class MenuAnalysisResult(BaseModel):
     swap_suggestions: Optional[List[SwapSuggestion]] = None
 
 
+# ============================================================================
+# PROJECTION DES RÉPONSES
+# ============================================================================
+
+# Profils de réponse : champs de ScoredDish renvoyés (None = tout, y compris
+# enriched_attributes). "map" = vue carte mobile (nom, score, commentaire).
+RESPONSE_PROFILES = {
+    "full": None,
+    "compact": [
+        "id",
+        "name",
+        "price",
+        "restaurant_name",
+        "total_score",
+        "rank_index",
+        "comment",
+        "sub_scores",
+    ],
+    "map": ["id", "name", "restaurant_name", "total_score", "comment"],
+}
+
+_NESTED_MODELS = {"sub_scores": SubScores, "enriched_attributes": EnrichedAttributes}
+
+
+def dish_projection(
+    response_profile: str = "full", fields: Optional[List[str]] = None
+) -> Optional[dict]:
+    """
+    Spécification "include" (pydantic) des champs de ScoredDish à renvoyer
+
+    fields (prioritaire sur le profil) accepte les sous-champs pointés :
+    ["name", "total_score", "enriched_attributes.dietary_tags"].
+    None = tous les champs. ValueError si un champ ou un profil est inconnu.
+    """
+    names = [f.strip() for f in fields or [] if f.strip()]
+    if not names:
+        if response_profile not in RESPONSE_PROFILES:
+            raise ValueError(f"Unknown response profile: {response_profile}")
+        names = RESPONSE_PROFILES[response_profile]
+        if names is None:
+            return None
+
+    spec: Dict[str, object] = {}
+    for name in names:
+        top, _, sub = name.partition(".")
+        if top not in ScoredDish.model_fields:
+            raise ValueError(f"Unknown field: {name}")
+        if not sub:
+            spec[top] = True
+            continue
+        if top not in _NESTED_MODELS or sub not in _NESTED_MODELS[top].model_fields:
+            raise ValueError(f"Unknown field: {name}")
+        if spec.get(top) is not True:
+            spec.setdefault(top, {})[sub] = True
+    return spec
+
+
+def project_dish(dish: dict, projection: Optional[dict]) -> dict:
+    """Même projection que model_dump(include=...) sur un plat déjà sérialisé"""
+    if projection is None:
+        return dish
+    projected = {}
+    for key, value in dish.items():
+        keep = projection.get(key)
+        if keep is True:
+            projected[key] = value
+        elif keep:
+            projected[key] = project_dish(value, keep)
+    return projected
+
+
+def _result_include(projection: Optional[dict]) -> Optional[dict]:
+    if projection is None:
+        return None
+    return {
+        "scored_dishes": {"__all__": projection},
+        "overall_menu_stats": True,
+        "restaurant_rankings": True,
+        "swap_suggestions": True,
+    }
+
+
+# ============================================================================
+# PROFILE MATCHER (FIT CONSUMER COMPILÉ)
+# ============================================================================
+
+NUTRI_FIT_BONUS = {"A": 2.5, "B": 1.5, "C": 0, "D": -1.5, "E": -2.5}
+
+# Allergènes qui trahissent un plat "vegetarian" non vegan
+NON_VEGAN_ALLERGENS = allergen_mask(["lactose", "eggs", "fish", "shellfish"])
+
+MEAT_FISH_PROTEINS = frozenset(
+    [
+        "beef",
+        "boeuf",
+        "chicken",
+        "poulet",
+        "pork",
+        "porc",
+        "lamb",
+        "agneau",
+        "duck",
+        "canard",
+        "fish",
+        "poisson",
+        "salmon",
+        "saumon",
+        "shrimp",
+        "crevette",
+        "tuna",
+        "kebab",
+        "nuggets",
+        "merguez",
+    ]
+)
+PORK_PROTEINS = frozenset(["pork", "porc"])
+PORK_INGREDIENTS = frozenset(["pork", "porc", "bacon", "lardon", "ham", "jambon"])
+SPORT_PROTEINS = frozenset(
+    ["chicken", "poulet", "tofu", "tempeh", "salmon", "saumon", "lentils", "lentilles"]
+)
+PLANT_PROTEINS = frozenset(
+    ["tofu", "tempeh", "lentils", "lentilles", "chickpeas", "pois chiches"]
+)
+
+
+class ProfileMatcher:
+    """
+    Profil utilisateur compilé une fois par requête : restriction, objectif et
+    allergènes sont résolus à l'avance, fit(e) ne fait plus que les tests utiles.
+    Résultat identique à l'ancien _fit_consumer, plat par plat.
+    """
+
+    def __init__(self, profile: dict):
+        restriction = profile.get("dietary_restriction", "").lower()
+        goal = profile.get("goal", "").lower()
+        allergens = profile.get("allergens", [])
+
+        self.strict_filter = profile.get("strict_filter", True)
+        self.allergen_mask = allergen_mask(allergens)
+        self.omnivore = not restriction
+        self._restriction_fit = {
+            "vegan": self._fit_vegan,
+            "vegetarian": self._fit_vegetarian,
+            "gluten-free": self._fit_gluten_free,
+            "halal": self._fit_halal,
+        }.get(restriction)
+
+        if "weight_loss" in goal or "perte" in goal:
+            self._goal_fit = self._fit_weight_loss
+        elif "muscle" in goal or "sport" in goal or "athlete" in goal:
+            self._goal_fit = self._fit_muscle
+        else:
+            self._goal_fit = None
+
+        # Plats internés (interning.py) : même enregistrement → même score
+        self._memo: Dict[int, tuple] = {}
+
+    def fit(self, e: EnrichedAttributes) -> float:
+        memo = self._memo.get(id(e))
+        if memo is not None and memo[0] is e:
+            return memo[1]
+        score = self._fit(e)
+        self._memo[id(e)] = (e, score)
+        return score
+
+    def _fit(self, e: EnrichedAttributes) -> float:
+        # CRITICAL: allergènes d'abord
+        if self.allergen_mask and allergen_mask(e.allergens) & self.allergen_mask:
+            return 0.0
+
+        score = 5.0
+        score += NUTRI_FIT_BONUS.get(e.nutriscore, 0)
+
+        if self._restriction_fit is not None:
+            score = self._restriction_fit(e, score)
+            if score is None:
+                return 0.0  # Hard filter
+
+        if self.omnivore:
+            if "vegan" in e.dietary_tags:
+                score += 1.5
+            elif "vegetarian" in e.dietary_tags:
+                score += 1.0
+
+        if self._goal_fit is not None:
+            score = self._goal_fit(e, score)
+
+        return max(0, min(10, score))
+
+    # Restrictions : nouveau score, ou None si le plat est exclu
+
+    def _penalty(self, score: float, penalty: float) -> Optional[float]:
+        return None if self.strict_filter else score - penalty
+
+    def _fit_vegan(self, e: EnrichedAttributes, score: float) -> Optional[float]:
+        if "vegan" in e.dietary_tags:
+            return score + 4.0
+        if "vegetarian" in e.dietary_tags:
+            if allergen_mask(e.allergens) & NON_VEGAN_ALLERGENS:
+                return self._penalty(score, 2.0)  # Not actually vegan
+            return score + 1.0  # Potentially veganizable
+        return self._penalty(score, 3.0)  # Contains meat/fish
+
+    def _fit_vegetarian(self, e: EnrichedAttributes, score: float) -> Optional[float]:
+        if "vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags:
+            return score + 3.5
+        if e.primary_protein in MEAT_FISH_PROTEINS:
+            return self._penalty(score, 2.5)
+        return self._penalty(score, 1.0)  # Ambiguous - be cautious
+
+    def _fit_gluten_free(self, e: EnrichedAttributes, score: float) -> Optional[float]:
+        if "gluten-free" in e.dietary_tags:
+            return score + 3.5
+        if "gluten" in e.allergens:
+            return self._penalty(score, 3.0)
+        return score
+
+    def _fit_halal(self, e: EnrichedAttributes, score: float) -> Optional[float]:
+        if "halal" in e.dietary_tags:
+            return score + 4.0
+        if e.primary_protein in PORK_PROTEINS or not PORK_INGREDIENTS.isdisjoint(
+            e.ingredients
+        ):
+            return self._penalty(score, 5.0)
+        return score
+
+    # Objectifs santé
+
+    def _fit_weight_loss(self, e: EnrichedAttributes, score: float) -> float:
+        if e.carbon_estimate < 5.0 and e.nova_score <= 2:
+            score += 2.0
+        if "vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags:
+            score += 1.0
+        return score
+
+    def _fit_muscle(self, e: EnrichedAttributes, score: float) -> float:
+        if e.primary_protein in SPORT_PROTEINS:
+            score += 2.0
+        if e.primary_protein in PLANT_PROTEINS:
+            score += 0.5
+        return score
+
+
 # ============================================================================
 # LLM HELPER (MINIMAL)
 # ============================================================================
 
+LLM_MODEL = "blackboxai/openai/gpt-4o-mini"
+# Bump when the prompt below changes: invalidates cached answers (llm_cache.py)
+LLM_PROMPT_VERSION = 1
+
+
+def _llm_fallback(reason: str) -> Dict:
+    return {
+        "ingredients": [],
+        "weights": {},
+        "nova": 2,
+        "confidence": 0.0,
+        "llm_used": False,
+        "fallback_reason": reason,
+    }
+
+
+def extract_with_llm(
+    dish_name: str, description: str, budget: Optional[LLMBudget] = None
+) -> Dict:
+    """
+    Extract ingredients with BLACKBOX AI - falls back to empty if no API key
 
-def extract_with_llm(dish_name: str, description: str) -> Dict:
-    """Extract ingredients with BLACKBOX AI - falls back to empty if no API key"""
+    The call is bounded by the request budget (if any) and skipped while the
+    circuit breaker is open; the fallback dict then carries `fallback_reason`.
+    """
     if not HAS_LLM:
-        return {
-            "ingredients": [],
-            "weights": {},
-            "nova": 2,
-            "confidence": 0.0,
-            "llm_used": False,
-        }
+        return _llm_fallback("disabled")
+
+    # Shared persistent cache (all workers, survives restarts)
+    cache = get_llm_cache()
+    key = cache_key(dish_name, description, LLM_MODEL, LLM_PROMPT_VERSION)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    skip_reason = guard_llm_call(budget)
+    if skip_reason:
+        return _llm_fallback(skip_reason)
 
     prompt = f"""Tu es un expert en analyse alimentaire. Analyse ce plat de restaurant français.
 
@@ -547,6 +861,10 @@ Exemple de sortie:
 
 Retourne UNIQUEMENT le JSON, sans explication."""
 
+    import requests
+
+    timeout = budget.call_timeout() if budget is not None else full_call_timeout()
+    started = time.monotonic()
     try:
         response = requests.post(
             "https://api.blackbox.ai/v1/chat/completions",
@@ -556,11 +874,11 @@ Retourne UNIQUEMENT le JSON, sans explication."""
             },
             json={
                 "messages": [{"role": "user", "content": prompt}],
-                "model": "blackboxai/openai/gpt-4o-mini",
+                "model": LLM_MODEL,
                 "temperature": 0.2,
                 "max_tokens": 500,
             },
-            timeout=20,
+            timeout=timeout,
         )
 
         if response.status_code == 200:
@@ -575,25 +893,26 @@ Retourne UNIQUEMENT le JSON, sans explication."""
             if json_match:
                 data = json.loads(json_match.group())
                 if "ingredients" in data and "weights" in data and "nova" in data:
+                    LLM_BREAKER.record_success(time.monotonic() - started)
                     data["llm_used"] = True
+                    if cache is not None:
+                        cache.set(key, data)
                     return data
 
-        return {
-            "ingredients": [],
-            "weights": {},
-            "nova": 2,
-            "confidence": 0.0,
-            "llm_used": False,
-        }
+        LLM_BREAKER.record_failure()
+        return _llm_fallback("invalid_response")
+
+    except requests.Timeout:
+        # Connexion ou lecture : compté comme échec seulement au timeout complet
+        LLM_BREAKER.record_timeout(timeout)
+        return _llm_fallback("timeout")
+    except Exception:
+        LLM_BREAKER.record_failure()
+        return _llm_fallback("error")
 
-    except Exception as e:
-        return {
-            "ingredients": [],
-            "weights": {},
-            "nova": 2,
-            "confidence": 0.0,
-            "llm_used": False,
-        }
+
+# Benchmarks déterministes : enregistrement / rejeu (UPSTREAM_MODE, voir upstream_replay.py)
+extract_with_llm = wrap_extract_with_llm(extract_with_llm, LLM_MODEL, LLM_PROMPT_VERSION)
 
 
 # ============================================================================
@@ -626,7 +945,11 @@ class ImprovedAnalyzer:
         "crispy",
         "croustillant",
         "crunchy",
-        "pané",
+        # mot entier : replié, "pane" est dans "panettone" et "paneer"
+        " pané ",
+        " panée ",
+        " panés ",
+        " panées ",
         "juicy",
         "juteux",
         "tendre",
@@ -657,15 +980,17 @@ class ImprovedAnalyzer:
         "sweet",
         "doux",
         "sucré-salé",
-        "grilled",
-        "grillé",
+        "grillé",  # replié en "grille" : couvre aussi "grilled"
         "roasted",
         "rôti",
         "braisé",
         "mijoté",
         "snacké",
         "caramélisé",
-        "fumé",
+        "fumé ",
+        "fumée ",
+        "fumés ",
+        "fumées ",
         "smoked",
         "confit",
     ]
@@ -701,12 +1026,220 @@ class ImprovedAnalyzer:
         "huile de palme",
     ]
 
-    def enrich_dish(self, dish_data: dict) -> EnrichedAttributes:
-        text = f"{dish_data.get('name', '')} {dish_data.get('description', '')}".lower()
+    NOVA_PROCESSED_MARKERS = [
+        "canned",
+        "conserve",
+        "smoked",
+        # fin de mot : replié, "fume" est dans "fumet"
+        "fumé ",
+        "fumée ",
+        "fumés ",
+        "fumées ",
+        "cured",
+        "saucisson",
+        "jambon",
+        "bacon",
+    ]
+
+    NOVA_FRESH_MARKERS = [
+        "fresh",
+        "frais",
+        "raw",
+        "cru",
+        "organic",
+        "bio",
+        "homemade",
+        "maison",
+        "du jour",
+        "minute",
+    ]
+
+    MEAT_FISH_PRODUCTS = [
+        "beef",
+        "bœuf",
+        "steak",
+        "bavette",
+        "tartare",
+        "chicken",
+        "poulet",
+        "volaille",
+        "nuggets",
+        "tenders",
+        "ham",
+        "pork",
+        "porc",
+        "bacon",
+        "lardon",
+        "jambon",
+        "saucisse",
+        "merguez",
+        "duck",
+        "canard",
+        "magret",
+        "foie gras",
+        "lamb",
+        "agneau",
+        "kebab",
+        "viande",
+        "fish",
+        "poisson",
+        "salmon",
+        "saumon",
+        "tuna",
+        "thon",
+        "cod",
+        "cabillaud",
+        "shrimp",
+        "crevette",
+        "mussels",
+        "moules",
+        "scallops",
+        "saint-jacques",
+        "escargot",
+        "snail",
+        "escargots",
+        "snails",
+    ]
 
-        # 1. Extraction LLM (Optionnel)
+    # Produits animaux compatibles avec un plat végétarien
+    VEGETARIAN_ANIMAL_PRODUCTS = [
+        "cheese",
+        "fromage",
+        "cream",
+        "crème",
+        "butter",
+        "beurre",
+        "egg",
+        "œuf",
+        "honey",
+        "miel",
+    ]
+
+    ANIMAL_PRODUCTS = MEAT_FISH_PRODUCTS + VEGETARIAN_ANIMAL_PRODUCTS
+
+    PLANT_PROTEIN_MARKERS = [
+        "tofu",
+        "lentil",
+        "lentilles",
+        "chickpea",
+        "pois chiche",
+        "mushroom",
+        "champignon",
+        "falafel",
+    ]
+
+    PROTEIN_PRIORITY = [
+        ("lamb", ["lamb", "agneau", "gigot", "merguez", "kebab", "viande grecque"]),
+        (
+            "beef",
+            [
+                "beef",
+                "bœuf",
+                "steak",
+                "entrecote",
+                "bavette",
+                "tartare",
+                "burger",
+            ],
+        ),
+        ("duck", ["duck", "canard", "magret", "confit", "foie gras"]),
+        ("snails", ["snail", "escargot", "escargots"]),  # ⚠️ ADDED!
+        ("veal", ["veal", "veau", "ris de veau", "foie de veau"]),
+        (
+            "pork",
+            [
+                "pork",
+                "porc",
+                "bacon",
+                "lardon",
+                "jambon",
+                "ribs",
+                "travers",
+                "saucisse",
+                "andouillette",
+            ],
+        ),
+        ("chicken", ["chicken", "poulet", "volaille", "wings", "dinde"]),
+        ("nuggets", ["nuggets", "tenders", "cordon bleu"]),
+        ("salmon", ["salmon", "saumon", "gravlax"]),
+        ("tuna", ["tuna", "thon"]),
+        ("scallops", ["scallops", "saint-jacques", "st jacques"]),
+        ("shrimp", ["shrimp", "crevette", "gambas"]),
+        (
+            "fish",
+            [
+                "fish",
+                "poisson",
+                "cod",
+                "cabillaud",
+                "haddock",
+                "merlan",
+                "lieu",
+                "bar",
+                "maigre",
+                "dorade",
+            ],
+        ),
+        ("mussels", ["mussels", "moules"]),
+        ("egg", ["egg", "œuf", "omelette"]),
+        ("cheese", ["burrata", "mozzarella", "camembert", "halloumi", "paneer"]),
+        ("lentils", ["lentil", "lentilles"]),
+        ("chickpeas", ["chickpea", "pois chiche", "houmous", "falafel"]),
+        ("tofu", ["tofu"]),
+    ]
+
+    # Lexiques compilés une fois en forme repliée (text_normalize) : les matchers
+    # ci-dessous ne voient que le texte replié du plat (dish_text)
+    _DIETARY_KEYWORDS = fold_lexicon(DIETARY_TAGS)
+    _SENSORY_KEYWORDS = fold_labeled(SENSORY_POSITIVE)
+    _ULTRA_PROCESSED = fold_keywords(ULTRA_PROCESSED_MARKERS)
+    _NOVA_PROCESSED = fold_keywords(NOVA_PROCESSED_MARKERS)
+    _NOVA_FRESH = fold_keywords(NOVA_FRESH_MARKERS)
+    _ANIMAL_PRODUCTS = fold_keywords(ANIMAL_PRODUCTS)
+    _MEAT_FISH = fold_keywords(MEAT_FISH_PRODUCTS)
+    _PLANT_PROTEINS = fold_keywords(PLANT_PROTEIN_MARKERS)
+    _PROTEIN_KEYWORDS = [
+        (protein, fold_keywords(keywords)) for protein, keywords in PROTEIN_PRIORITY
+    ]
+
+    def enrich_dish(
+        self, dish_data: dict, budget: Optional[LLMBudget] = None
+    ) -> EnrichedAttributes:
+        """
+        Enrichissement d'un plat, partagé entre plats identiques (même texte,
+        même prix) : "Frites" n'est analysé qu'une fois pour toute la ville
+        """
+        interner = get_enrichment_interner()
+        if interner is None:
+            return self._enrich(dish_data, budget)[0]
+
+        key = dish_key(
+            dish_data.get("name", ""), dish_data.get("description", ""), dish_data.get("price")
+        )
+        entry = interner.get(key)
+        if entry is None:
+            enriched, fallback_reason = self._enrich(dish_data, budget)
+            return interner.put(key, enriched, fallback_reason)
+
+        enriched, fallback_reason = entry
+        # Le rapport du budget liste chaque plat passé par les règles
+        if budget is not None and fallback_reason is not None:
+            budget.record_fallback(
+                dish_data.get("id"), dish_data.get("name", ""), fallback_reason
+            )
+        return enriched
+
+    def _enrich(
+        self, dish_data: dict, budget: Optional[LLMBudget] = None
+    ) -> Tuple[EnrichedAttributes, Optional[str]]:
+        """(enrichissement, raison du repli sur les règles ou None si LLM utilisé)"""
+        # Forme repliée calculée une fois par plat, partagée avec les swaps
+        text = dish_text(dish_data.get("name", ""), dish_data.get("description", ""))
+        fallback_reason = None
+
+        # 1. Extraction LLM (Optionnel, borné par le budget de la requête)
         llm_data = extract_with_llm(
-            dish_data.get("name", ""), dish_data.get("description", "")
+            dish_data.get("name", ""), dish_data.get("description", ""), budget
         )
 
         if (
@@ -718,9 +1251,16 @@ class ImprovedAnalyzer:
             weights = llm_data.get("weights", {})
             nova = llm_data.get("nova", 2)
         else:
-            ingredients = self._extract_ingredients(text)
+            ingredients = self._extract_ingredients(
+                text, f"{dish_data.get('name', '')} {dish_data.get('description', '')}"
+            )
             weights = {ing: 150.0 for ing in ingredients}
             nova = self._nova_score_correct(text)
+            fallback_reason = llm_data.get("fallback_reason", "low_confidence")
+            if budget is not None:
+                budget.record_fallback(
+                    dish_data.get("id"), dish_data.get("name", ""), fallback_reason
+                )
 
         primary = self._identify_protein(text) or (
             ingredients[0] if ingredients else None
@@ -734,165 +1274,59 @@ class ImprovedAnalyzer:
         nutri = self._calculate_nutriscore(ingredients)
         allergens = self._detect_allergens(text, ingredients)  # NEW!
 
-        return EnrichedAttributes(
-            ingredients=ingredients,
-            ingredient_weights=weights,
+        # Chaînes répétées des milliers de fois : une seule copie (sys.intern)
+        enriched = EnrichedAttributes(
+            ingredients=intern_strings(ingredients),
+            ingredient_weights=intern_keys(weights),
             nova_score=nova,
             nutriscore=nutri,
-            sensory_keywords=self._extract_sensory(text),
-            dietary_tags=self._extract_dietary(text),
-            allergens=allergens,  # NEW!
-            primary_protein=primary,
+            sensory_keywords=intern_strings(self._extract_sensory(text)),
+            dietary_tags=intern_strings(self._extract_dietary(text)),
+            allergens=intern_strings(allergens),  # NEW!
+            primary_protein=sys.intern(primary) if primary else primary,
             carbon_estimate=carbon,
             estimated_cost=cost,
         )
-
-    def _extract_ingredients(self, text: str) -> List[str]:
-        found = []
-        for ingredient in CARBON_DB.keys():
-            if ingredient in text:
-                found.append(ingredient)
+        return enriched, fallback_reason
+
+    # En dessous de ce nombre de correspondances exactes, second passage approximatif
+    # (fautes de frappe, bruit OCR : "scargots", "saumonn"...)
+    FUZZY_MIN_EXACT = 2
+
+    def _extract_ingredients(self, text: str, raw_text: str) -> List[str]:
+        """text : texte replié (dish_text) ; raw_text : texte d'origine, accents compris, pour les trigrammes"""
+        db = get_ingredient_db()
+        found = db.match(text)
+        if len(found) < self.FUZZY_MIN_EXACT:
+            found = found + db.fuzzy_match(raw_text, found)
         return found[:12]
 
     def _nova_score_correct(self, text: str) -> int:
-        if any(marker in text for marker in self.ULTRA_PROCESSED_MARKERS):
+        if any(marker in text for marker in self._ULTRA_PROCESSED):
             return 4
-        if any(
-            word in text
-            for word in [
-                "canned",
-                "conserve",
-                "smoked",
-                "fumé",
-                "cured",
-                "saucisson",
-                "jambon",
-                "bacon",
-            ]
-        ):
+        if any(word in text for word in self._NOVA_PROCESSED):
             return 3
-        if any(
-            word in text
-            for word in [
-                "fresh",
-                "frais",
-                "raw",
-                "cru",
-                "organic",
-                "bio",
-                "homemade",
-                "maison",
-                "du jour",
-                "minute",
-            ]
-        ):
+        if any(word in text for word in self._NOVA_FRESH):
             return 1
         return 2
 
     def _extract_sensory(self, text: str) -> List[str]:
-        return [kw for kw in self.SENSORY_POSITIVE if kw in text]
+        return [kw for folded, kw in self._SENSORY_KEYWORDS if folded in text]
 
     def _extract_dietary(self, text: str) -> List[str]:
         tags = []
 
-        for tag, keywords in self.DIETARY_TAGS.items():
+        for tag, keywords in self._DIETARY_KEYWORDS.items():
             if any(kw in text for kw in keywords):
                 tags.append(tag)
 
-        animal_products = [
-            "beef",
-            "boeuf",
-            "bœuf",
-            "steak",
-            "bavette",
-            "tartare",
-            "chicken",
-            "poulet",
-            "volaille",
-            "nuggets",
-            "tenders",
-            "ham",
-            "pork",
-            "porc",
-            "bacon",
-            "lardon",
-            "jambon",
-            "saucisse",
-            "merguez",
-            "duck",
-            "canard",
-            "magret",
-            "foie gras",
-            "lamb",
-            "agneau",
-            "kebab",
-            "viande",
-            "fish",
-            "poisson",
-            "salmon",
-            "saumon",
-            "tuna",
-            "thon",
-            "cod",
-            "cabillaud",
-            "shrimp",
-            "crevette",
-            "mussels",
-            "moules",
-            "scallops",
-            "saint-jacques",
-            "escargot",
-            "snail",
-            "escargots",
-            "snails",
-            "cheese",
-            "fromage",
-            "cream",
-            "crème",
-            "butter",
-            "beurre",
-            "egg",
-            "oeuf",
-            "œuf",
-            "honey",
-            "miel",
-        ]
-
-        has_animal = any(p in text for p in animal_products)
+        has_animal = any(p in text for p in self._ANIMAL_PRODUCTS)
 
         if not has_animal and "vegan" not in tags:
-            plant_proteins = [
-                "tofu",
-                "lentil",
-                "lentilles",
-                "chickpea",
-                "pois chiche",
-                "mushroom",
-                "champignon",
-                "falafel",
-            ]
-            if any(p in text for p in plant_proteins):
+            if any(p in text for p in self._PLANT_PROTEINS):
                 tags.append("vegan")
 
-        meat_fish = [
-            p
-            for p in animal_products
-            if p
-            not in [
-                "cheese",
-                "fromage",
-                "cream",
-                "crème",
-                "butter",
-                "beurre",
-                "egg",
-                "oeuf",
-                "œuf",
-                "honey",
-                "miel",
-            ]
-        ]
-        has_meat_fish = any(m in text for m in meat_fish)
+        has_meat_fish = any(m in text for m in self._MEAT_FISH)
 
         if not has_meat_fish and "vegetarian" not in tags and "vegan" not in tags:
             tags.append("vegetarian")
@@ -901,86 +1335,24 @@ class ImprovedAnalyzer:
 
     def _detect_allergens(self, text: str, ingredients: List[str]) -> List[str]:
         """NEW: Detect allergens in dish"""
+        folded_ingredients = {fold(ing) for ing in ingredients}
         detected = []
-        for allergen, keywords in ALLERGEN_DB.items():
+        for allergen, keywords in _ALLERGEN_KEYWORDS.items():
             if any(kw in text for kw in keywords) or any(
-                kw in ingredients for kw in keywords
+                kw.strip() in folded_ingredients for kw in keywords
             ):
                 detected.append(allergen)
         return detected
 
     def _identify_protein(self, text: str) -> Optional[str]:
-        protein_priority = [
-            ("lamb", ["lamb", "agneau", "gigot", "merguez", "kebab", "viande grecque"]),
-            (
-                "beef",
-                [
-                    "beef",
-                    "boeuf",
-                    "bœuf",
-                    "steak",
-                    "entrecote",
-                    "bavette",
-                    "tartare",
-                    "burger",
-                ],
-            ),
-            ("duck", ["duck", "canard", "magret", "confit", "foie gras"]),
-            ("snails", ["snail", "escargot", "escargots"]),  # ⚠️ ADDED!
-            ("veal", ["veal", "veau", "ris de veau", "foie de veau"]),
-            (
-                "pork",
-                [
-                    "pork",
-                    "porc",
-                    "bacon",
-                    "lardon",
-                    "jambon",
-                    "ribs",
-                    "travers",
-                    "saucisse",
-                    "andouillette",
-                ],
-            ),
-            ("chicken", ["chicken", "poulet", "volaille", "wings", "dinde"]),
-            ("nuggets", ["nuggets", "tenders", "cordon bleu"]),
-            ("salmon", ["salmon", "saumon", "gravlax"]),
-            ("tuna", ["tuna", "thon"]),
-            ("scallops", ["scallops", "saint-jacques", "st jacques"]),
-            ("shrimp", ["shrimp", "crevette", "gambas"]),
-            (
-                "fish",
-                [
-                    "fish",
-                    "poisson",
-                    "cod",
-                    "cabillaud",
-                    "haddock",
-                    "merlan",
-                    "lieu",
-                    "bar",
-                    "maigre",
-                    "dorade",
-                ],
-            ),
-            ("mussels", ["mussels", "moules"]),
-            ("egg", ["egg", "oeuf", "œuf", "omelette"]),
-            ("cheese", ["burrata", "mozzarella", "camembert", "halloumi", "paneer"]),
-            ("lentils", ["lentil", "lentilles"]),
-            ("chickpeas", ["chickpea", "pois chiche", "houmous", "falafel"]),
-            ("tofu", ["tofu"]),
-        ]
-
-        for protein, keywords in protein_priority:
+        for protein, keywords in self._PROTEIN_KEYWORDS:
             if any(kw in text for kw in keywords):
                 return protein
         return None
 
     def _estimate_carbon(self, text: str) -> float:
-        carbon_values = []
-        for ingredient, carbon in CARBON_DB.items():
-            if ingredient in text:
-                carbon_values.append(carbon)
+        db = get_ingredient_db()
+        carbon_values = [db.carbon[ingredient] for ingredient in db.match(text)]
         if carbon_values:
             return max(carbon_values)
         return 5.0
@@ -991,8 +1363,9 @@ class ImprovedAnalyzer:
         if total_weight == 0:
             return 5.0
 
+        db = get_ingredient_db()
         for ingredient, grams in weights.items():
-            carbon_per_kg = CARBON_DB.get(ingredient, 5.0)
+            carbon_per_kg = db.carbon_of(ingredient, 5.0)
             total_carbon += carbon_per_kg * (grams / 1000)
         return total_carbon
 
@@ -1003,8 +1376,9 @@ class ImprovedAnalyzer:
             return menu_price * 0.30
 
         total_cost = 0.0
+        db = get_ingredient_db()
         for ingredient, grams in weights.items():
-            price_per_kg = PRICE_DB.get(ingredient, 10.0)
+            price_per_kg = db.price_of(ingredient, 10.0)
             total_cost += price_per_kg * (grams / 1000)
 
         return total_cost if total_cost > 0 else 4.0
@@ -1012,7 +1386,8 @@ class ImprovedAnalyzer:
     def _calculate_nutriscore(self, ingredients: List[str]) -> str:
         if not ingredients:
             return "C"
-        scores = [NUTRISCORE_DB.get(ing, 3) for ing in ingredients]
+        db = get_ingredient_db()
+        scores = [db.nutriscore_of(ing, 3) for ing in ingredients]
         avg = sum(scores) / len(scores)
         if avg >= 4.5:
             return "A"
@@ -1030,62 +1405,198 @@ class ImprovedAnalyzer:
 # SCOREUR AMÉLIORÉ
 # ============================================================================
 
+# Pondération par défaut du score total (surchargée par ImprovedScorer(weights) / /api/rerank)
+DEFAULT_WEIGHTS = {"fit": 0.25, "pleasure": 0.30, "planet": 0.45}
+
+# Règles de substitution B2B (CO2 et coûts pour la part "weight" du plat, en kg)
+SWAP_RULES = [
+    {
+        "from": ["beef", "bœuf", "steak"],
+        "from_name": "bœuf",
+        "to": "lentilles",
+        "co2_saved": 23.1,
+        "cost_from": 18.0,
+        "cost_to": 3.0,
+        "weight": 0.2,
+    },
+    {
+        "from": ["lamb", "agneau"],
+        "from_name": "agneau",
+        "to": "champignons",
+        "co2_saved": 37.5,
+        "cost_from": 22.0,
+        "cost_to": 8.0,
+        "weight": 0.2,
+    },
+    {
+        "from": ["chicken", "poulet"],
+        "from_name": "poulet",
+        "to": "tempeh",
+        "co2_saved": 4.3,
+        "cost_from": 8.0,
+        "cost_to": 6.0,
+        "weight": 0.2,
+    },
+    {
+        "from": ["pork", "porc"],
+        "from_name": "porc",
+        "to": "tofu",
+        "co2_saved": 5.6,
+        "cost_from": 12.0,
+        "cost_to": 5.0,
+        "weight": 0.2,
+    },
+    {
+        "from": ["shrimp", "crevette"],
+        "from_name": "crevettes",
+        "to": "tofu",
+        "co2_saved": 24.0,
+        "cost_from": 30.0,
+        "cost_to": 5.0,
+        "weight": 0.15,
+    },
+]
+
+# Déclencheurs repliés (text_normalize), dans l'ordre des règles
+_SWAP_TRIGGERS = [(rule, fold_keywords(rule["from"])) for rule in SWAP_RULES]
+
+
+def swap_rules_for(text: str) -> List[dict]:
+    """Règles SWAP_RULES qui s'appliquent au texte replié d'un plat (dish_text), dans l'ordre"""
+    return [rule for rule, triggers in _SWAP_TRIGGERS if any(word in text for word in triggers)]
+
+
+# Mots qui trahissent de la viande dans la liste d'ingrédients (pénalité planète)
+MEAT_INGREDIENT_KEYWORDS = fold_keywords(
+    [
+        "beef",
+        "bœuf",
+        "chicken",
+        "poulet",
+        "pork",
+        "porc",
+        "lamb",
+        "agneau",
+        "duck",
+        "canard",
+        "veal",
+        "veau",
+        "turkey",
+        "dinde",
+        "meat",
+        "viande",
+    ]
+)
+
+
 
 class ImprovedScorer:
     """Scoreur avec formules améliorées et swaps garantis"""
 
-    def __init__(self):
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
         self.analyzer = ImprovedAnalyzer()
         # UPDATED: Slightly favor planet score for sustainability nudging
 
-        self.weights = {"fit": 0.25, "pleasure": 0.30, "planet": 0.45}
+        self.weights = dict(weights) if weights else dict(DEFAULT_WEIGHTS)
 
     def process_menu_for_consumer(
         self, menu: List[dict], user_profile: dict, top_n: int = 10
     ) -> dict:
         """Mode B2C - Pour consommateurs"""
+        budget = LLMBudget.from_env() if HAS_LLM else None
+        scored, filtered_out_count = self.score_dishes_for_consumer(menu, user_profile, budget)
+        return self.finalize_consumer(scored, filtered_out_count, top_n, budget)
+
+    def score_dishes_for_consumer(
+        self, menu: List[dict], user_profile, budget: Optional[LLMBudget] = None
+    ) -> Tuple[List[ScoredDish], int]:
+        """(plats compatibles scorés dans l'ordre du menu, nombre de plats filtrés)"""
         scored = []
         filtered_out_count = 0  # Track how many dishes were filtered
 
-        for dish in menu:
-            enriched = self.analyzer.enrich_dish(dish)
+        # Profil compilé une seule fois pour tout le menu
+        matcher = ProfileMatcher(user_profile)
 
-            s_planet = self._planet_score_v2(enriched)
-            s_pleasure = self._pleasure_score_v2(enriched)
-            s_fit = self._fit_consumer(enriched, user_profile)
+        for dish in menu:
+            scored_dish = self.score_dish_for_consumer(dish, matcher, budget)
 
             # Skip dishes with score 0 (incompatible)
-            if s_fit == 0.0:
+            if scored_dish is None:
                 filtered_out_count += 1
                 continue
 
-            total = (
-                s_fit * self.weights["fit"]
-                + s_pleasure * self.weights["pleasure"]
-                + s_planet * self.weights["planet"]
-            )
+            scored.append(scored_dish)
 
-            scored.append(
-                ScoredDish(
-                    id=dish["id"],
-                    name=dish["name"],
-                    description=dish["description"],
-                    price=dish.get("price"),
-                    restaurant_name=dish.get("restaurant_name", "Unknown"),  # NEW!
-                    total_score=round(total, 2),
-                    sub_scores=SubScores(
-                        s_planet=round(s_planet, 2),
-                        s_pleasure=round(s_pleasure, 2),
-                        s_fit=round(s_fit, 2),
-                    ),
-                    rank_index=0,
-                    comment=self._comment_consumer(
-                        enriched, s_planet, s_pleasure, s_fit
-                    ),
-                    enriched_attributes=enriched,
-                )
-            )
+        return scored, filtered_out_count
+
+    def score_dish_for_consumer(
+        self, dish: dict, user_profile, budget: Optional[LLMBudget] = None
+    ) -> Optional[ScoredDish]:
+        """
+        Enrichit et score un plat (B2C) - None si incompatible avec le profil
+
+        user_profile: dict ou ProfileMatcher déjà compilé (à préférer en boucle)
+        """
+        enriched = self.analyzer.enrich_dish(dish, budget)
 
+        s_planet = self._planet_score_v2(enriched)
+        s_pleasure = self._pleasure_score_v2(enriched)
+        s_fit = self._fit_consumer(enriched, user_profile)
+
+        if s_fit == 0.0:
+            return None
+
+        return self.build_consumer_dish(dish, enriched, s_fit, s_pleasure, s_planet)
+
+    def consumer_total(self, s_fit: float, s_pleasure: float, s_planet: float) -> float:
+        return round(
+            s_fit * self.weights["fit"]
+            + s_pleasure * self.weights["pleasure"]
+            + s_planet * self.weights["planet"],
+            2,
+        )
+
+    def build_consumer_dish(
+        self,
+        dish: dict,
+        enriched: EnrichedAttributes,
+        s_fit: float,
+        s_pleasure: float,
+        s_planet: float,
+    ) -> ScoredDish:
+        """ScoredDish B2C à partir de sous-scores déjà calculés (plat compatible)"""
+        scored = ScoredDish(
+            id=dish["id"],
+            name=dish["name"],
+            description=dish["description"],
+            price=dish.get("price"),
+            restaurant_name=dish.get("restaurant_name", "Unknown"),  # NEW!
+            total_score=self.consumer_total(s_fit, s_pleasure, s_planet),
+            sub_scores=SubScores(
+                s_planet=round(s_planet, 2),
+                s_pleasure=round(s_pleasure, 2),
+                s_fit=round(s_fit, 2),
+            ),
+            rank_index=0,
+            comment=self._comment_consumer(enriched, s_planet, s_pleasure, s_fit),
+            enriched_attributes=enriched,
+        )
+        scored._raw_sub_scores = (s_fit, s_pleasure, s_planet)
+        return scored
+
+    def finalize_consumer(
+        self,
+        scored: List[ScoredDish],
+        filtered_out_count: int,
+        top_n: int = 10,
+        budget: Optional[LLMBudget] = None,
+        projection: Optional[dict] = None,
+    ) -> dict:
+        """
+        Classement, top N, stats et classement des restaurants (B2C)
+
+        projection: champs des plats à sérialiser (voir dish_projection)
+        """
         scored.sort(key=lambda x: x.total_score, reverse=True)
         for idx, dish in enumerate(scored):
             dish.rank_index = idx
@@ -1103,7 +1614,7 @@ class ImprovedScorer:
             scored_dishes=top_dishes,
             overall_menu_stats=stats,
             restaurant_rankings=resto_rankings,
-        ).model_dump()
+        ).model_dump(include=_result_include(projection))
 
         # Add helpful message if many dishes filtered
         if filtered_out_count > 0:
@@ -1113,44 +1624,71 @@ class ImprovedScorer:
                 "message": f"🔍 {filtered_out_count} plats filtrés selon vos préférences alimentaires",
             }
 
+        # Which dishes fell back to rules (LLM deadline, circuit breaker, errors)
+        if budget is not None:
+            result["llm_info"] = budget.report()
+
         return result
 
     def process_menu_for_restaurant(self, menu: List[dict], top_n: int = 10) -> dict:
         """Mode B2B - Pour restaurants"""
-        scored = []
-
-        for dish in menu:
-            enriched = self.analyzer.enrich_dish(dish)
-
-            s_planet = self._planet_score_v2(enriched)
-            s_pleasure = self._pleasure_score_v2(enriched)
-            s_fit = self._fit_b2b(enriched)
-
-            total = (
-                s_fit * self.weights["fit"]
-                + s_pleasure * self.weights["pleasure"]
-                + s_planet * self.weights["planet"]
-            )
+        budget = LLMBudget.from_env() if HAS_LLM else None
+        scored = self.score_dishes_for_restaurant(menu, budget)
+        return self.finalize_restaurant(scored, top_n, budget)
+
+    def score_dishes_for_restaurant(
+        self, menu: List[dict], budget: Optional[LLMBudget] = None
+    ) -> List[ScoredDish]:
+        """Plats scorés (B2B) dans l'ordre du menu"""
+        return [self.score_dish_for_restaurant(dish, budget) for dish in menu]
+
+    def score_dish_for_restaurant(
+        self, dish: dict, budget: Optional[LLMBudget] = None
+    ) -> ScoredDish:
+        """Enrichit et score un plat (B2B)"""
+        enriched = self.analyzer.enrich_dish(dish, budget)
+
+        s_planet = self._planet_score_v2(enriched)
+        s_pleasure = self._pleasure_score_v2(enriched)
+        s_fit = self._fit_b2b(enriched)
+
+        total = (
+            s_fit * self.weights["fit"]
+            + s_pleasure * self.weights["pleasure"]
+            + s_planet * self.weights["planet"]
+        )
 
-            scored.append(
-                ScoredDish(
-                    id=dish["id"],
-                    name=dish["name"],
-                    description=dish["description"],
-                    price=dish.get("price"),
-                    restaurant_name=dish.get("restaurant_name", "Unknown"),  # NEW!
-                    total_score=round(total, 2),
-                    sub_scores=SubScores(
-                        s_planet=round(s_planet, 2),
-                        s_pleasure=round(s_pleasure, 2),
-                        s_fit=round(s_fit, 2),
-                    ),
-                    rank_index=0,
-                    comment=self._comment_b2b(enriched, s_planet),
-                    enriched_attributes=enriched,
-                )
-            )
+        scored = ScoredDish(
+            id=dish["id"],
+            name=dish["name"],
+            description=dish["description"],
+            price=dish.get("price"),
+            restaurant_name=dish.get("restaurant_name", "Unknown"),  # NEW!
+            total_score=round(total, 2),
+            sub_scores=SubScores(
+                s_planet=round(s_planet, 2),
+                s_pleasure=round(s_pleasure, 2),
+                s_fit=round(s_fit, 2),
+            ),
+            rank_index=0,
+            comment=self._comment_b2b(enriched, s_planet),
+            enriched_attributes=enriched,
+        )
+        scored._raw_sub_scores = (s_fit, s_pleasure, s_planet)
+        return scored
+
+    def finalize_restaurant(
+        self,
+        scored: List[ScoredDish],
+        top_n: int = 10,
+        budget: Optional[LLMBudget] = None,
+        projection: Optional[dict] = None,
+    ) -> dict:
+        """
+        Classement, top N, swaps et stats (B2B)
 
+        projection: champs des plats à sérialiser (voir dish_projection)
+        """
         scored.sort(key=lambda x: x.total_score, reverse=True)
         for idx, dish in enumerate(scored):
             dish.rank_index = idx
@@ -1159,12 +1697,17 @@ class ImprovedScorer:
         swaps = self._generate_swaps_robust(scored)
         resto_rankings = self._calculate_restaurant_rankings(scored)
 
-        return MenuAnalysisResult(
+        result = MenuAnalysisResult(
             scored_dishes=top_dishes,
             overall_menu_stats=self._calc_stats(scored),
             restaurant_rankings=resto_rankings,
             swap_suggestions=swaps,
-        ).model_dump()
+        ).model_dump(include=_result_include(projection))
+
+        if budget is not None:
+            result["llm_info"] = budget.report()
+
+        return result
 
     def _calculate_restaurant_rankings(
         self, scored: List[ScoredDish]
@@ -1231,29 +1774,10 @@ class ImprovedScorer:
                 base_score = min(10.0, base_score + 0.5)
 
                 # 🆕 PENALTY: Reduce score if meat detected in ingredients
-            meat_keywords = [
-                "beef",
-                "boeuf",
-                "chicken",
-                "poulet",
-                "pork",
-                "porc",
-                "lamb",
-                "agneau",
-                "duck",
-                "canard",
-                "veal",
-                "veau",
-                "turkey",
-                "dinde",
-                "meat",
-                "viande",
-            ]
-
             has_meat = any(
-                keyword in ing.lower()
+                keyword in fold(ing)
                 for ing in e.ingredients
-                for keyword in meat_keywords
+                for keyword in MEAT_INGREDIENT_KEYWORDS
             )
 
             if has_meat:
@@ -1284,157 +1808,11 @@ class ImprovedScorer:
 
         return max(0, min(10, score))
 
-    def _fit_consumer(self, e: EnrichedAttributes, profile: dict) -> float:
+    def _fit_consumer(self, e: EnrichedAttributes, profile) -> float:
         """Enhanced consumer fit with safety improvements + plant-based nudging"""
-        score = 5.0
-        restriction = profile.get("dietary_restriction", "").lower()
-        goal = profile.get("goal", "").lower()
-        allergens = profile.get("allergens", [])
-        strict_filter = profile.get("strict_filter", True)
-
-        # CRITICAL: Check allergens FIRST (unchanged - already safe)
-        for allergen in allergens:
-            if allergen in e.allergens:
-                return 0.0  # Immediate disqualification
-
-        # IMPROVED: Amplified Nutri-Score impact (plant-based foods tend to score better)
-        nutri_bonus = {"A": 2.5, "B": 1.5, "C": 0, "D": -1.5, "E": -2.5}
-        score += nutri_bonus.get(e.nutriscore, 0)
-
-        # ========================================================================
-        # DIETARY RESTRICTIONS (Enhanced safety + explicit protein checks)
-        # ========================================================================
-
-        if restriction == "vegan":
-            if "vegan" in e.dietary_tags:
-                score += 4.0
-            elif "vegetarian" in e.dietary_tags:
-                # Extra safety: check if truly vegan (no dairy/eggs)
-                has_animal_products = any(
-                    a in e.allergens for a in ["lactose", "eggs", "fish", "shellfish"]
-                )
-                if has_animal_products:
-                    if strict_filter:
-                        return 0.0  # Not actually vegan
-                    else:
-                        score -= 2.0
-                else:
-                    score += 1.0  # Potentially veganizable
-            else:
-                # Contains meat/fish
-                if strict_filter:
-                    return 0.0  # Hard filter
-                else:
-                    score -= 3.0
-
-        elif restriction == "vegetarian":
-            if "vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags:
-                score += 3.5
-            # Enhanced check: explicit protein filtering
-            elif e.primary_protein in [
-                "beef",
-                "boeuf",
-                "chicken",
-                "poulet",
-                "pork",
-                "porc",
-                "lamb",
-                "agneau",
-                "duck",
-                "canard",
-                "fish",
-                "poisson",
-                "salmon",
-                "saumon",
-                "shrimp",
-                "crevette",
-                "tuna",
-                "kebab",
-                "nuggets",
-                "merguez",
-            ]:
-                if strict_filter:
-                    return 0.0  # Hard filter
-                else:
-                    score -= 2.5
-            else:
-                # Ambiguous - be cautious
-                if strict_filter:
-                    return 0.0  # When in doubt, filter out for safety
-                else:
-                    score -= 1.0
-
-        elif restriction == "gluten-free":
-            if "gluten-free" in e.dietary_tags:
-                score += 3.5
-            # Enhanced: check allergen detection
-            elif "gluten" in e.allergens:
-                if strict_filter:
-                    return 0.0
-                else:
-                    score -= 3.0
-
-        elif restriction == "halal":
-            if "halal" in e.dietary_tags:
-                score += 4.0
-            # Enhanced: explicit pork ingredient check
-            elif e.primary_protein in ["pork", "porc"] or any(
-                ing in e.ingredients
-                for ing in ["pork", "porc", "bacon", "lardon", "ham", "jambon"]
-            ):
-                if strict_filter:
-                    return 0.0  # Hard filter
-                else:
-                    score -= 5.0
-
-        # ========================================================================
-        # NEW: UNIVERSAL PLANT-BASED HEALTH BONUS (for users without restrictions)
-        # Science-backed: higher fiber, micronutrients, lower saturated fat
-        # ========================================================================
-
-        if not restriction:  # Only for omnivores (show them the benefits!)
-            if "vegan" in e.dietary_tags:
-                score += 1.5  # Health benefit bonus
-            elif "vegetarian" in e.dietary_tags:
-                score += 1.0
-
-        # ========================================================================
-        # HEALTH GOALS (Enhanced with plant-based preference)
-        # ========================================================================
-
-        if "weight_loss" in goal or "perte" in goal:
-            # Low carbon + unprocessed foods
-            if e.carbon_estimate < 5.0 and e.nova_score <= 2:
-                score += 2.0
-            # NEW: Extra boost for plant-based (science: lower calorie density, higher fiber)
-            if "vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags:
-                score += 1.0
-
-        elif "muscle" in goal or "sport" in goal or "athlete" in goal:
-            # Protein-rich options (unchanged base logic)
-            if e.primary_protein in [
-                "chicken",
-                "poulet",
-                "tofu",
-                "tempeh",
-                "salmon",
-                "saumon",
-                "lentils",
-                "lentilles",
-            ]:
-                score += 2.0
-            # NEW: Bonus for plant proteins (combat "you need meat" myth)
-            if e.primary_protein in [
-                "tofu",
-                "tempeh",
-                "lentils",
-                "lentilles",
-                "chickpeas",
-                "pois chiches",
-            ]:
-                score += 0.5
-
-        return max(0, min(10, score))
+        if not isinstance(profile, ProfileMatcher):
+            profile = ProfileMatcher(profile)
+        return profile.fit(e)
 
     def _fit_b2b(self, e: EnrichedAttributes) -> float:
         score = 5.0  # Base score
@@ -1451,7 +1829,8 @@ class ImprovedScorer:
         allergen_penalty = len(e.allergens) * 0.5
         score -= allergen_penalty
 
-        nutri_scores = [NUTRISCORE_DB.get(ing, 3) for ing in e.ingredients]
+        db = get_ingredient_db()
+        nutri_scores = [db.nutriscore_of(ing, 3) for ing in e.ingredients]
         nutriscore_avg = sum(nutri_scores) / len(nutri_scores) if nutri_scores else 3.0
 
         if nutriscore_avg >= 4.0:
@@ -1504,75 +1883,28 @@ class ImprovedScorer:
     def _generate_swaps_robust(self, scored: List[ScoredDish]) -> List[SwapSuggestion]:
         swaps = []
 
-        swap_rules = [
-            {
-                "from": ["beef", "boeuf", "bœuf", "steak"],
-                "from_name": "bœuf",
-                "to": "lentilles",
-                "co2_saved": 23.1,
-                "cost_from": 18.0,
-                "cost_to": 3.0,
-                "weight": 0.2,
-            },
-            {
-                "from": ["lamb", "agneau"],
-                "from_name": "agneau",
-                "to": "champignons",
-                "co2_saved": 37.5,
-                "cost_from": 22.0,
-                "cost_to": 8.0,
-                "weight": 0.2,
-            },
-            {
-                "from": ["chicken", "poulet"],
-                "from_name": "poulet",
-                "to": "tempeh",
-                "co2_saved": 4.3,
-                "cost_from": 8.0,
-                "cost_to": 6.0,
-                "weight": 0.2,
-            },
-            {
-                "from": ["pork", "porc"],
-                "from_name": "porc",
-                "to": "tofu",
-                "co2_saved": 5.6,
-                "cost_from": 12.0,
-                "cost_to": 5.0,
-                "weight": 0.2,
-            },
-            {
-                "from": ["shrimp", "crevette"],
-                "from_name": "crevettes",
-                "to": "tofu",
-                "co2_saved": 24.0,
-                "cost_from": 30.0,
-                "cost_to": 5.0,
-                "weight": 0.15,
-            },
-        ]
-
         for dish in scored:
-            text = (dish.name + " " + dish.description).lower()
-
-            for rule in swap_rules:
-                if any(word in text for word in rule["from"]):
-                    co2_saved = rule["co2_saved"] * rule["weight"]
-                    cost_saved = (rule["cost_from"] - rule["cost_to"]) * rule["weight"]
-
-                    swaps.append(
-                        SwapSuggestion(
-                            dish_id=dish.id,
-                            dish_name=dish.name,
-                            current_ingredient=rule["from_name"],
-                            suggested_ingredient=rule["to"],
-                            estimated_savings_co2=round(co2_saved, 2),
-                            estimated_savings_cost=round(cost_saved, 2),
-                            score_improvement=round(10.0 - dish.sub_scores.s_planet, 2),
-                            rationale=f"💰 Économie: {cost_saved:.2f}€/plat • 🌍 -{co2_saved:.1f}kg CO2e",
-                        )
-                    )
-                    break
+            # Même forme repliée (en cache) que l'enrichissement du plat
+            rules = swap_rules_for(dish_text(dish.name, dish.description))
+            if not rules:
+                continue
+            rule = rules[0]
+
+            co2_saved = rule["co2_saved"] * rule["weight"]
+            cost_saved = (rule["cost_from"] - rule["cost_to"]) * rule["weight"]
+
+            swaps.append(
+                SwapSuggestion(
+                    dish_id=dish.id,
+                    dish_name=dish.name,
+                    current_ingredient=rule["from_name"],
+                    suggested_ingredient=rule["to"],
+                    estimated_savings_co2=round(co2_saved, 2),
+                    estimated_savings_cost=round(cost_saved, 2),
+                    score_improvement=round(10.0 - dish.sub_scores.s_planet, 2),
+                    rationale=f"💰 Économie: {cost_saved:.2f}€/plat • 🌍 -{co2_saved:.1f}kg CO2e",
+                )
+            )
 
         return swaps
 
@@ -0,0 +1,676 @@
+"""
+PERSISTENT STORAGE
+==================
+Stockage SQLite embarqué des restaurants, plats, enrichissements, scores et
+suggestions de swaps : le travail déjà fait (OCR, enrichissement LLM,
+scoring) survit aux redémarrages et se relit sans rien recalculer.
+
+Schéma :
+    restaurants      un par nom (restaurant_data complet en JSON + colonnes utiles)
+    dishes           plats d'un restaurant, clé (restaurant, id du plat dans le menu)
+    enrichments      EnrichedAttributes, partagés par contenu (même clé que interning.py)
+    enrichment_tags  tags alimentaires et allergènes d'un enrichissement (index par tag)
+    profiles         profils consommateurs rencontrés (clé = hash du profil normalisé)
+    scores           sous-scores et total d'un plat pour un profil ("restaurant" en B2B)
+    swap_suggestions dernières suggestions de swaps d'un restaurant
+
+- Écritures groupées : save_scored / save_menu écrivent tout un menu en une
+  transaction (executemany) ; `with storage.batch():` regroupe plusieurs appels.
+- Lectures indexées par restaurant, par tag et par score (top_dishes).
+- Coordonnées des restaurants relues par updated_at pour l'index géographique
+  (geo_index.py).
+- Mode WAL + busy_timeout : partagé entre threads, workers et processus.
+- Écritures différées (write_behind) : l'API enregistre sur un thread dédié,
+  hors du chemin des requêtes ; un échec est journalisé (logging), jamais
+  renvoyé au client.
+
+Configuration :
+    STORAGE_PATH  fichier SQLite (défaut: "", stockage désactivé ; par exemple
+                  nutrifork.sqlite3 pour l'activer)
+
+Usage:
+    python storage.py info [nutrifork.sqlite3]
+    python storage.py import scoring_results_restaurant.json [extracted_menu.json]
+    python storage.py import scoring_results_consumer.json --profile '{"dietary_restriction": "vegan"}'
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Union
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from interning import dish_key
+from scoring_multi_resto import EnrichedAttributes, ScoredDish, SwapSuggestion
+
+logger = logging.getLogger(__name__)
+
+# Fichier par défaut des commandes `python storage.py` ; l'API n'écrit que si STORAGE_PATH est défini
+DEFAULT_PATH = "nutrifork.sqlite3"
+SCHEMA_VERSION = 2
+
+# Clé de score des plats scorés en mode restaurant (B2B, sans profil)
+RESTAURANT_PROFILE = "restaurant"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    type TEXT,
+    location TEXT,
+    lat REAL,
+    lng REAL,
+    data TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_restaurants_updated ON restaurants (updated_at);
+CREATE TABLE IF NOT EXISTS enrichments (
+    key TEXT PRIMARY KEY,
+    attributes TEXT NOT NULL,
+    nova_score INTEGER,
+    nutriscore TEXT,
+    primary_protein TEXT,
+    carbon_estimate REAL,
+    estimated_cost REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS enrichment_tags (
+    kind TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    enrichment_key TEXT NOT NULL REFERENCES enrichments (key) ON DELETE CASCADE,
+    PRIMARY KEY (kind, tag, enrichment_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_enrichment_tags_key ON enrichment_tags (enrichment_key);
+CREATE TABLE IF NOT EXISTS dishes (
+    id INTEGER PRIMARY KEY,
+    restaurant_id INTEGER NOT NULL REFERENCES restaurants (id) ON DELETE CASCADE,
+    menu_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    price REAL,
+    enrichment_key TEXT REFERENCES enrichments (key),
+    updated_at REAL NOT NULL,
+    UNIQUE (restaurant_id, menu_id)
+);
+CREATE INDEX IF NOT EXISTS idx_dishes_enrichment ON dishes (enrichment_key);
+CREATE TABLE IF NOT EXISTS profiles (
+    key TEXT PRIMARY KEY,
+    profile TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scores (
+    dish_id INTEGER NOT NULL REFERENCES dishes (id) ON DELETE CASCADE,
+    profile_key TEXT NOT NULL,
+    s_fit REAL NOT NULL,
+    s_pleasure REAL NOT NULL,
+    s_planet REAL NOT NULL,
+    total_score REAL NOT NULL,
+    comment TEXT,
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (dish_id, profile_key)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_profile_total ON scores (profile_key, total_score DESC);
+CREATE TABLE IF NOT EXISTS swap_suggestions (
+    id INTEGER PRIMARY KEY,
+    restaurant_id INTEGER NOT NULL REFERENCES restaurants (id) ON DELETE CASCADE,
+    dish_menu_id INTEGER NOT NULL,
+    dish_name TEXT NOT NULL,
+    current_ingredient TEXT NOT NULL,
+    suggested_ingredient TEXT NOT NULL,
+    estimated_savings_co2 REAL,
+    estimated_savings_cost REAL,
+    score_improvement REAL,
+    rationale TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_swaps_restaurant ON swap_suggestions (restaurant_id);
+"""
+
+_DISH_COLUMNS = """
+    d.menu_id, d.name, d.description, d.price, r.name AS restaurant_name,
+    s.total_score, s.s_fit, s.s_pleasure, s.s_planet, s.comment, e.attributes
+"""
+
+
+def enrichment_key(name: str, description: str, price) -> str:
+    """Même contenu que la clé d'internage (texte en minuscules + prix), hashé"""
+    payload = json.dumps(dish_key(name, description, price), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def profile_key(profile: Optional[dict]) -> str:
+    """Clé d'un profil consommateur normalisé ("restaurant" si pas de profil)"""
+    if profile is None:
+        return RESTAURANT_PROFILE
+    normalized = {
+        "dietary_restriction": (profile.get("dietary_restriction") or "").lower(),
+        "goal": (profile.get("goal") or "").lower(),
+        "allergens": sorted({a.lower() for a in profile.get("allergens", [])}),
+        "strict_filter": bool(profile.get("strict_filter", True)),
+    }
+    payload = json.dumps(normalized, sort_keys=True)
+    return "p:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Storage:
+    """Accès SQLite thread-safe (une connexion par thread), écritures transactionnelles"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # Un seul thread d'écriture différée : pas de contention entre écrivains
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-writer")
+
+        conn = self._connect()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par thread, recréée après un fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def batch(self):
+        """Transaction (réentrante) : tout est écrit, ou rien"""
+        conn = self._connect()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    # ========================================================================
+    # ÉCRITURES
+    # ========================================================================
+
+    def write_behind(self, write: Callable[..., object], *args, **kwargs) -> Future:
+        """
+        Exécute write(*args, **kwargs) sur le thread d'écriture, sans attendre.
+        Les erreurs sont journalisées (logger "storage"), pas propagées.
+        """
+
+        def run():
+            try:
+                write(*args, **kwargs)
+            except Exception:
+                logger.exception("Storage write failed (%s, %s)", getattr(write, "__name__", write), self.path)
+
+        return self._writer.submit(run)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Attend la fin des écritures différées déjà soumises"""
+        self._writer.submit(lambda: None).result(timeout)
+
+    def save_restaurant(self, name: str, restaurant_data: Optional[dict] = None, lat=None, lng=None) -> int:
+        """Crée ou met à jour un restaurant (restaurant_data gardé tel quel), renvoie son id"""
+        data = restaurant_data or {}
+        with self.batch() as conn:
+            conn.execute(
+                "INSERT INTO restaurants (name, type, location, lat, lng, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "type = COALESCE(excluded.type, type), "
+                "location = COALESCE(excluded.location, location), "
+                "lat = COALESCE(excluded.lat, lat), lng = COALESCE(excluded.lng, lng), "
+                "data = COALESCE(excluded.data, data), updated_at = excluded.updated_at",
+                (
+                    name,
+                    data.get("type"),
+                    data.get("location"),
+                    lat,
+                    lng,
+                    json.dumps(restaurant_data, ensure_ascii=False) if restaurant_data else None,
+                    time.time(),
+                ),
+            )
+            return conn.execute("SELECT id FROM restaurants WHERE name = ?", (name,)).fetchone()[0]
+
+    def _save_enrichments(self, conn, enrichments: Dict[str, EnrichedAttributes]):
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO enrichments (key, attributes, nova_score, nutriscore, primary_protein, "
+            "carbon_estimate, estimated_cost, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET attributes = excluded.attributes, "
+            "nova_score = excluded.nova_score, nutriscore = excluded.nutriscore, "
+            "primary_protein = excluded.primary_protein, carbon_estimate = excluded.carbon_estimate, "
+            "estimated_cost = excluded.estimated_cost, updated_at = excluded.updated_at",
+            [
+                (
+                    key,
+                    e.model_dump_json(),
+                    e.nova_score,
+                    e.nutriscore,
+                    e.primary_protein,
+                    e.carbon_estimate,
+                    e.estimated_cost,
+                    now,
+                )
+                for key, e in enrichments.items()
+            ],
+        )
+        conn.executemany(
+            "DELETE FROM enrichment_tags WHERE enrichment_key = ?",
+            [(key,) for key in enrichments],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO enrichment_tags (kind, tag, enrichment_key) VALUES (?, ?, ?)",
+            [
+                (kind, tag, key)
+                for key, e in enrichments.items()
+                for kind, tags in (("diet", e.dietary_tags), ("allergen", e.allergens))
+                for tag in tags
+            ],
+        )
+
+    def _save_dishes(
+        self,
+        conn,
+        restaurant_id: int,
+        menu: List[dict],
+        keys: List[Optional[str]],
+        prune: bool = False,
+    ) -> Dict[int, int]:
+        """
+        Upsert des plats d'un restaurant → {id menu: id en base}
+
+        Un id de menu dont le plat a changé (nom, description ou prix, après une
+        ré-extraction) perd ses scores, ses swaps et son enrichissement : ils
+        décrivaient l'ancien plat. prune=True supprime aussi les plats absents
+        de `menu` (menu complet).
+        """
+        now = time.time()
+        existing = {
+            row["menu_id"]: row
+            for row in conn.execute(
+                "SELECT id, menu_id, name, description, price FROM dishes WHERE restaurant_id = ?",
+                (restaurant_id,),
+            )
+        }
+        contents = {
+            dish["id"]: (dish["name"], dish.get("description") or "", dish.get("price"))
+            for dish in menu
+        }
+        changed = {
+            menu_id
+            for menu_id, content in contents.items()
+            if menu_id in existing and tuple(existing[menu_id])[2:] != content
+        }
+        removed = set(existing) - set(contents) if prune else set()
+
+        if changed:
+            conn.executemany(
+                "DELETE FROM scores WHERE dish_id = ?",
+                [(existing[menu_id]["id"],) for menu_id in changed],
+            )
+        if changed or removed:
+            conn.executemany(
+                "DELETE FROM swap_suggestions WHERE restaurant_id = ? AND dish_menu_id = ?",
+                [(restaurant_id, menu_id) for menu_id in changed | removed],
+            )
+        if removed:
+            # Les scores suivent (ON DELETE CASCADE)
+            conn.executemany(
+                "DELETE FROM dishes WHERE id = ?",
+                [(existing[menu_id]["id"],) for menu_id in removed],
+            )
+
+        conn.executemany(
+            "INSERT INTO dishes (restaurant_id, menu_id, name, description, price, "
+            "enrichment_key, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (restaurant_id, menu_id) DO UPDATE SET name = excluded.name, "
+            "description = excluded.description, price = excluded.price, "
+            "enrichment_key = CASE WHEN ? THEN excluded.enrichment_key "
+            "ELSE COALESCE(excluded.enrichment_key, enrichment_key) END, "
+            "updated_at = excluded.updated_at",
+            [
+                (
+                    restaurant_id,
+                    dish["id"],
+                    dish["name"],
+                    dish.get("description") or "",
+                    dish.get("price"),
+                    key,
+                    now,
+                    dish["id"] in changed,
+                )
+                for dish, key in zip(menu, keys)
+            ],
+        )
+        return {
+            menu_id: row_id
+            for menu_id, row_id in conn.execute(
+                "SELECT menu_id, id FROM dishes WHERE restaurant_id = ?", (restaurant_id,)
+            )
+        }
+
+    def save_menu(self, restaurant_name: str, menu: List[dict], restaurant_data: Optional[dict] = None) -> int:
+        """Enregistre un menu extrait (sans scores) qui remplace le précédent, renvoie le nombre de plats"""
+        with self.batch() as conn:
+            restaurant_id = self.save_restaurant(restaurant_name, restaurant_data)
+            self._save_dishes(conn, restaurant_id, menu, [None] * len(menu), prune=True)
+        return len(menu)
+
+    def save_scored(
+        self,
+        scored: Iterable[Union[ScoredDish, dict]],
+        profile: Optional[dict] = None,
+        restaurant_data: Optional[dict] = None,
+        coordinates: Optional[Dict[str, tuple]] = None,
+    ) -> int:
+        """
+        Enregistre des plats scorés (tous restaurants confondus) en une transaction
+
+        profile: profil consommateur, None pour le mode restaurant
+        restaurant_data: données complètes du restaurant (si un seul restaurant)
+        coordinates: {restaurant_name: (lat, lng)}
+        """
+        dishes = [d if isinstance(d, ScoredDish) else ScoredDish(**d) for d in scored]
+        key = profile_key(profile)
+        now = time.time()
+
+        by_restaurant: Dict[str, List[ScoredDish]] = {}
+        for dish in dishes:
+            by_restaurant.setdefault(dish.restaurant_name, []).append(dish)
+
+        with self.batch() as conn:
+            if profile is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO profiles (key, profile) VALUES (?, ?)",
+                    (key, json.dumps(profile, ensure_ascii=False)),
+                )
+
+            enrichments = {}
+            for dish in dishes:
+                enrichments.setdefault(
+                    enrichment_key(dish.name, dish.description, dish.price), dish.enriched_attributes
+                )
+            self._save_enrichments(conn, enrichments)
+
+            for name, resto_dishes in by_restaurant.items():
+                lat, lng = (coordinates or {}).get(name, (None, None))
+                restaurant_id = self.save_restaurant(
+                    name, restaurant_data if len(by_restaurant) == 1 else None, lat, lng
+                )
+                row_ids = self._save_dishes(
+                    conn,
+                    restaurant_id,
+                    [d.model_dump(include={"id", "name", "description", "price"}) for d in resto_dishes],
+                    [enrichment_key(d.name, d.description, d.price) for d in resto_dishes],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scores (dish_id, profile_key, s_fit, s_pleasure, "
+                    "s_planet, total_score, comment, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            row_ids[d.id],
+                            key,
+                            d.sub_scores.s_fit,
+                            d.sub_scores.s_pleasure,
+                            d.sub_scores.s_planet,
+                            d.total_score,
+                            d.comment,
+                            now,
+                        )
+                        for d in resto_dishes
+                    ],
+                )
+        return len(dishes)
+
+    def save_swaps(self, restaurant_name: str, swaps: Iterable[Union[SwapSuggestion, dict]]) -> int:
+        """Remplace les suggestions de swaps d'un restaurant"""
+        swaps = [s if isinstance(s, SwapSuggestion) else SwapSuggestion(**s) for s in swaps]
+        now = time.time()
+        with self.batch() as conn:
+            restaurant_id = self.save_restaurant(restaurant_name)
+            conn.execute("DELETE FROM swap_suggestions WHERE restaurant_id = ?", (restaurant_id,))
+            conn.executemany(
+                "INSERT INTO swap_suggestions (restaurant_id, dish_menu_id, dish_name, "
+                "current_ingredient, suggested_ingredient, estimated_savings_co2, "
+                "estimated_savings_cost, score_improvement, rationale, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        restaurant_id,
+                        s.dish_id,
+                        s.dish_name,
+                        s.current_ingredient,
+                        s.suggested_ingredient,
+                        s.estimated_savings_co2,
+                        s.estimated_savings_cost,
+                        s.score_improvement,
+                        s.rationale,
+                        now,
+                    )
+                    for s in swaps
+                ],
+            )
+        return len(swaps)
+
+    # ========================================================================
+    # LECTURES
+    # ========================================================================
+
+    def enrichment(self, name: str, description: str, price) -> Optional[EnrichedAttributes]:
+        """Enrichissement déjà calculé pour ce contenu de plat (None si inconnu)"""
+        row = self._connect().execute(
+            "SELECT attributes FROM enrichments WHERE key = ?",
+            (enrichment_key(name, description, price),),
+        ).fetchone()
+        return EnrichedAttributes.model_validate_json(row[0]) if row else None
+
+    def top_dishes(
+        self,
+        profile: Optional[dict] = None,
+        restaurant: Optional[str] = None,
+        tag: Optional[str] = None,
+        exclude_allergens: Iterable[str] = (),
+        min_score: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[dict]:
+        """
+        Plats scorés pour un profil (None = mode restaurant), meilleur total d'abord,
+        au format ScoredDish (rank_index = rang dans cette requête)
+        """
+        query = [
+            f"SELECT {_DISH_COLUMNS} FROM scores s",
+            "JOIN dishes d ON d.id = s.dish_id",
+            "JOIN restaurants r ON r.id = d.restaurant_id",
+            "JOIN enrichments e ON e.key = d.enrichment_key",
+        ]
+        params: list = []
+        if tag:
+            query.append(
+                "JOIN enrichment_tags t ON t.enrichment_key = d.enrichment_key "
+                "AND t.kind = 'diet' AND t.tag = ?"
+            )
+            params.append(tag)
+
+        where = ["s.profile_key = ?"]
+        params.append(profile_key(profile))
+        if restaurant:
+            where.append("r.name = ?")
+            params.append(restaurant)
+        allergens = [a for a in exclude_allergens if a]
+        if allergens:
+            where.append(
+                "NOT EXISTS (SELECT 1 FROM enrichment_tags a WHERE a.kind = 'allergen' "
+                f"AND a.enrichment_key = d.enrichment_key AND a.tag IN ({','.join('?' * len(allergens))}))"
+            )
+            params.extend(allergens)
+        if min_score is not None:
+            where.append("s.total_score >= ?")
+            params.append(min_score)
+
+        query.append("WHERE " + " AND ".join(where))
+        query.append("ORDER BY s.total_score DESC, d.id LIMIT ? OFFSET ?")
+        params.extend([limit, offset])
+
+        rows = self._connect().execute("\n".join(query), params).fetchall()
+        return [self._dish_dict(row, offset + i) for i, row in enumerate(rows)]
+
+    @staticmethod
+    def _dish_dict(row: sqlite3.Row, rank: int) -> dict:
+        return {
+            "id": row["menu_id"],
+            "name": row["name"],
+            "description": row["description"],
+            "price": row["price"],
+            "restaurant_name": row["restaurant_name"],
+            "total_score": row["total_score"],
+            "sub_scores": {
+                "s_planet": row["s_planet"],
+                "s_pleasure": row["s_pleasure"],
+                "s_fit": row["s_fit"],
+            },
+            "rank_index": rank,
+            "comment": row["comment"],
+            "enriched_attributes": json.loads(row["attributes"]),
+        }
+
+    def restaurant(self, name: str, profile: Optional[dict] = None) -> Optional[dict]:
+        """Restaurant, son menu, ses plats scorés (pour le profil) et ses swaps"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM restaurants WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+
+        menu = [
+            {"id": r["menu_id"], "name": r["name"], "description": r["description"], "price": r["price"]}
+            for r in conn.execute(
+                "SELECT menu_id, name, description, price FROM dishes "
+                "WHERE restaurant_id = ? ORDER BY menu_id",
+                (row["id"],),
+            )
+        ]
+        swaps = [
+            {
+                "dish_id": s["dish_menu_id"],
+                "dish_name": s["dish_name"],
+                "current_ingredient": s["current_ingredient"],
+                "suggested_ingredient": s["suggested_ingredient"],
+                "estimated_savings_co2": s["estimated_savings_co2"],
+                "estimated_savings_cost": s["estimated_savings_cost"],
+                "score_improvement": s["score_improvement"],
+                "rationale": s["rationale"],
+            }
+            for s in conn.execute(
+                "SELECT * FROM swap_suggestions WHERE restaurant_id = ? ORDER BY id", (row["id"],)
+            )
+        ]
+        return {
+            "restaurant_name": row["name"],
+            "restaurant": json.loads(row["data"]) if row["data"] else None,
+            "lat": row["lat"],
+            "lng": row["lng"],
+            "menu": menu,
+            "scored_dishes": self.top_dishes(profile, restaurant=name, limit=len(menu) or 1),
+            "swap_suggestions": swaps,
+            "updated_at": row["updated_at"],
+        }
+
+    def restaurant_coordinates(self, since: Optional[float] = None) -> List[tuple]:
+        """[(nom, lat, lng, updated_at)] des restaurants géolocalisés écrits depuis since (geo_index.py)"""
+        rows = self._connect().execute(
+            "SELECT name, lat, lng, updated_at FROM restaurants "
+            "WHERE updated_at >= ? AND lat IS NOT NULL AND lng IS NOT NULL",
+            (since if since is not None else 0.0,),
+        ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        conn = self._connect()
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("restaurants", "dishes", "enrichments", "profiles", "scores", "swap_suggestions")
+        }
+
+
+_STORAGE: Optional[Storage] = None
+_STORAGE_LOCK = threading.Lock()
+
+
+def get_storage() -> Optional[Storage]:
+    """Stockage du processus (None tant que STORAGE_PATH n'est pas défini)"""
+    global _STORAGE
+    if _STORAGE is None:
+        path = os.getenv("STORAGE_PATH", "")
+        if not path:
+            return None
+        with _STORAGE_LOCK:
+            if _STORAGE is None:
+                _STORAGE = Storage(path)
+    return _STORAGE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Row counts per table")
+    info.add_argument("path", nargs="?", default=os.getenv("STORAGE_PATH") or DEFAULT_PATH)
+    imp = sub.add_parser("import", help="Import JSON results written by main.py or the API")
+    imp.add_argument("results", help="scoring_results_*.json or a /api/full-pipeline response")
+    imp.add_argument("restaurant", nargs="?", help="extracted_menu.json (restaurant_data)")
+    imp.add_argument("--profile", help="Consumer profile JSON used for the scores (omit for B2B results)")
+    imp.add_argument("--path", default=os.getenv("STORAGE_PATH") or DEFAULT_PATH)
+    args = parser.parse_args()
+
+    storage = Storage(args.path)
+    if args.command == "info":
+        print(f"🗄️  {storage.path}")
+        for table, count in storage.counts().items():
+            print(f"   {table}: {count}")
+        return
+
+    with open(args.results, encoding="utf-8") as f:
+        results = json.load(f)
+    restaurant_data = results.get("restaurant")
+    if args.restaurant:
+        with open(args.restaurant, encoding="utf-8") as f:
+            restaurant_data = json.load(f)
+    profile = json.loads(args.profile) if args.profile else None
+
+    # Accepte la sortie de score_menu_* ou celle de /api/full-pipeline
+    results = results.get("scoring", results)
+    with storage.batch():
+        count = storage.save_scored(results.get("scored_dishes", []), profile, restaurant_data)
+        if restaurant_data and restaurant_data.get("menu"):
+            storage.save_menu(
+                restaurant_data.get("name", "Unknown"), restaurant_data["menu"], restaurant_data
+            )
+    print(f"✅ Imported {count} scored dishes into {storage.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+STREAMING SCORING
+=================
+Classement en flux pour les très gros menus (flux agrégateurs, dizaines de
+milliers de plats) : les plats sont scorés au fil de l'eau et aucun ScoredDish
+n'est gardé en dehors du top N.
+
+- Top N : tas de taille N, clé (total, -ordre d'arrivée) : à égalité de score
+  le plat arrivé le premier gagne, comme le tri stable de finalize_*.
+- Stats : les moyennes de _calc_stats sont des sum() de floats dans l'ordre du
+  classement ; arrondies au centième, elles tombent parfois pile sur une
+  demi-unité, et l'ordre de sommation décide. Pour les reproduire au bit près,
+  les sous-scores sont gardés en centimes (array d'entiers, 12 octets par
+  plat) dans un seau par total, et les sommes sont rejouées dans l'ordre du
+  classement à la fin.
+- Restaurants : nombre de plats par total, meilleur plat (premier maximum) et
+  plats végétaux par restaurant ; ex-aequo départagés par le rang de leur
+  meilleur plat, comme dans _calculate_restaurant_rankings.
+- Swaps (mode restaurant) : une suggestion par plat concerné, triées à la fin
+  dans l'ordre du classement.
+
+result() renvoie exactement le dict de finalize_consumer / finalize_restaurant
+sur le même menu (hors classement complet : pas de ranking_id).
+"""
+
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional
+import heapq
+import math
+
+from scoring_multi_resto import (
+    ImprovedScorer,
+    MenuAnalysisResult,
+    MenuStats,
+    RestaurantRanking,
+    ScoredDish,
+    _result_include,
+)
+
+
+def _cents(score: float) -> int:
+    # Scores arrondis à 0.01 : cents / 100 redonne exactement le même float
+    return round(score * 100)
+
+
+class _RestaurantAggregate:
+    __slots__ = ("totals", "count", "best_score", "best_seq", "best_dish", "plant_based_count")
+
+    def __init__(self):
+        self.totals: Counter = Counter()  # total en centimes → nombre de plats
+        self.count = 0
+        self.best_score = -math.inf
+        self.best_seq = 0
+        self.best_dish = ""
+        self.plant_based_count = 0
+
+
+def _is_plant_based(dish: ScoredDish) -> bool:
+    tags = dish.enriched_attributes.dietary_tags
+    return "vegan" in tags or "vegetarian" in tags
+
+
+class StreamingRanker:
+    """Agrège des plats scorés un par un, sans garder les plats hors du top N"""
+
+    def __init__(self, mode: str, top_n: int = 10, scorer: Optional[ImprovedScorer] = None):
+        self.mode = mode
+        self.top_n = top_n
+        self.scorer = scorer or ImprovedScorer()
+
+        self.count = 0
+        self.filtered_out_count = 0
+        # total en centimes → (s_planet, s_pleasure, s_fit) en centimes, ordre d'arrivée
+        self._buckets: Dict[int, array] = {}
+        self._plant_based = 0
+        self._high_nova = 0
+        self._restaurants: Dict[str, _RestaurantAggregate] = {}
+        self._heap: List[tuple] = []
+        self._swaps: List[tuple] = []
+
+    def add_filtered(self):
+        self.filtered_out_count += 1
+
+    def add(self, dish: ScoredDish):
+        seq = self.count
+        self.count += 1
+
+        total = _cents(dish.total_score)
+        bucket = self._buckets.get(total)
+        if bucket is None:
+            bucket = self._buckets[total] = array("i")
+        bucket.extend(
+            (
+                _cents(dish.sub_scores.s_planet),
+                _cents(dish.sub_scores.s_pleasure),
+                _cents(dish.sub_scores.s_fit),
+            )
+        )
+        plant = _is_plant_based(dish)
+        self._plant_based += plant
+        self._high_nova += dish.enriched_attributes.nova_score >= 3
+
+        resto = self._restaurants.get(dish.restaurant_name)
+        if resto is None:
+            resto = self._restaurants[dish.restaurant_name] = _RestaurantAggregate()
+        resto.totals[total] += 1
+        resto.count += 1
+        resto.plant_based_count += plant
+        if dish.total_score > resto.best_score:  # Premier maximum, comme list.index(max(...))
+            resto.best_score = dish.total_score
+            resto.best_seq = seq
+            resto.best_dish = dish.name
+
+        # Tas min : le pire du top N en tête (score le plus bas, puis arrivé le plus tard)
+        entry = (dish.total_score, -seq, dish)
+        if len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, entry)
+        elif self.top_n > 0 and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+        if self.mode != "consumer":
+            for swap in self.scorer._generate_swaps_robust([dish]):
+                self._swaps.append((-dish.total_score, seq, swap))
+
+    # ------------------------------------------------------------------
+    # Résultat
+    # ------------------------------------------------------------------
+
+    def top_dishes(self) -> List[ScoredDish]:
+        ranked = [dish for _, _, dish in sorted(self._heap, key=lambda e: (-e[0], -e[1]))]
+        for idx, dish in enumerate(ranked):
+            dish.rank_index = idx
+        return ranked
+
+    def _ranked_sum(self, column: Optional[int]) -> float:
+        """sum() d'un score dans l'ordre du classement (column None = total)"""
+        ranked = sorted(self._buckets.items(), reverse=True)
+        if column is None:
+            return sum(total / 100 for total, bucket in ranked for _ in range(len(bucket) // 3))
+        return sum(
+            bucket[i] / 100 for _, bucket in ranked for i in range(column, len(bucket), 3)
+        )
+
+    def stats(self) -> MenuStats:
+        n = self.count
+        if not n:
+            return self.scorer._calc_stats([])
+        return MenuStats(
+            average_sustainability_score=round(self._ranked_sum(0) / n, 2),
+            average_pleasure_score=round(self._ranked_sum(1) / n, 2),
+            average_fit_score=round(self._ranked_sum(2) / n, 2),
+            average_total_score=round(self._ranked_sum(None) / n, 2),
+            total_dishes=n,
+            plant_based_percentage=round(self._plant_based / n * 100, 1),
+            high_nova_percentage=round(self._high_nova / n * 100, 1),
+        )
+
+    def restaurant_rankings(self) -> List[RestaurantRanking]:
+        # Ordre d'apparition dans le classement des plats = rang du meilleur plat
+        ordered = sorted(
+            self._restaurants.items(), key=lambda item: (-item[1].best_score, item[1].best_seq)
+        )
+        rankings = []
+        for name, data in ordered:
+            scores_sum = sum(
+                total / 100
+                for total, count in sorted(data.totals.items(), reverse=True)
+                for _ in range(count)
+            )
+            rankings.append(
+                RestaurantRanking(
+                    restaurant_name=name,
+                    average_score=round(scores_sum / data.count, 2),
+                    dish_count=data.count,
+                    best_dish=data.best_dish,
+                    plant_based_percentage=round(data.plant_based_count / data.count * 100, 1),
+                )
+            )
+        rankings.sort(key=lambda x: x.average_score, reverse=True)
+        return rankings
+
+    def result(self, budget=None, projection: Optional[dict] = None) -> dict:
+        """Même dict que finalize_consumer / finalize_restaurant"""
+        if self.mode == "consumer":
+            result = MenuAnalysisResult(
+                scored_dishes=self.top_dishes(),
+                overall_menu_stats=self.stats(),
+                restaurant_rankings=self.restaurant_rankings(),
+            ).model_dump(include=_result_include(projection))
+
+            if self.filtered_out_count > 0:
+                result["filter_info"] = {
+                    "filtered_out_count": self.filtered_out_count,
+                    "compatible_dishes_found": self.count,
+                    "message": f"🔍 {self.filtered_out_count} plats filtrés selon vos préférences alimentaires",
+                }
+        else:
+            self._swaps.sort(key=lambda e: e[:2])
+            result = MenuAnalysisResult(
+                scored_dishes=self.top_dishes(),
+                overall_menu_stats=self.stats(),
+                restaurant_rankings=self.restaurant_rankings(),
+                swap_suggestions=[swap for _, _, swap in self._swaps],
+            ).model_dump(include=_result_include(projection))
+
+        if budget is not None:
+            result["llm_info"] = budget.report()
+
+        return result
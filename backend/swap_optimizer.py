@@ -0,0 +1,320 @@
+"""
+SWAP OPTIMIZER (B2B)
+====================
+Choisit l'ensemble de substitutions sur tout un menu (ou toute une chaîne)
+qui maximise les économies de CO2 et le gain de score planète, sous contraintes :
+
+- cost_budget           hausse max du coût matière total en €/service
+                        (None = pas de limite, négatif = économie minimale exigée)
+- max_changes           nombre max de plats modifiés
+- min_plant_based_pct   part minimale de plats végétariens/vegan après swaps
+
+Chaque plat a plusieurs options (garder, ou une des règles SWAP_RULES qui
+s'appliquent) : c'est un sac à dos à choix multiples. Résolution par
+relaxation lagrangienne (ILP-style) : les contraintes de coût et de part
+végétale passent dans l'objectif avec des multiplicateurs, la contrainte de
+cardinalité reste exacte (top-K), et les multiplicateurs sont ajustés par
+dichotomie. On garde la meilleure solution réalisable rencontrée, améliorée
+gloutonnement, et on renvoie la borne duale (écart à l'optimum).
+"""
+
+from typing import List, Optional, Tuple
+import math
+import time
+
+from scoring_multi_resto import (
+    MEAT_FISH_PROTEINS,
+    SWAP_RULES,
+    ImprovedAnalyzer,
+    ImprovedScorer,
+    ScoredDish,
+    swap_rules_for,
+)
+from text_normalize import dish_text, fold, fold_keywords
+
+_BISECTION_STEPS = 30
+_EXCHANGE_PASSES = 50
+
+# Mots qui empêchent un plat d'être végétarien après substitution (forme repliée),
+# dont la viande et le poisson du lexique de _extract_dietary
+ANIMAL_KEYWORDS = sorted(
+    fold_keywords(
+        MEAT_FISH_PROTEINS
+        | {word for rule in SWAP_RULES for word in rule["from"]}
+        | {"veal", "veau", "turkey", "dinde", "meat", "viande", "bacon", "lardon", "ham", "jambon"}
+        | set(ImprovedAnalyzer.MEAT_FISH_PRODUCTS)
+    )
+)
+
+
+def is_plant_based(dish: ScoredDish) -> bool:
+    tags = dish.enriched_attributes.dietary_tags
+    return "vegan" in tags or "vegetarian" in tags
+
+
+class SwapOption:
+    """Une substitution possible pour un plat"""
+
+    __slots__ = ("dish", "rule", "co2_saved", "cost_delta", "planet_uplift", "plant", "value")
+
+    def __init__(self, dish: ScoredDish, rule: dict, scorer: ImprovedScorer, planet_weight: float):
+        e = dish.enriched_attributes
+        self.dish = dish
+        self.rule = rule
+        self.co2_saved = rule["co2_saved"] * rule["weight"]
+        self.cost_delta = (rule["cost_to"] - rule["cost_from"]) * rule["weight"]
+
+        # Plat après substitution : même modèle que les suggestions (CO2 par plat)
+        triggers = fold_keywords(rule["from"])
+        remaining = [
+            ing for ing in e.ingredients if not any(word in fold(ing) for word in triggers)
+        ]
+        # Le texte du plat compte aussi : les ingrédients ne contiennent que les
+        # clés de la base carbone ("bacon", "jambon cru" n'y sont pas forcément)
+        text = dish_text(dish.name, dish.description)
+        for word in triggers:
+            text = text.replace(word, " ")
+        self.plant = int(
+            not is_plant_based(dish)
+            and not any(kw in text for kw in ANIMAL_KEYWORDS)
+            and not any(kw in fold(ing) for ing in remaining for kw in ANIMAL_KEYWORDS)
+        )
+        swapped = e.model_copy(
+            update={
+                "ingredients": remaining + [rule["to"]],
+                "carbon_estimate": max(0.0, e.carbon_estimate - self.co2_saved),
+                "dietary_tags": e.dietary_tags + (["vegetarian"] if self.plant else []),
+            }
+        )
+        self.planet_uplift = scorer._planet_score_v2(swapped) - scorer._planet_score_v2(e)
+        self.value = self.co2_saved + planet_weight * self.planet_uplift
+
+    def to_dict(self) -> dict:
+        return {
+            "dish_id": self.dish.id,
+            "dish_name": self.dish.name,
+            "restaurant_name": self.dish.restaurant_name,
+            "current_ingredient": self.rule["from_name"],
+            "suggested_ingredient": self.rule["to"],
+            "estimated_savings_co2": round(self.co2_saved, 2),
+            "estimated_cost_delta": round(self.cost_delta, 2),
+            "planet_score_uplift": round(self.planet_uplift, 2),
+            "becomes_plant_based": bool(self.plant),
+        }
+
+
+def build_options(
+    scored: List[ScoredDish], scorer: ImprovedScorer, planet_weight: float = 1.0
+) -> List[List[SwapOption]]:
+    """Options par plat (toutes les règles applicables, pas seulement la première)"""
+    options = []
+    for dish in scored:
+        dish_options = [
+            SwapOption(dish, rule, scorer, planet_weight)
+            for rule in swap_rules_for(dish_text(dish.name, dish.description))
+        ]
+        if dish_options:
+            options.append(dish_options)
+    return options
+
+
+class _Selection:
+    __slots__ = ("chosen", "value", "cost", "plant")
+
+    def __init__(self, chosen: List[SwapOption]):
+        self.chosen = chosen
+        self.value = sum(o.value for o in chosen)
+        self.cost = sum(o.cost_delta for o in chosen)
+        self.plant = sum(o.plant for o in chosen)
+
+
+def _relaxed(
+    options: List[List[SwapOption]], max_changes: int, lam: float, mu: float
+) -> Tuple[_Selection, float]:
+    """Meilleure sélection pour l'objectif lagrangien (valeur - λ·coût + μ·végétal)"""
+    best = []
+    for dish_options in options:
+        adjusted, option = max(
+            ((o.value - lam * o.cost_delta + mu * o.plant, o) for o in dish_options),
+            key=lambda pair: pair[0],
+        )
+        if adjusted > 0:
+            best.append((adjusted, option))
+    best.sort(key=lambda pair: pair[0], reverse=True)
+    best = best[:max_changes]
+    return _Selection([o for _, o in best]), sum(adj for adj, _ in best)
+
+
+def optimize_swaps(
+    scored: List[ScoredDish],
+    cost_budget: Optional[float] = None,
+    max_changes: Optional[int] = None,
+    min_plant_based_pct: float = 0.0,
+    planet_weight: float = 1.0,
+    scorer: Optional[ImprovedScorer] = None,
+) -> dict:
+    """
+    Plan de substitutions optimal (ou quasi-optimal, voir "optimality_gap")
+
+    Args:
+        scored: plats déjà scorés (mode restaurant)
+        cost_budget: hausse max du coût matière total (€/service), None = illimité
+        max_changes: nombre max de plats modifiés, None = illimité
+        min_plant_based_pct: part minimale (%) de plats végétariens après swaps
+        planet_weight: kg CO2e équivalents à un point de score planète
+
+    Returns:
+        Dict avec swaps, totaux, part végétale avant/après, faisabilité et borne
+    """
+    started = time.perf_counter()
+    scorer = scorer or ImprovedScorer()
+    options = build_options(scored, scorer, planet_weight)
+
+    n = len(scored)
+    k = len(options) if max_changes is None else max(0, min(max_changes, len(options)))
+    plant_before = sum(1 for d in scored if is_plant_based(d))
+    need = max(0, math.ceil(min_plant_based_pct / 100 * n - 1e-9) - plant_before)
+
+    def feasible(sel: _Selection) -> bool:
+        return (cost_budget is None or sel.cost <= cost_budget + 1e-9) and sel.plant >= need
+
+    best: Optional[_Selection] = None
+    upper_bound = math.inf
+
+    def consider(lam: float, mu: float) -> _Selection:
+        nonlocal best, upper_bound
+        sel, relaxed_value = _relaxed(options, k, lam, mu)
+        dual = relaxed_value + lam * (cost_budget or 0.0) - mu * need
+        upper_bound = min(upper_bound, dual)
+        if feasible(sel) and (best is None or sel.value > best.value):
+            best = sel
+        return sel
+
+    values = [abs(o.value) for opts in options for o in opts] or [1.0]
+    costs = [abs(o.cost_delta) for opts in options for o in opts if o.cost_delta] or [1.0]
+    mu_max = 2 * max(values) + 1.0
+
+    def search_mu(lam: float) -> _Selection:
+        # Plus petit μ qui atteint la part végétale demandée
+        sel = consider(lam, 0.0)
+        if need == 0 or sel.plant >= need:
+            return sel
+        hi = mu_max + lam * max(costs)
+        sel_hi = consider(lam, hi)
+        if sel_hi.plant < need:
+            return sel_hi
+        lo = 0.0
+        for _ in range(_BISECTION_STEPS):
+            mid = (lo + hi) / 2
+            sel_mid = consider(lam, mid)
+            if sel_mid.plant >= need:
+                hi, sel_hi = mid, sel_mid
+            else:
+                lo = mid
+        return sel_hi
+
+    sel = search_mu(0.0)
+    if cost_budget is not None and sel.cost > cost_budget:
+        # Plus petit λ qui respecte le budget
+        lo, hi = 0.0, 2 * (max(values) + mu_max) / min(costs) + 1.0
+        for _ in range(_BISECTION_STEPS):
+            mid = (lo + hi) / 2
+            if search_mu(mid).cost <= cost_budget:
+                hi = mid
+            else:
+                lo = mid
+        search_mu(hi)
+
+    if best is None:
+        empty = _Selection([])
+        best = empty if feasible(empty) else None
+
+    if best is not None:
+        best = _improve(best, options, k, cost_budget, need)
+
+    chosen = sorted(best.chosen, key=lambda o: o.value, reverse=True) if best else []
+    plant_after = plant_before + sum(o.plant for o in chosen)
+    achieved = best.value if best else 0.0
+
+    return {
+        "feasible": best is not None,
+        "swaps": [o.to_dict() for o in chosen],
+        "changed_dishes": len(chosen),
+        "total_savings_co2": round(sum(o.co2_saved for o in chosen), 2),
+        "total_cost_delta": round(sum(o.cost_delta for o in chosen), 2),
+        "total_planet_uplift": round(sum(o.planet_uplift for o in chosen), 2),
+        "objective": round(achieved, 2),
+        # Borne duale lagrangienne : aucun plan réalisable ne fait mieux
+        "upper_bound": round(upper_bound, 2) if best is not None else None,
+        "optimality_gap": round(max(0.0, upper_bound - achieved), 2) if best is not None else None,
+        "plant_based_percentage_before": round(plant_before / n * 100, 1) if n else 0.0,
+        "plant_based_percentage_after": round(plant_after / n * 100, 1) if n else 0.0,
+        "candidate_dishes": len(options),
+        "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _improve(
+    sel: _Selection,
+    options: List[List[SwapOption]],
+    max_changes: int,
+    cost_budget: Optional[float],
+    need: int,
+) -> _Selection:
+    """
+    Améliore une solution réalisable : meilleure option par plat choisi, plats
+    ajoutés tant que c'est réalisable, puis échanges 1-1
+    """
+    chosen = {id(o.dish): o for o in sel.chosen}
+    cost = sel.cost
+    plant = sel.plant
+
+    def fits(delta_cost: float, delta_plant: int) -> bool:
+        return (
+            cost_budget is None or cost + delta_cost <= cost_budget + 1e-9
+        ) and plant + delta_plant >= need
+
+    candidates = []
+    for dish_options in options:
+        current = chosen.get(id(dish_options[0].dish))
+        for option in dish_options:
+            if current is None:
+                candidates.append((option.value, option))
+            elif option.value > current.value and fits(
+                option.cost_delta - current.cost_delta, option.plant - current.plant
+            ):
+                cost += option.cost_delta - current.cost_delta
+                plant += option.plant - current.plant
+                chosen[id(option.dish)] = current = option
+
+    for value, option in sorted(candidates, key=lambda pair: pair[0], reverse=True):
+        if value <= 0 or len(chosen) >= max_changes:
+            break
+        if id(option.dish) in chosen or not fits(option.cost_delta, option.plant):
+            continue
+        chosen[id(option.dish)] = option
+        cost += option.cost_delta
+        plant += option.plant
+
+    # Échanges 1-1 (une option retirée, une autre ajoutée) tant que l'objectif progresse
+    ranked = sorted((o for opts in options for o in opts), key=lambda o: o.value, reverse=True)
+    for _ in range(_EXCHANGE_PASSES):
+        best_gain, best_move = 1e-9, None
+        for out in chosen.values():
+            for option in ranked:
+                gain = option.value - out.value
+                if gain <= best_gain:
+                    break
+                if id(option.dish) in chosen and option.dish is not out.dish:
+                    continue
+                if fits(option.cost_delta - out.cost_delta, option.plant - out.plant):
+                    best_gain, best_move = gain, (out, option)
+        if best_move is None:
+            break
+        out, option = best_move
+        del chosen[id(out.dish)]
+        chosen[id(option.dish)] = option
+        cost += option.cost_delta - out.cost_delta
+        plant += option.plant - out.plant
+
+    return _Selection(list(chosen.values()))
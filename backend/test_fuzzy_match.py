@@ -0,0 +1,29 @@
+"""
+FUZZY MATCH TESTS
+=================
+Second passage par trigrammes, mots seuls et termes de plusieurs mots.
+"""
+
+from fuzzy_match import TrigramIndex
+
+LEXICON = ["pomme de terre", "crème fraîche", "pois chiches", "pomme", "saumon", "escargots", "terre"]
+
+
+def test_misspelled_multi_word_ingredient():
+    index = TrigramIndex(LEXICON)
+
+    assert index.best_matches("Purée de pome de tere") == ["pomme de terre"]
+    assert index.best_matches("tarte, crème fraiche épaisse") == ["crème fraîche"]
+    assert index.best_matches("poi chiche grillés") == ["pois chiches"]
+
+
+def test_single_words_still_match():
+    index = TrigramIndex(LEXICON)
+
+    assert index.best_matches("scargots au beurre, saumonn") == ["escargots", "saumon"]
+
+
+def test_exact_matches_are_not_searched_again():
+    index = TrigramIndex(LEXICON)
+
+    assert index.best_matches("pomme de terre", exclude=["pomme de terre"]) == []
@@ -0,0 +1,75 @@
+"""
+GEO INDEX TESTS
+===============
+Grille contre parcours exhaustif, et index des restaurants rafraîchi depuis
+le stockage.
+"""
+
+import random
+
+from geo_index import GeoGridIndex, RestaurantGeoIndex, haversine_m, select_nearby
+from storage import Storage
+
+PARIS = (48.8566, 2.3522)
+
+
+def brute_force(points, lat, lon):
+    return sorted((haversine_m(lat, lon, plat, plon), key) for key, plat, plon in points)
+
+
+def test_grid_matches_brute_force():
+    rng = random.Random(5)
+    points = [
+        (f"R{i}", PARIS[0] + rng.uniform(-0.1, 0.1), PARIS[1] + rng.uniform(-0.15, 0.15))
+        for i in range(2000)
+    ]
+    grid = GeoGridIndex.from_points(points)
+
+    for _ in range(200):
+        lat, lon = PARIS[0] + rng.uniform(-0.12, 0.12), PARIS[1] + rng.uniform(-0.17, 0.17)
+        expected = brute_force(points, lat, lon)
+
+        radius = rng.choice([50, 300, 1500, 8000])
+        assert grid.within(lat, lon, radius) == [hit for hit in expected if hit[0] <= radius]
+
+        k = rng.choice([1, 3, 10, 50])
+        assert [key for _, key in grid.nearest(lat, lon, k)] == [key for _, key in expected[:k]]
+
+
+def test_index_refreshes_from_storage(tmp_path):
+    storage = Storage(str(tmp_path / "geo.sqlite3"))
+    storage.save_restaurant("Near", lat=48.8570, lng=2.3525)
+    storage.save_restaurant("Far", lat=48.9000, lng=2.4000)
+    storage.save_restaurant("Nowhere")
+
+    index = RestaurantGeoIndex()
+    assert index.sync(storage) == 2
+
+    # Écrit après la construction : pris en compte au rafraîchissement suivant
+    storage.save_restaurant("Later", lat=48.8568, lng=2.3520)
+    index.sync(storage)
+
+    dishes = [
+        {"id": i, "restaurant_name": name}
+        for i, name in enumerate(["Near", "Far", "Nowhere", "Later", "Near"])
+    ]
+    selected, restaurants = select_nearby(dishes, *PARIS, radius_m=1000, index=index)
+
+    assert [r["restaurant_name"] for r in restaurants] == ["Later", "Near"]
+    assert [d["id"] for d in selected] == [0, 3, 4]
+
+
+def test_menu_coordinates_feed_the_index():
+    index = RestaurantGeoIndex()
+    dishes = [
+        {"id": 1, "restaurant_name": "A", "lat": 48.8567, "lng": 2.3523},
+        {"id": 2, "restaurant_name": "B", "lat": 48.8700, "lng": 2.3600},
+        {"id": 3, "restaurant_name": "C"},
+    ]
+    selected, restaurants = select_nearby(dishes, *PARIS, k=1, index=index)
+
+    assert [d["id"] for d in selected] == [1]
+    assert len(index) == 2
+    # Restaurant connu de l'index, absent du menu : jamais renvoyé
+    selected, restaurants = select_nearby(dishes[1:], *PARIS, k=1, index=index)
+    assert [r["restaurant_name"] for r in restaurants] == ["B"]
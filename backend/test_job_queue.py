@@ -0,0 +1,49 @@
+"""
+JOB QUEUE TESTS
+===============
+Priorités bornées, résultat non sérialisable, remplacement des workers morts.
+"""
+
+import time
+
+import job_queue
+from job_queue import FAILED, PRIORITY_HIGH, PRIORITY_LOW, JobQueue, JobWorkerPool
+
+
+def unserializable_job(payload: dict, uploads: list) -> dict:
+    return {"value": object()}
+
+
+def test_priority_is_clamped(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    greedy = queue.submit("score-menu", "x:y", {}, priority=10**9)
+    humble = queue.submit("score-menu", "x:y", {}, priority=-5)
+
+    assert queue.get(greedy)["priority"] == PRIORITY_HIGH
+    assert queue.get(humble)["priority"] == PRIORITY_LOW
+
+
+def test_unserializable_result_fails_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("test", "test_job_queue:unserializable_job", {})
+
+    queue.run(queue.claim("w"), "w")
+
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert "not JSON serializable" in job["error"]
+
+
+def test_pool_replaces_dead_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "SUPERVISE_INTERVAL", 0.1)
+    pool = JobWorkerPool(str(tmp_path / "jobs.sqlite3"), workers=1)
+    pool.start()
+    try:
+        pool._processes[0].kill()
+        deadline = time.time() + 30
+        while pool.restarts == 0 and time.time() < deadline:
+            time.sleep(0.1)
+        assert pool.restarts >= 1
+        assert pool._processes[0].is_alive()
+    finally:
+        pool.stop()
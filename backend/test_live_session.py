@@ -0,0 +1,74 @@
+"""
+LIVE SESSION TESTS
+==================
+Les deltas de /ws/rescore appliqués au top local doivent redonner exactement
+le classement de /api/score-menu pour le profil courant.
+"""
+
+import json
+import random
+
+ALLERGENS = ["gluten", "lactose", "nuts", "eggs", "fish", "soy", "shellfish"]
+
+
+def random_delta(rng: random.Random) -> dict:
+    roll = rng.random()
+    if roll < 0.4:
+        return {"add_allergens": [rng.choice(ALLERGENS)]}
+    if roll < 0.7:
+        return {"remove_allergens": [rng.choice(ALLERGENS)]}
+    if roll < 0.85:
+        return {"dietary_restriction": rng.choice(["", "vegan", "vegetarian", "halal", "gluten-free"])}
+    if roll < 0.95:
+        return {"goal": rng.choice(["", "weight_loss", "muscle_gain"])}
+    return {"top_n": rng.choice([5, 10, 15])}
+
+
+def apply_delta(top: dict, message: dict) -> list:
+    for dish_id in message["left"]:
+        top.pop(dish_id)
+    for dish in message["entered"]:
+        top[dish["id"]] = dish
+    for update in message["updated"]:
+        dish = top[update["id"]]
+        dish.update({k: v for k, v in update.items() if k != "sub_scores"})
+        dish["sub_scores"].update(update.get("sub_scores", {}))
+    return [top[dish_id] for dish_id in message["order"]]
+
+
+def test_deltas_match_score_menu(client, menu):
+    # 180 plats sur 15 restaurants
+    dishes = [
+        dict(d, id=k * 100 + d["id"], restaurant_name=f"R{k}", price=d["price"] + k)
+        for k in range(15)
+        for d in menu
+    ]
+    profile = {"dietary_restriction": "", "goal": "", "allergens": [], "strict_filter": True}
+    rng = random.Random(1)
+
+    with client.websocket_connect("/ws/rescore") as ws:
+        ws.send_json({"type": "init", "menu_data": dishes, "user_profile": profile, "top_n": 10})
+        snapshot = ws.receive_json()
+        top = {d["id"]: d for d in snapshot["scored_dishes"]}
+
+        for _ in range(40):
+            delta = random_delta(rng)
+            ws.send_json({"type": "profile", "delta": delta})
+            message = json.loads(ws.receive_text())
+            ranked = apply_delta(top, message)
+
+            expected = client.post(
+                "/api/score-menu",
+                json={
+                    "menu_data": dishes,
+                    "user_profile": message["user_profile"],
+                    "top_n": message["top_n"],
+                },
+            ).json()["results"]["scored_dishes"]
+            assert ranked == expected, delta
+
+
+def test_profile_before_init_is_an_error(client):
+    with client.websocket_connect("/ws/rescore") as ws:
+        ws.send_json({"type": "profile", "delta": {}})
+        assert ws.receive_json()["type"] == "error"
@@ -0,0 +1,39 @@
+"""
+LLM CACHE TESTS
+===============
+Une erreur SQLite passagère saute l'opération sans désactiver le cache ;
+seule une base impossible à ouvrir le désactive.
+"""
+
+import sqlite3
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+def test_locked_database_skips_one_operation(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMCache(path)
+    cache.set("a", {"x": 1})
+
+    # Un autre processus garde un verrou d'écriture plus longtemps que busy_timeout
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    cache._connect().execute("PRAGMA busy_timeout=10")
+    cache.set("b", {"x": 2})
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    cache.set("c", {"x": 3})
+    assert cache.get("a") == {"x": 1}
+    assert cache.get("b") is None
+    assert cache.get("c") == {"x": 3}
+
+
+def test_unopenable_database_disables_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_CACHE", None)
+    monkeypatch.setattr(llm_cache, "_CACHE_FAILED", False)
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "missing" / "cache.sqlite3"))
+
+    assert llm_cache.get_llm_cache() is None
+    assert llm_cache._CACHE_FAILED
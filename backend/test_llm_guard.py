@@ -0,0 +1,48 @@
+"""
+LLM GUARD TESTS
+===============
+Le disjoncteur compte les timeouts d'après le type d'exception (requests.Timeout),
+jamais d'après le texte du message.
+"""
+
+import pytest
+import requests
+
+import scoring_multi_resto
+from llm_guard import LLM_BREAKER, LLMBudget
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(scoring_multi_resto, "HAS_LLM", True)
+    monkeypatch.setattr(scoring_multi_resto, "get_llm_cache", lambda: None)
+    monkeypatch.setattr(LLM_BREAKER, "failure_threshold", 1)
+    LLM_BREAKER.reset()
+    yield lambda error: monkeypatch.setattr(
+        requests, "post", lambda *args, **kwargs: (_ for _ in ()).throw(error)
+    )
+    LLM_BREAKER.reset()
+
+
+def test_deadline_timeout_keeps_breaker_closed(llm):
+    llm(requests.ReadTimeout("read"))
+    result = scoring_multi_resto.extract_with_llm("Steak", "boeuf", LLMBudget(1.0))
+
+    assert result["fallback_reason"] == "timeout"
+    assert LLM_BREAKER.state == "closed"
+
+
+def test_full_timeout_opens_breaker(llm):
+    llm(requests.ConnectTimeout("connect"))
+    result = scoring_multi_resto.extract_with_llm("Steak", "boeuf")
+
+    assert result["fallback_reason"] == "timeout"
+    assert LLM_BREAKER.state == "open"
+
+
+def test_other_errors_are_failures_whatever_the_message(llm):
+    llm(requests.ConnectionError("Connection timed out"))
+    result = scoring_multi_resto.extract_with_llm("Steak", "boeuf", LLMBudget(1.0))
+
+    assert result["fallback_reason"] == "error"
+    assert LLM_BREAKER.state == "open"
@@ -0,0 +1,61 @@
+"""
+MENU EXTRACTION TESTS
+=====================
+Pipeline multi-documents : l'OCR ne prend jamais plus de OCR_PREFETCH
+documents d'avance sur le parseur.
+"""
+
+import threading
+
+import menu_extraction
+from menu_extraction import OCR_PREFETCH, stream_menu_pages
+
+
+def test_ocr_window_is_bounded(monkeypatch):
+    documents = [{"id": i} for i in range(6)]
+    lock = threading.Lock()
+    submitted = []
+    parsed = []
+    ahead = []
+
+    def fake_ocr(mistral_client, document):
+        with lock:
+            submitted.append(document["id"])
+        return [f"page {document['id']}"]
+
+    def fake_parse(anthropic_client, page_text, restaurant_name):
+        parsed.append(page_text)
+        with lock:
+            ahead.append(len(submitted) - len(parsed))
+        yield "dish", {"name": page_text, "price": 10.0}
+
+    monkeypatch.setattr(menu_extraction, "run_ocr_pages", fake_ocr)
+    monkeypatch.setattr(menu_extraction, "stream_menu_text", fake_parse)
+
+    events = list(stream_menu_pages(None, None, documents, "Chez Test"))
+
+    assert [payload["name"] for kind, payload in events if kind == "dish"] == [
+        f"page {i}" for i in range(6)
+    ]
+    assert events[-1][0] == "restaurant"
+    assert max(ahead) <= OCR_PREFETCH
+
+
+def test_closing_early_stops_ocr(monkeypatch):
+    submitted = []
+
+    def fake_ocr(mistral_client, document):
+        submitted.append(document["id"])
+        return [f"page {document['id']}"]
+
+    def fake_parse(anthropic_client, page_text, restaurant_name):
+        yield "dish", {"name": page_text, "price": 10.0}
+
+    monkeypatch.setattr(menu_extraction, "run_ocr_pages", fake_ocr)
+    monkeypatch.setattr(menu_extraction, "stream_menu_text", fake_parse)
+
+    stream = stream_menu_pages(None, None, [{"id": i} for i in range(20)], "Chez Test")
+    next(stream)
+    stream.close()
+
+    assert len(submitted) <= 1 + OCR_PREFETCH
@@ -0,0 +1,48 @@
+"""
+MENU SIMULATOR TESTS
+====================
+Un scénario évalué par différence doit donner les mêmes stats et le même
+rang qu'un simulateur reconstruit sur le menu modifié.
+"""
+
+from menu_simulator import MenuSimulator, _fold_replace
+
+
+def test_swap_matches_folded_text():
+    assert _fold_replace("Bœuf bourguignon", "boeuf", "lentilles") == "lentilles bourguignon"
+    assert _fold_replace("Tartare de BOEUF, frites", "bœuf", "betterave") == "Tartare de betterave, frites"
+    assert _fold_replace("Crème brûlée", "creme", "crème") == "crème brûlée"
+    assert _fold_replace("Salade", "boeuf", "lentilles") == "Salade"
+
+
+def test_scenarios_match_rebuilt_menu():
+    menu = [
+        {"id": 1, "name": "Bœuf bourguignon", "description": "carottes", "price": 18.0, "restaurant_name": "A"},
+        {"id": 2, "name": "Burger BOEUF", "description": "cheddar", "price": 14.0, "restaurant_name": "A"},
+        {"id": 3, "name": "Salade", "description": "tomates", "price": 9.0, "restaurant_name": "A"},
+        {"id": 4, "name": "Poulet rôti", "description": "", "price": 16.0, "restaurant_name": "B"},
+        {"id": 5, "name": "Dahl", "description": "lentilles", "price": 12.0, "restaurant_name": "C"},
+    ]
+    simulator = MenuSimulator(menu, "A")
+    added = {"name": "Curry vegan", "description": "pois chiches", "price": 13.0}
+    scenarios = [
+        [{"type": "swap", "from": "boeuf", "to": "lentilles"}],
+        [{"type": "swap", "from": "bœuf", "to": "tofu", "dish_ids": [2]}, {"type": "remove", "dish_id": 3}],
+        [{"type": "add", "dish": added}],
+    ]
+    rebuilt_menus = [
+        [
+            dict(menu[0], name="lentilles bourguignon"),
+            dict(menu[1], name="Burger lentilles"),
+            *menu[2:],
+        ],
+        [menu[0], dict(menu[1], name="Burger tofu"), *menu[3:]],
+        [*menu, dict(added, id=6, restaurant_name="A")],
+    ]
+
+    results = simulator.simulate_batch(scenarios)
+    for result, rebuilt in zip(results, rebuilt_menus):
+        expected = MenuSimulator(rebuilt, "A").baseline()
+        assert result["menu_stats"] == expected["menu_stats"]
+        assert result["planet_score_distribution"] == expected["planet_score_distribution"]
+        assert result["rank"] == expected["rank"]
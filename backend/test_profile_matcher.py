@@ -0,0 +1,205 @@
+"""
+PROFILE MATCHER TESTS
+=====================
+ProfileMatcher.fit doit donner exactement le score de l'ancien _fit_consumer
+(avant compilation du profil), sur des plats et des profils tirés au hasard.
+"""
+
+import random
+
+from scoring_multi_resto import ALLERGEN_DB, EnrichedAttributes, ImprovedScorer, ProfileMatcher
+
+
+def legacy_fit_consumer(e: EnrichedAttributes, profile: dict) -> float:
+    """Référence : _fit_consumer avant ProfileMatcher, recopié tel quel"""
+    score = 5.0
+    restriction = profile.get("dietary_restriction", "").lower()
+    goal = profile.get("goal", "").lower()
+    allergens = profile.get("allergens", [])
+    strict_filter = profile.get("strict_filter", True)
+
+    # CRITICAL: Check allergens FIRST (unchanged - already safe)
+    for allergen in allergens:
+        if allergen in e.allergens:
+            return 0.0  # Immediate disqualification
+
+    # IMPROVED: Amplified Nutri-Score impact (plant-based foods tend to score better)
+    nutri_bonus = {"A": 2.5, "B": 1.5, "C": 0, "D": -1.5, "E": -2.5}
+    score += nutri_bonus.get(e.nutriscore, 0)
+
+    # ========================================================================
+    # DIETARY RESTRICTIONS (Enhanced safety + explicit protein checks)
+    # ========================================================================
+
+    if restriction == "vegan":
+        if "vegan" in e.dietary_tags:
+            score += 4.0
+        elif "vegetarian" in e.dietary_tags:
+            # Extra safety: check if truly vegan (no dairy/eggs)
+            has_animal_products = any(
+                a in e.allergens for a in ["lactose", "eggs", "fish", "shellfish"]
+            )
+            if has_animal_products:
+                if strict_filter:
+                    return 0.0  # Not actually vegan
+                else:
+                    score -= 2.0
+            else:
+                score += 1.0  # Potentially veganizable
+        else:
+            # Contains meat/fish
+            if strict_filter:
+                return 0.0  # Hard filter
+            else:
+                score -= 3.0
+
+    elif restriction == "vegetarian":
+        if "vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags:
+            score += 3.5
+        # Enhanced check: explicit protein filtering
+        elif e.primary_protein in [
+            "beef",
+            "boeuf",
+            "chicken",
+            "poulet",
+            "pork",
+            "porc",
+            "lamb",
+            "agneau",
+            "duck",
+            "canard",
+            "fish",
+            "poisson",
+            "salmon",
+            "saumon",
+            "shrimp",
+            "crevette",
+            "tuna",
+            "kebab",
+            "nuggets",
+            "merguez",
+        ]:
+            if strict_filter:
+                return 0.0  # Hard filter
+            else:
+                score -= 2.5
+        else:
+            # Ambiguous - be cautious
+            if strict_filter:
+                return 0.0  # When in doubt, filter out for safety
+            else:
+                score -= 1.0
+
+    elif restriction == "gluten-free":
+        if "gluten-free" in e.dietary_tags:
+            score += 3.5
+        # Enhanced: check allergen detection
+        elif "gluten" in e.allergens:
+            if strict_filter:
+                return 0.0
+            else:
+                score -= 3.0
+
+    elif restriction == "halal":
+        if "halal" in e.dietary_tags:
+            score += 4.0
+        # Enhanced: explicit pork ingredient check
+        elif e.primary_protein in ["pork", "porc"] or any(
+            ing in e.ingredients
+            for ing in ["pork", "porc", "bacon", "lardon", "ham", "jambon"]
+        ):
+            if strict_filter:
+                return 0.0  # Hard filter
+            else:
+                score -= 5.0
+
+    # ========================================================================
+    # NEW: UNIVERSAL PLANT-BASED HEALTH BONUS (for users without restrictions)
+    # Science-backed: higher fiber, micronutrients, lower saturated fat
+    # ========================================================================
+
+    if not restriction:  # Only for omnivores (show them the benefits!)
+        if "vegan" in e.dietary_tags:
+            score += 1.5  # Health benefit bonus
+        elif "vegetarian" in e.dietary_tags:
+            score += 1.0
+
+    # ========================================================================
+    # HEALTH GOALS (Enhanced with plant-based preference)
+    # ========================================================================
+
+    if "weight_loss" in goal or "perte" in goal:
+        # Low carbon + unprocessed foods
+        if e.carbon_estimate < 5.0 and e.nova_score <= 2:
+            score += 2.0
+        # NEW: Extra boost for plant-based (science: lower calorie density, higher fiber)
+        if "vegan" in e.dietary_tags or "vegetarian" in e.dietary_tags:
+            score += 1.0
+
+    elif "muscle" in goal or "sport" in goal or "athlete" in goal:
+        # Protein-rich options (unchanged base logic)
+        if e.primary_protein in [
+            "chicken",
+            "poulet",
+            "tofu",
+            "tempeh",
+            "salmon",
+            "saumon",
+            "lentils",
+            "lentilles",
+        ]:
+            score += 2.0
+        # NEW: Bonus for plant proteins (combat "you need meat" myth)
+        if e.primary_protein in [
+            "tofu",
+            "tempeh",
+            "lentils",
+            "lentilles",
+            "chickpeas",
+            "pois chiches",
+        ]:
+            score += 0.5
+
+    return max(0, min(10, score))
+
+
+def random_dish(rng: random.Random) -> EnrichedAttributes:
+    return EnrichedAttributes(
+        ingredients=rng.sample(["pork", "bacon", "ham", "jambon", "rice", "tomato"], rng.randint(0, 3)),
+        nova_score=rng.randint(1, 4),
+        nutriscore=rng.choice("ABCDEX"),
+        dietary_tags=rng.sample(["vegan", "vegetarian", "pescatarian", "gluten-free", "halal"], rng.randint(0, 3)),
+        allergens=rng.sample(list(ALLERGEN_DB), rng.randint(0, 3)),
+        primary_protein=rng.choice([None, "beef", "pork", "porc", "tofu", "chicken", "lentils", "chickpeas", "salmon", "x"]),
+        carbon_estimate=rng.uniform(0, 10),
+    )
+
+
+def random_profile(rng: random.Random) -> dict:
+    return {
+        "dietary_restriction": rng.choice(["", "Vegan", "vegetarian", "halal", "gluten-free", "other"]),
+        "goal": rng.choice(["", "weight_loss", "perte", "Muscle", "sport", "x"]),
+        "allergens": rng.sample(list(ALLERGEN_DB) + ["Gluten", "zzz"], rng.randint(0, 2)),
+        "strict_filter": rng.random() < 0.5,
+    }
+
+
+def test_matches_legacy_fit_consumer():
+    rng = random.Random(1)
+    for _ in range(5000):
+        e, profile = random_dish(rng), random_profile(rng)
+        expected = legacy_fit_consumer(e, profile)
+        got = ProfileMatcher(profile).fit(e)
+        assert got == expected and type(got) is type(expected), (e, profile)
+
+
+def test_scorer_reuses_compiled_profile():
+    rng = random.Random(2)
+    profile = random_profile(rng)
+    matcher = ProfileMatcher(profile)
+    scorer = ImprovedScorer()
+    for _ in range(500):
+        e = random_dish(rng)
+        assert scorer._fit_consumer(e, matcher) == scorer._fit_consumer(e, profile)
+        # Mémo par enregistrement (plats internés) : même résultat au second appel
+        assert matcher.fit(e) == legacy_fit_consumer(e, profile)
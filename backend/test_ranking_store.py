@@ -0,0 +1,52 @@
+"""
+RANKING STORE TESTS
+===================
+Pagination par curseur : les pages de /api/rankings/next, mises bout à bout,
+redonnent le classement complet de /api/score-menu.
+"""
+
+from ranking_store import encode_cursor, validate_weights
+
+
+def follow(client, cursor: str, **params) -> list:
+    dishes = []
+    while cursor:
+        page = client.get("/api/rankings/next", params=dict(params, cursor=cursor)).json()
+        dishes += page["scored_dishes"]
+        cursor = page["next_cursor"]
+    return dishes
+
+
+def test_pages_match_full_ranking(client, menu):
+    first = client.post(
+        "/api/score-menu", json={"menu_data": menu, "mode": "restaurant", "top_n": 5}
+    ).json()
+    full = client.post(
+        "/api/score-menu", json={"menu_data": menu, "mode": "restaurant", "top_n": 100}
+    ).json()["results"]["scored_dishes"]
+
+    paged = first["results"]["scored_dishes"] + follow(client, first["next_cursor"])
+    assert paged == full
+    assert len(paged) == len(menu)
+
+
+def test_rerank_cursor_keeps_weights(client, menu):
+    first = client.post("/api/score-menu", json={"menu_data": menu, "top_n": 3}).json()
+    reranked = client.post(
+        "/api/rerank",
+        json={"ranking_id": first["ranking_id"], "weights": {"planet": 1}, "top_n": 3},
+    ).json()
+    full = client.post(
+        "/api/rerank",
+        json={"ranking_id": first["ranking_id"], "weights": {"planet": 1}, "top_n": 100},
+    ).json()
+
+    paged = reranked["results"]["scored_dishes"] + follow(client, reranked["next_cursor"], limit=4)
+    assert paged == full["results"]["scored_dishes"]
+    assert [d["rank_index"] for d in paged] == list(range(len(menu)))
+
+
+def test_bad_cursors(client):
+    assert client.get("/api/rankings/next", params={"cursor": "garbage"}).status_code == 400
+    unknown = encode_cursor("missing", 1, 1, validate_weights(None))
+    assert client.get("/api/rankings/next", params={"cursor": unknown}).status_code == 404
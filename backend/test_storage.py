@@ -0,0 +1,34 @@
+"""
+STORAGE TESTS
+=============
+Écritures différées : enregistrées après flush(), erreurs journalisées sans
+remonter à l'appelant.
+"""
+
+import logging
+
+from storage import Storage
+
+
+def test_write_behind_persists_after_flush(tmp_path):
+    storage = Storage(str(tmp_path / "store.sqlite3"))
+    menu = [{"id": 1, "name": "Dahl", "description": "lentilles", "price": 12.0}]
+
+    storage.write_behind(storage.save_menu, "A", menu)
+    storage.flush()
+
+    assert storage.counts()["dishes"] == 1
+
+
+def test_write_behind_logs_failures(tmp_path, caplog):
+    storage = Storage(str(tmp_path / "store.sqlite3"))
+
+    def broken():
+        raise RuntimeError("disk full")
+
+    with caplog.at_level(logging.ERROR, logger="storage"):
+        storage.write_behind(broken)
+        storage.flush()
+
+    assert "Storage write failed" in caplog.text
+    assert "disk full" in caplog.text
@@ -0,0 +1,112 @@
+"""
+STREAMING SCORING TESTS
+=======================
+/api/score-menu/ndjson doit rendre exactement la réponse de /api/score-menu
+(hors llm_info, qui dépend du temps) : mêmes rangs, mêmes stats, mêmes swaps.
+"""
+
+import json
+import random
+
+import pytest
+
+PROFILES = [
+    ("consumer", {"dietary_restriction": "", "goal": "", "allergens": []}, 10),
+    ("consumer", {"dietary_restriction": "vegetarian", "goal": "weight_loss", "allergens": ["gluten", "nuts"]}, 25),
+    ("consumer", {"dietary_restriction": "", "goal": "", "allergens": ["lactose"]}, 0),
+    ("restaurant", None, 15),
+]
+
+
+@pytest.fixture
+def big_menu(menu):
+    """1440 plats sur 37 restaurants, dans le désordre"""
+    dishes = [
+        dict(d, id=k * 100 + d["id"], restaurant_name=f"R{k % 37}", price=d["price"] + k)
+        for k in range(120)
+        for d in menu
+    ]
+    random.Random(3).shuffle(dishes)
+    return dishes
+
+
+def without_llm_info(results: dict) -> dict:
+    results = dict(results)
+    results.pop("llm_info", None)
+    return results
+
+
+def ndjson_params(mode: str, profile, top_n: int, response_profile: str = "full") -> dict:
+    params = {"mode": mode, "top_n": top_n, "response_profile": response_profile}
+    if profile:
+        params.update(
+            dietary_restriction=profile["dietary_restriction"],
+            goal=profile["goal"],
+            allergens=",".join(profile["allergens"]),
+        )
+    return params
+
+
+@pytest.mark.parametrize("response_profile", ["full", "map"])
+@pytest.mark.parametrize("mode,profile,top_n", PROFILES)
+def test_ndjson_matches_score_menu(client, big_menu, mode, profile, top_n, response_profile):
+    expected = client.post(
+        "/api/score-menu",
+        json={
+            "menu_data": big_menu,
+            "user_profile": profile and dict(profile, strict_filter=True),
+            "mode": mode,
+            "top_n": top_n,
+            "response_profile": response_profile,
+        },
+    ).json()["results"]
+
+    body = ("\n".join(json.dumps(d) for d in big_menu) + "\n").encode()
+    # Coupé au milieu des lignes, comme un corps reçu par morceaux
+    chunks = (body[i : i + 7777] for i in range(0, len(body), 7777))
+    response = client.post(
+        "/api/score-menu/ndjson",
+        params=ndjson_params(mode, profile, top_n, response_profile),
+        content=chunks,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["dishes_received"] == len(big_menu)
+    assert without_llm_info(response.json()["results"]) == without_llm_info(expected)
+
+
+def test_ndjson_order_independent(client, big_menu):
+    rng = random.Random(7)
+    allergens = ["gluten", "lactose", "nuts", "eggs", "fish", "soy"]
+    for _ in range(5):
+        rng.shuffle(big_menu)
+        profile = {
+            "dietary_restriction": rng.choice(["", "vegan", "vegetarian", "halal"]),
+            "goal": rng.choice(["", "weight_loss", "muscle_gain"]),
+            "allergens": rng.sample(allergens, rng.randint(0, 2)),
+        }
+        mode = rng.choice(["consumer", "restaurant"])
+        top_n = rng.choice([1, 5, 50, 2000])
+
+        expected = client.post(
+            "/api/score-menu",
+            json={
+                "menu_data": big_menu,
+                "user_profile": dict(profile, strict_filter=True),
+                "mode": mode,
+                "top_n": top_n,
+            },
+        ).json()["results"]
+        got = client.post(
+            "/api/score-menu/ndjson",
+            params=ndjson_params(mode, profile, top_n),
+            content="\n".join(json.dumps(d) for d in big_menu).encode(),
+        ).json()["results"]
+
+        assert without_llm_info(got) == without_llm_info(expected), (mode, top_n, profile)
+
+
+def test_ndjson_rejects_invalid_lines(client):
+    response = client.post("/api/score-menu/ndjson", content=b'{"id":1}\n')
+    assert response.status_code == 400
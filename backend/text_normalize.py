@@ -0,0 +1,103 @@
+"""
+TEXT NORMALIZATION (FOLDING)
+============================
+Forme repliée des textes de plats, calculée une seule fois par plat et
+partagée par tous les matchers (ingrédients, NOVA, sensoriel, régimes,
+allergènes, protéine, swaps). Les lexiques sont compilés dans la même forme.
+
+fold() : casefold, ligatures (œ → oe, æ → ae), diacritiques retirés
+(décomposition NFKD sans les marques combinantes), espaces fusionnés.
+
+    "Bœuf  Bourguignon, Comté" → "boeuf bourguignon, comte"
+
+Les variantes accentuées n'ont plus à être dupliquées à la main dans les
+lexiques ("boeuf"/"bœuf", "comte"/"comté") : fold_keywords() les fusionne.
+
+dish_text() remplace la ponctuation par des espaces et entoure le texte replié
+d'espaces : une entrée de lexique qui commence (ou finit) par une espace ne
+correspond qu'en début (ou fin) de mot. Utile quand le repli crée une
+collision : " blé" ne doit pas trouver "vegetable", ni "pané " "panettone".
+
+fold_case() garde les accents (casse, ligatures, espaces seulement) : pour la
+recherche approximative par trigrammes, où "pâté" ne doit pas ressembler à
+"pâtes" comme "pate" ressemble à "pates".
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+import unicodedata
+
+# Textes de plats / d'ingrédients repliés gardés en cache (LRU)
+FOLD_CACHE_SIZE = 65_536
+
+# Ligatures que NFKD ne décompose pas
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ø": "o", "ł": "l", "đ": "d"})
+
+# Ponctuation remplacée par une espace dans le texte des plats (ancres de mot) ;
+# tirets, apostrophes et "%" restent ("saint-jacques", "100% végétal")
+_PUNCTUATION = str.maketrans({char: " " for char in ",.;:!?()[]{}/\\\"«»*+|"})
+
+
+def _fold_case(text: str) -> str:
+    return " ".join((text or "").casefold().translate(_LIGATURES).split())
+
+
+def _fold(text: str) -> str:
+    text = _fold_case(text)
+    if not text.isascii():
+        text = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(char)
+        )
+    return text
+
+
+@lru_cache(maxsize=FOLD_CACHE_SIZE)
+def fold(text: str) -> str:
+    """Forme repliée d'un texte (casse, accents, ligatures, espaces)"""
+    return _fold(text)
+
+
+@lru_cache(maxsize=FOLD_CACHE_SIZE)
+def fold_case(text: str) -> str:
+    """Casse, ligatures et espaces repliés, accents conservés"""
+    return _fold_case(text)
+
+
+@lru_cache(maxsize=FOLD_CACHE_SIZE)
+def dish_text(name: str, description: str) -> str:
+    """Texte replié d'un plat (nom + description), bordé d'espaces pour les ancres de mot"""
+    text = ((name or "") + " " + (description or "")).translate(_PUNCTUATION)
+    return f" {_fold(text)} "
+
+
+def fold_keyword(keyword: str) -> str:
+    """Replie une entrée de lexique en gardant ses ancres de mot (espace en tête / en fin)"""
+    folded = fold(keyword)
+    if keyword[:1].isspace():
+        folded = " " + folded
+    if keyword[-1:].isspace():
+        folded += " "
+    return folded
+
+
+def fold_keywords(keywords: Iterable[str]) -> Tuple[str, ...]:
+    """Lexique replié : doublons fusionnés (variantes accentuées), ordre conservé"""
+    return tuple(dict.fromkeys(fold_keyword(kw) for kw in keywords))
+
+
+def fold_lexicon(lexicon: Dict[str, Iterable[str]]) -> Dict[str, Tuple[str, ...]]:
+    """{catégorie: mots-clés} replié catégorie par catégorie"""
+    return {category: fold_keywords(keywords) for category, keywords in lexicon.items()}
+
+
+def fold_labeled(keywords: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    [(forme repliée, mot-clé d'origine sans ancres)] : pour les matchers dont la
+    sortie garde l'orthographe du lexique (mots-clés sensoriels). Première variante gardée.
+    """
+    labeled: Dict[str, str] = {}
+    for keyword in keywords:
+        labeled.setdefault(fold_keyword(keyword), keyword.strip())
+    return list(labeled.items())
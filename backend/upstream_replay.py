@@ -0,0 +1,425 @@
+"""
+UPSTREAM RECORD / REPLAY
+========================
+Enregistrement des échanges avec les APIs amont (OCR Mistral, parsing Claude
+Haiku, extract_with_llm / Blackbox) dans des fixtures JSON, puis rejeu : les
+latences et les réponses de ces APIs varient d'un run à l'autre, ce qui rend
+les benchmarks du pipeline incomparables (voir bench_pipeline.py).
+
+- record : les appels réels passent, chaque échange est écrit avec ses
+  timings (latence totale, et offsets des morceaux pour le parsing streamé).
+- replay : aucun appel réseau ni clé API ; les réponses enregistrées sont
+  servies, instantanément ou avec les latences enregistrées (× facteur).
+  Un échange absent des fixtures lève FixtureMissingError.
+- Clé d'un échange : sha256 de la requête (modèle + document OCR / messages
+  du parsing / plat pour extract_with_llm). messages.create et
+  messages.stream partagent leurs fixtures : un enregistrement fait par
+  l'API (streaming) se rejoue dans main.py (create) et inversement.
+- Un même échange réenregistré remplace le précédent.
+
+Branché dans clients.py (get_mistral_client / get_anthropic_client) et sur
+extract_with_llm dans scoring_multi_resto.py, uniquement si UPSTREAM_MODE
+est défini.
+
+Configuration:
+    UPSTREAM_MODE      "record" ou "replay" (vide = appels réels, défaut)
+    UPSTREAM_FIXTURES  dossier des fixtures (défaut: fixtures/upstream)
+    UPSTREAM_LATENCY   replay : facteur appliqué aux latences enregistrées
+                       (défaut 0 = instantané, 1 = temps réel)
+"""
+
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from llm_cache import cache_key
+
+MODES = ("record", "replay")
+DEFAULT_FIXTURES_DIR = "fixtures/upstream"
+
+# Types d'échanges (un sous-dossier de fixtures chacun)
+OCR = "ocr"
+PARSE = "parse"
+ENRICH = "enrich"
+
+
+class FixtureMissingError(KeyError):
+    """Échange non enregistré demandé en mode replay"""
+
+
+def upstream_mode() -> str:
+    mode = os.getenv("UPSTREAM_MODE", "").strip().lower()
+    if mode and mode not in MODES:
+        raise ValueError(f"UPSTREAM_MODE must be one of {MODES}, got {mode!r}")
+    return mode
+
+
+def _request_key(request: dict) -> str:
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+
+class FixtureStore:
+    """Un fichier JSON par échange : {dir}/{kind}/{clé}.json"""
+
+    def __init__(self, path: str, latency_factor: float = 0.0):
+        self.path = path
+        self.latency_factor = latency_factor
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+
+    def _file(self, kind: str, key: str) -> str:
+        return os.path.join(self.path, kind, f"{key}.json")
+
+    def get(self, kind: str, key: str) -> dict:
+        try:
+            with open(self._file(kind, key), encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.missing += 1
+            raise FixtureMissingError(f"No {kind} fixture {key[:12]}… in {self.path}") from None
+        with self._lock:
+            self.replayed += 1
+        return record
+
+    def put(self, kind: str, key: str, record: dict):
+        directory = os.path.join(self.path, kind)
+        os.makedirs(directory, exist_ok=True)
+        record = {"kind": kind, "key": key, "recorded_at": time.time(), **record}
+        # Écriture atomique : les OCR tournent en parallèle (OCR_PREFETCH)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._file(kind, key))
+        with self._lock:
+            self.recorded += 1
+
+    def wait(self, seconds: float):
+        """Rejoue une latence enregistrée (× UPSTREAM_LATENCY)"""
+        if self.latency_factor > 0 and seconds > 0:
+            time.sleep(seconds * self.latency_factor)
+
+    def stats(self) -> dict:
+        return {"recorded": self.recorded, "replayed": self.replayed, "missing": self.missing}
+
+
+_STORE: Optional[FixtureStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_fixture_store() -> FixtureStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = FixtureStore(
+                    os.getenv("UPSTREAM_FIXTURES", DEFAULT_FIXTURES_DIR),
+                    float(os.getenv("UPSTREAM_LATENCY", "0")),
+                )
+    return _STORE
+
+
+# ============================================================================
+# MISTRAL (OCR)
+# ============================================================================
+
+
+def _ocr_request(model: str, document: dict) -> dict:
+    """Requête OCR telle qu'enregistrée : le document (base64) réduit à son hash"""
+    url = document.get("image_url") or document.get("document_url") or ""
+    return {
+        "model": model,
+        "type": document.get("type"),
+        "document_sha256": hashlib.sha256(url.encode("utf-8")).hexdigest(),
+        "document_size": len(url),
+    }
+
+
+def ocr_key(model: str, document: dict) -> str:
+    return _request_key(_ocr_request(model, document))
+
+
+class _OCRProxy:
+    def __init__(self, client, store: FixtureStore, mode: str):
+        self._client = client
+        self._store = store
+        self._mode = mode
+
+    def process(self, model: str, document: dict, **kwargs):
+        request = _ocr_request(model, document)
+        key = _request_key(request)
+
+        if self._mode == "replay":
+            record = self._store.get(OCR, key)
+            self._store.wait(record["latency_s"])
+            if record["pages"] is None:
+                return SimpleNamespace(pages=None, text=record["text"])
+            return SimpleNamespace(pages=[SimpleNamespace(markdown=m) for m in record["pages"]])
+
+        started = time.perf_counter()
+        response = self._client.ocr.process(model=model, document=document, **kwargs)
+        latency = time.perf_counter() - started
+
+        pages = getattr(response, "pages", None)
+        self._store.put(
+            OCR,
+            key,
+            {
+                "request": request,
+                "latency_s": latency,
+                "pages": [getattr(page, "markdown", "") or "" for page in pages] if pages else None,
+                "text": None if pages else (response.text if hasattr(response, "text") else str(response)),
+            },
+        )
+        return response
+
+
+class UpstreamMistral:
+    """Client Mistral enregistré / rejoué (seul ocr.process est utilisé)"""
+
+    def __init__(self, client, store: FixtureStore, mode: str):
+        self.ocr = _OCRProxy(client, store, mode)
+
+
+# ============================================================================
+# ANTHROPIC (PARSING)
+# ============================================================================
+
+
+def _parse_request(kwargs: dict) -> dict:
+    return {
+        key: kwargs.get(key)
+        for key in ("model", "max_tokens", "temperature", "system", "messages")
+    }
+
+
+def parse_key(request: dict) -> str:
+    """request: arguments de messages.create / messages.stream"""
+    return _request_key(_parse_request(request))
+
+
+class _RecordingStream:
+    """Enveloppe messages.stream : enregistre les morceaux et leurs offsets"""
+
+    def __init__(self, manager, store: FixtureStore, key: str, request: dict):
+        self._manager = manager
+        self._store = store
+        self._key = key
+        self._request = request
+        self._chunks: List[list] = []
+        self._complete = False
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._stream = self._manager.__enter__()
+        return self
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        for text in self._stream.text_stream:
+            self._chunks.append([time.perf_counter() - self._started, text])
+            yield text
+        self._complete = True
+
+    def __exit__(self, *exc):
+        suppress = self._manager.__exit__(*exc)
+        # Réponse incomplète (erreur, client parti) : rien n'est enregistré
+        if self._complete and exc[0] is None:
+            self._store.put(
+                PARSE,
+                self._key,
+                {
+                    "request": self._request,
+                    "latency_s": time.perf_counter() - self._started,
+                    "chunks": self._chunks,
+                },
+            )
+        return suppress
+
+
+class _ReplayStream:
+    def __init__(self, store: FixtureStore, record: dict):
+        self._store = store
+        self._record = record
+
+    def __enter__(self):
+        return self
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        elapsed = 0.0
+        for offset, text in self._record["chunks"]:
+            self._store.wait(offset - elapsed)
+            elapsed = offset
+            yield text
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _MessagesProxy:
+    def __init__(self, client, store: FixtureStore, mode: str):
+        self._client = client
+        self._store = store
+        self._mode = mode
+
+    def create(self, **kwargs):
+        request = _parse_request(kwargs)
+        key = _request_key(request)
+
+        if self._mode == "replay":
+            record = self._store.get(PARSE, key)
+            self._store.wait(record["latency_s"])
+            text = "".join(text for _, text in record["chunks"])
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+        started = time.perf_counter()
+        response = self._client.messages.create(**kwargs)
+        latency = time.perf_counter() - started
+        text = response.content[0].text
+        self._store.put(
+            PARSE, key, {"request": request, "latency_s": latency, "chunks": [[latency, text]]}
+        )
+        return response
+
+    def stream(self, **kwargs):
+        request = _parse_request(kwargs)
+        key = _request_key(request)
+
+        if self._mode == "replay":
+            return _ReplayStream(self._store, self._store.get(PARSE, key))
+        return _RecordingStream(self._client.messages.stream(**kwargs), self._store, key, request)
+
+
+class UpstreamAnthropic:
+    """Client Anthropic enregistré / rejoué (messages.create et messages.stream)"""
+
+    def __init__(self, client, store: FixtureStore, mode: str):
+        self.messages = _MessagesProxy(client, store, mode)
+
+
+# ============================================================================
+# EXTRACT_WITH_LLM (BLACKBOX)
+# ============================================================================
+
+
+def wrap_extract_with_llm(fn: Callable, model: str, prompt_version: int) -> Callable:
+    """extract_with_llm enregistré / rejoué (résultat final, replis compris)"""
+    mode = upstream_mode()
+    if not mode:
+        return fn
+    store = get_fixture_store()
+
+    def extract_with_llm(dish_name: str, description: str, budget=None) -> Dict:
+        key = cache_key(dish_name, description, model, prompt_version)
+
+        if mode == "replay":
+            record = store.get(ENRICH, key)
+            store.wait(record["latency_s"])
+            return dict(record["result"])
+
+        started = time.perf_counter()
+        result = fn(dish_name, description, budget)
+        store.put(
+            ENRICH,
+            key,
+            {
+                "request": {"dish_name": dish_name, "description": description, "model": model},
+                "latency_s": time.perf_counter() - started,
+                "result": result,
+            },
+        )
+        return result
+
+    extract_with_llm.__doc__ = fn.__doc__
+    return extract_with_llm
+
+
+def wrap_client(kind: str, client):
+    """Client amont enveloppé selon UPSTREAM_MODE (client None en replay)"""
+    mode = upstream_mode()
+    if not mode:
+        return client
+    wrapper = {"mistral": UpstreamMistral, "anthropic": UpstreamAnthropic}[kind]
+    return wrapper(client, get_fixture_store(), mode)
+
+
+# ============================================================================
+# FIXTURES SYNTHÉTIQUES (load_test.py : amont simulé sans enregistrement réel)
+# ============================================================================
+
+
+def synthesize_menu(
+    store: FixtureStore,
+    document: dict,
+    ocr_text: str,
+    restaurant_name: str,
+    llm_output: str,
+    ocr_latency: float = 0.0,
+    parse_latency: float = 0.0,
+    chunk_size: int = 64,
+):
+    """
+    Fixtures OCR + parsing d'un document d'une page, comme si elles avaient
+    été enregistrées : llm_output est servi en morceaux de chunk_size
+    caractères répartis uniformément sur parse_latency
+    """
+    from menu_extraction import OCR_MODEL, parsing_request
+
+    store.put(
+        OCR,
+        ocr_key(OCR_MODEL, document),
+        {
+            "request": _ocr_request(OCR_MODEL, document),
+            "latency_s": ocr_latency,
+            "pages": [ocr_text],
+            "text": None,
+            "synthetic": True,
+        },
+    )
+
+    request = parsing_request(ocr_text, restaurant_name)
+    pieces = [llm_output[i : i + chunk_size] for i in range(0, len(llm_output), chunk_size)]
+    store.put(
+        PARSE,
+        parse_key(request),
+        {
+            "request": _parse_request(request),
+            "latency_s": parse_latency,
+            "chunks": [
+                [parse_latency * (i + 1) / len(pieces), piece] for i, piece in enumerate(pieces)
+            ],
+            "synthetic": True,
+        },
+    )
+
+
+def synthesize_enrichment(
+    store: FixtureStore, dish_name: str, description: str, result: dict, latency: float = 0.0
+):
+    """Fixture extract_with_llm d'un plat (result : réponse ou repli de extract_with_llm)"""
+    from scoring_multi_resto import LLM_MODEL, LLM_PROMPT_VERSION
+
+    store.put(
+        ENRICH,
+        cache_key(dish_name, description, LLM_MODEL, LLM_PROMPT_VERSION),
+        {
+            "request": {"dish_name": dish_name, "description": description, "model": LLM_MODEL},
+            "latency_s": latency,
+            "result": result,
+            "synthetic": True,
+        },
+    )